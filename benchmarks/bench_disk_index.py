@@ -0,0 +1,153 @@
+"""
+Disk-resident graph index versus in-memory FAISS at several corpus sizes.
+
+Generates embedding-like vectors (a low-rank latent space plus noise, unit
+length) and for each corpus size builds the in-memory FAISS baselines and a
+``DiskGraphIndex``, then reports per index:
+
+- build time, bytes held in memory and bytes on disk
+- single-query search latency percentiles, as the retriever issues them
+- recall@k against exact search
+- for the disk index, blocks read from storage per query, per page cache
+  budget and search list size
+
+``--cold`` drops the graph file from the OS page cache before each disk run
+(``posix_fadvise``), and ``--direct-io`` reads with O_DIRECT so only the index's
+own cache helps; put ``--workdir`` on the SSD the index would live on.
+
+Usage:
+    python -m benchmarks.bench_disk_index --sizes 10000 50000 --cache-mb 0 64
+    python -m benchmarks.bench_disk_index --sizes 100000 --workdir /mnt/ssd/bench --cold --direct-io
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from src.api.diagnostics import faiss_index_bytes
+from src.vectorstore.disk_index import DISK_BLOCK_READS, GRAPH_FILE, DiskGraphIndex
+from src.vectorstore.vector_store_factory import build_faiss_index
+
+from .common import Timer, latency_summary, write_results
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compare the disk graph index with in-memory FAISS")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10000, 50000], help="Corpus sizes (vectors)")
+    parser.add_argument("--dimension", type=int, default=384, help="Vector dimension")
+    parser.add_argument("--latent-dimension", type=int, default=32, help="Intrinsic dimension of the synthetic vectors")
+    parser.add_argument("--faiss-index-types", nargs="+", default=["Flat", "HNSW32"], help="In-memory baselines")
+    parser.add_argument("--list-sizes", nargs="+", type=int, default=[32, 64, 128], help="Disk index search list sizes")
+    parser.add_argument("--cache-mb", nargs="+", type=int, default=[0, 64], help="Disk index page cache budgets")
+    parser.add_argument("--beam-width", type=int, default=4, help="Nodes read concurrently per search step")
+    parser.add_argument("--cold", action="store_true", help="Drop the graph file from the OS page cache before each run")
+    parser.add_argument("--direct-io", action="store_true", help="Read the graph with O_DIRECT")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--workdir", help="Directory for the disk indexes (defaults to a temporary directory)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def make_vectors(rng: np.random.Generator, projection: np.ndarray, count: int, noise: float = 0.05) -> np.ndarray:
+    """Unit vectors near a random low-dimensional subspace, like sentence embeddings."""
+    vectors = rng.standard_normal((count, projection.shape[0]), dtype=np.float32) @ projection
+    vectors += noise * rng.standard_normal(vectors.shape, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def recall(indices: np.ndarray, truth: np.ndarray) -> float:
+    return float(np.mean([len(set(row) & set(expected)) / len(expected) for row, expected in zip(indices, truth)]))
+
+
+def time_queries(search, queries: np.ndarray):
+    """Search one query at a time; returns (latencies, result ids)."""
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        results.append(search(query[None]))
+        latencies.append(time.perf_counter() - start)
+    return latencies, np.vstack(results)
+
+
+def drop_page_cache(path: Path) -> None:
+    """Ask the kernel to evict a file's pages so the next reads go to storage."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def bench_size(args, rng: np.random.Generator, projection: np.ndarray, size: int, workdir: Path) -> dict:
+    vectors = make_vectors(rng, projection, size)
+    queries = make_vectors(rng, projection, args.queries)
+    exact = build_faiss_index(vectors, "Flat")
+    _, truth = exact.search(queries, args.k)
+
+    result = {"size": size, "faiss": [], "disk": []}
+    for index_type in args.faiss_index_types:
+        with Timer() as build_timer:
+            index = exact if index_type == "Flat" else build_faiss_index(vectors, index_type)
+        latencies, indices = time_queries(lambda query: index.search(query, args.k)[1], queries)
+        result["faiss"].append({
+            "index_type": index_type,
+            "build_seconds": build_timer.elapsed,
+            "memory_bytes": faiss_index_bytes(index),
+            "recall": recall(indices, truth),
+            "latency": latency_summary(latencies),
+        })
+        del index
+
+    directory = workdir / f"disk-{size}"
+    with Timer() as build_timer:
+        DiskGraphIndex.build(str(directory), vectors, beam_width=args.beam_width).save()
+    result["disk_build_seconds"] = build_timer.elapsed
+    del vectors
+
+    misses = DISK_BLOCK_READS.labels(result="miss")
+    for cache_mb in args.cache_mb:
+        for list_size in args.list_sizes:
+            if args.cold:
+                drop_page_cache(directory / GRAPH_FILE)
+            # Reopened per run so every run starts with only the warmed cache
+            index = DiskGraphIndex.open(
+                str(directory),
+                search_list_size=list_size,
+                beam_width=args.beam_width,
+                cache_bytes=cache_mb * 1024 * 1024,
+                direct_io=args.direct_io
+            )
+            reads_before = misses.value
+            latencies, indices = time_queries(lambda query: index.search(query, args.k)[1], queries)
+            result["disk"].append({
+                "cache_mb": cache_mb,
+                "list_size": list_size,
+                "memory_bytes": index.memory_bytes(),
+                "disk_bytes": index.disk_bytes(),
+                "direct_io": index._graph.direct_io,
+                "recall": recall(indices, truth),
+                "reads_per_query": (misses.value - reads_before) / len(queries),
+                "latency": latency_summary(latencies),
+            })
+    return result
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    projection = rng.standard_normal((args.latent_dimension, args.dimension), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        runs = [bench_size(args, rng, projection, size, Path(workdir)) for size in args.sizes]
+    write_results("disk_index", {"config": vars(args), "runs": runs}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Answer length control benchmark.
+
+Asks a mix of short factual and explanatory questions through ``RAGChain`` with
+a stub Ollama server whose model rambles on, and compares end-to-end latency and
+generated tokens for an effectively unbounded answer length (the previous
+2048-token limit), one fixed limit, and limits adapted to the question.
+
+Usage:
+    python -m benchmarks.bench_generation --requests 30 --token-latency 0.005
+"""
+import argparse
+import random
+import time
+
+from langchain.schema import Document
+from langchain_community.vectorstores import FAISS
+
+from src.config import MAX_NEW_TOKENS
+from src.llm import ManagedOllamaLLM
+from src.rag import RAGChain
+
+from .common import latency_summary, write_results
+from .fakes import HashEmbeddings
+from .ollama_stub import start_stub_server
+
+QUESTIONS = [
+    "What is the refund window?",
+    "Who approves travel expenses?",
+    "When was the policy last updated?",
+    "Explain how the approval process works for new vendors.",
+    "Compare the standard and premium support plans.",
+    "How should I configure the backup schedule for a small team?",
+]
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark answer length controls")
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Stub seconds per generated token")
+    parser.add_argument("--answer-tokens", type=int, default=2048, help="Tokens the stub model would generate unprompted")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    server, url = start_stub_server(token_latency=args.token_latency, answer_tokens=args.answer_tokens, slots=1)
+    vector_store = FAISS.from_documents(
+        [Document(page_content=f"Policy section {i}", metadata={"source": "policy.txt"}) for i in range(20)],
+        HashEmbeddings()
+    )
+    rng = random.Random(args.seed)
+    questions = [rng.choice(QUESTIONS) for _ in range(args.requests)]
+
+    runs = []
+    for name, num_predict in (("unbounded", 2048), ("fixed", MAX_NEW_TOKENS), ("adaptive", None)):
+        chain = RAGChain(
+            vector_store=vector_store,
+            llm=ManagedOllamaLLM(model="stub", base_url=url, num_predict=num_predict)
+        )
+        latencies, tokens = [], []
+        for question in questions:
+            start = time.perf_counter()
+            result = chain.query(question)
+            latencies.append(time.perf_counter() - start)
+            tokens.append(len(result["answer"].split()))
+        runs.append({
+            "limit": name,
+            "latency": latency_summary(latencies),
+            "mean_generated_tokens": sum(tokens) / len(tokens),
+        })
+
+    server.shutdown()
+    write_results("generation", {"config": vars(args), "runs": runs}, args.output)
+
+
+if __name__ == "__main__":
+    main()
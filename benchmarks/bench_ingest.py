@@ -0,0 +1,124 @@
+"""
+Ingestion throughput benchmark.
+
+Measures parse, split, embed and index throughput for ``DocumentProcessor`` and
+``get_vector_store`` on a synthetic corpus using deterministic fake embeddings.
+
+Usage:
+    python -m benchmarks.bench_ingest --documents 200 --output results/ingest.json
+"""
+import argparse
+import logging
+import tempfile
+from pathlib import Path
+
+from langchain.schema import Document
+from langchain_community.vectorstores import FAISS
+
+from src.document_processor import DocumentProcessor
+from src.vectorstore import get_vector_store
+
+from .common import Timer, write_results
+from .corpus import generate_corpus
+from .fakes import HashEmbeddings
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark document ingestion throughput")
+    parser.add_argument("--documents", type=int, default=50, help="Number of synthetic documents")
+    parser.add_argument("--sections", type=int, default=8, help="Sections per document")
+    parser.add_argument("--paragraphs", type=int, default=4, help="Paragraphs per section")
+    parser.add_argument("--chunking-mode", default="recursive", choices=["recursive", "structure"])
+    parser.add_argument("--store", default="faiss", choices=["faiss", "chroma"], help="Vector store backend")
+    parser.add_argument("--dimension", type=int, default=384, help="Fake embedding dimension")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Simulated seconds per embedding call")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per embedding call")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def _rate(count: int, seconds: float) -> float:
+    return count / seconds if seconds > 0 else 0.0
+
+
+def run(args) -> dict:
+    """Run the ingestion benchmark and return its results."""
+    embeddings = HashEmbeddings(dimension=args.dimension, latency=args.embedding_latency)
+    processor = DocumentProcessor(chunking_mode=args.chunking_mode)
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus_dir = Path(workdir) / "corpus"
+        generate_corpus(str(corpus_dir), args.documents, args.sections, args.paragraphs, seed=args.seed)
+        files = sorted(corpus_dir.glob("*.txt"))
+        total_bytes = sum(f.stat().st_size for f in files)
+        
+        # Parse
+        with Timer() as parse_timer:
+            texts = [(f, processor.txt_loader.load(str(f))) for f in files]
+        
+        # Split
+        with Timer() as split_timer:
+            chunks = []
+            for file_path, text in texts:
+                doc = Document(page_content=text, metadata={"source": str(file_path), "document_id": file_path.stem})
+                chunks.extend(processor.split_document(doc))
+        chunk_texts = [chunk.page_content for chunk in chunks]
+        
+        # Embed
+        with Timer() as embed_timer:
+            vectors = []
+            for start in range(0, len(chunk_texts), args.batch_size):
+                vectors.extend(embeddings.embed_documents(chunk_texts[start:start + args.batch_size]))
+        
+        # Index (pre-computed vectors, isolates index build cost)
+        with Timer() as index_timer:
+            FAISS.from_embeddings(
+                list(zip(chunk_texts, vectors)),
+                embeddings,
+                metadatas=[chunk.metadata for chunk in chunks]
+            )
+        
+        # End to end through the factory, including persistence
+        with Timer() as store_timer:
+            get_vector_store(
+                store_type=args.store,
+                embedding_model=embeddings,
+                persist_directory=str(Path(workdir) / "vectordb"),
+                documents=chunks
+            )
+    
+    chunk_chars = sum(len(t) for t in chunk_texts)
+    return {
+        "config": vars(args),
+        "corpus": {
+            "documents": len(files),
+            "bytes": total_bytes,
+            "chunks": len(chunks),
+            "chunk_chars": chunk_chars,
+            "duplication_ratio": chunk_chars / total_bytes if total_bytes else 0.0,
+        },
+        "stages": {
+            "parse": {"seconds": parse_timer.elapsed, "docs_per_s": _rate(len(files), parse_timer.elapsed),
+                      "mb_per_s": _rate(total_bytes / 1e6, parse_timer.elapsed)},
+            "split": {"seconds": split_timer.elapsed, "chunks_per_s": _rate(len(chunks), split_timer.elapsed)},
+            "embed": {"seconds": embed_timer.elapsed, "chunks_per_s": _rate(len(chunks), embed_timer.elapsed)},
+            "index": {"seconds": index_timer.elapsed, "chunks_per_s": _rate(len(chunks), index_timer.elapsed)},
+            "get_vector_store": {"seconds": store_timer.elapsed,
+                                 "chunks_per_s": _rate(len(chunks), store_timer.elapsed)},
+        },
+    }
+
+
+def main():
+    """Main entry point for the benchmark."""
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args()
+    write_results("ingest", run(args), args.output)
+
+
+if __name__ == "__main__":
+    main()
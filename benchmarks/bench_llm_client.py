@@ -0,0 +1,103 @@
+"""
+LLM client pooling and concurrency-limit benchmark.
+
+Fires a burst of generations through ``ManagedOllamaLLM`` at the stub Ollama
+server (or a real one with ``--url``) for several client concurrency limits and
+reports end-to-end latency, time spent queued for a backend slot
+(``rag_llm_route_wait_seconds``) and the peak load seen by the server.
+
+Usage:
+    python -m benchmarks.bench_llm_client --requests 64 --threads 32 --limits 1 2 4 8
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from src.llm import BackendPool, ManagedOllamaLLM, OllamaClient
+import src.llm.client as client_module
+import src.llm.router as router_module
+
+from .common import latency_summary, write_results
+from .ollama_stub import start_stub_server
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the pooled Ollama client")
+    parser.add_argument("--url", help="Ollama server URL (default: start the local stub)")
+    parser.add_argument("--model", default="stub")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per limit")
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent callers")
+    parser.add_argument("--limits", type=int, nargs="+", default=[1, 2, 4, 8], help="Client max-concurrency values")
+    parser.add_argument("--server-slots", type=int, default=4, help="Stub server parallelism")
+    parser.add_argument("--prompt-chars", type=int, default=4000)
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def _server_stats(url: str):
+    try:
+        with urllib.request.urlopen(f"{url}/stats") as response:
+            return json.loads(response.read())
+    except Exception:
+        return None
+
+
+def run_limit(url: str, limit: int, args) -> dict:
+    """Run one burst with a fresh client limited to ``limit`` in-flight requests."""
+    client_module._clients[url] = OllamaClient(url, max_concurrency=limit)
+    # The pool queues requests for the client's slots, so it is recreated with the client
+    router_module._pools[(url,)] = BackendPool([url], health_check_interval=0)
+    llm = ManagedOllamaLLM(model=args.model, base_url=url)
+    prompt = "context " * (args.prompt_chars // 8)
+    before = _server_stats(url)
+    queue = router_module.ROUTE_WAIT_SECONDS.labels()
+    queue_sum, queue_count = queue.sum, queue.count
+    
+    latencies = []
+    
+    def one(_):
+        start = time.perf_counter()
+        llm.invoke(prompt)
+        latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+    
+    queued = queue.count - queue_count
+    result = {
+        "max_concurrency": limit,
+        "latency": latency_summary(latencies),
+        "throughput_rps": args.requests / elapsed if elapsed else 0.0,
+        "mean_queue_ms": 1000 * (queue.sum - queue_sum) / queued if queued else 0.0,
+    }
+    after = _server_stats(url)
+    if before is not None and after is not None:
+        result["server_max_in_flight"] = after["max_in_flight"]
+    router_module._pools.pop((url,)).stop()
+    client_module._clients.pop(url).close()
+    return result
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    results = []
+    for limit in args.limits:
+        if args.url:
+            url = args.url.rstrip("/")
+        else:
+            # A fresh stub per limit so the server's peak concurrency is per run
+            server, url = start_stub_server(slots=args.server_slots)
+        results.append(run_limit(url, limit, args))
+        if not args.url:
+            server.shutdown()
+    write_results("llm_client", {"config": vars(args), "runs": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
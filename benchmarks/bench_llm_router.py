@@ -0,0 +1,107 @@
+"""
+Multi-backend LLM routing benchmark.
+
+Starts several stub Ollama servers (the last ``--slow`` of them with a higher
+per-token latency), bursts generations through ``ManagedOllamaLLM`` for each
+backend count and routing strategy, and reports latency, throughput and how
+requests were spread. With ``--kill-one`` one backend is shut down before the
+burst to exercise failover.
+
+Usage:
+    python -m benchmarks.bench_llm_router --backends 1 2 4 --strategies least_outstanding latency
+"""
+import argparse
+import json
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from src.llm import BackendPool, ManagedOllamaLLM
+import src.llm.router as router_module
+
+from .common import latency_summary, write_results
+from .ollama_stub import start_stub_server
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark multi-backend LLM routing")
+    parser.add_argument("--model", default="stub")
+    parser.add_argument("--requests", type=int, default=64, help="Requests per run")
+    parser.add_argument("--threads", type=int, default=32, help="Concurrent callers")
+    parser.add_argument("--backends", type=int, nargs="+", default=[1, 2, 4], help="Backend counts to test")
+    parser.add_argument("--strategies", nargs="+", default=["least_outstanding", "latency"])
+    parser.add_argument("--server-slots", type=int, default=4, help="Parallelism of each stub server")
+    parser.add_argument("--slow", type=int, default=1, help="Number of backends that are 4x slower")
+    parser.add_argument("--kill-one", action="store_true", help="Shut one backend down before the burst")
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def _requests_served(url: str) -> int:
+    try:
+        with urllib.request.urlopen(f"{url}/stats") as response:
+            return json.loads(response.read())["requests"]
+    except Exception:
+        return 0
+
+
+def run(backend_count: int, strategy: str, args) -> dict:
+    """Run one burst against ``backend_count`` fresh stub servers."""
+    servers, urls = [], []
+    for i in range(backend_count):
+        slow = i >= backend_count - args.slow and backend_count > 1
+        server, url = start_stub_server(token_latency=0.02 if slow else 0.005, slots=args.server_slots)
+        servers.append(server)
+        urls.append(url)
+
+    router_module._pools[tuple(urls)] = BackendPool(urls, strategy=strategy, health_check_interval=0)
+    llm = ManagedOllamaLLM(model=args.model, base_urls=urls)
+    if args.kill_one and backend_count > 1:
+        servers[0].shutdown()
+        servers[0].server_close()
+
+    latencies, errors = [], 0
+
+    def one(_):
+        nonlocal errors
+        start = time.perf_counter()
+        try:
+            llm.invoke("context " * 500)
+        except Exception:
+            errors += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        list(executor.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "backends": backend_count,
+        "strategy": strategy,
+        "latency": latency_summary(latencies),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "errors": errors,
+        "requests_per_backend": [_requests_served(url) for url in urls],
+    }
+    router_module._pools.pop(tuple(urls)).stop()
+    for server in servers:
+        server.shutdown()
+    return result
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    results = [
+        run(backend_count, strategy, args)
+        for backend_count in args.backends
+        for strategy in args.strategies
+    ]
+    write_results("llm_router", {"config": vars(args), "runs": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Local CPU LLM quantization benchmark.
+
+Loads the local transformers model in each requested mode ("none" for float32,
+"int8" for dynamic int8, "gguf" for llama.cpp with ``--gguf-model``), each in a
+fresh subprocess so peak RSS is per mode, and reports load time, decode
+throughput (tokens/sec) and peak RSS. The first int8 run converts and caches the
+model; run twice to see the cached load time.
+
+Usage:
+    python -m benchmarks.bench_local_llm --model TinyLlama/TinyLlama-1.1B-Chat-v1.0 --modes none int8
+    python -m benchmarks.bench_local_llm --modes gguf --gguf-model TheBloke/TinyLlama-1.1B-Chat-v1.0-GGUF:tinyllama-1.1b-chat-v1.0.Q4_K_M.gguf
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from .common import ROOT_DIR, write_results
+
+PROMPTS = [
+    "Summarize the main benefits of using a vector database for document search.",
+    "Explain in a few sentences how retrieval augmented generation works.",
+    "List three ways to reduce the latency of a language model on a CPU.",
+]
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark quantized local LLM loading paths")
+    parser.add_argument("--model", default="TinyLlama/TinyLlama-1.1B-Chat-v1.0")
+    parser.add_argument("--gguf-model", default="", help="GGUF path or repo_id:filename for the gguf mode")
+    parser.add_argument("--modes", nargs="+", default=["none", "int8"], choices=["none", "int8", "gguf"])
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=0, help="CPU threads (0: library default)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def run_worker(args) -> dict:
+    """Measure one mode in this process."""
+    from src.llm.llm_factory import get_local_llm
+    from src.metrics import start_trace, end_trace
+
+    start = time.perf_counter()
+    llm = get_local_llm(
+        args.model,
+        use_ollama=False,
+        quantization=args.worker,
+        gguf_model=args.gguf_model,
+        max_new_tokens=args.max_new_tokens,
+        n_threads=args.threads or None,
+        temperature=0.0
+    )
+    load_seconds = time.perf_counter() - start
+
+    llm.invoke(PROMPTS[0])  # warm up
+    tokens, seconds = 0, 0.0
+    for prompt in PROMPTS:
+        start_trace()
+        start = time.perf_counter()
+        text = llm.invoke(prompt)
+        seconds += time.perf_counter() - start
+        trace = end_trace() or {}
+        tokens += int(trace.get("generated_tokens") or llm.get_num_tokens(text))
+
+    return {
+        "mode": args.worker,
+        "load_seconds": load_seconds,
+        "tokens_per_second": tokens / seconds if seconds else 0.0,
+        "generated_tokens": tokens,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    env = {**os.environ, "USE_OLLAMA": "false"}
+    if args.threads:
+        env["LLM_CPU_THREADS"] = str(args.threads)
+    runs = []
+    for mode in args.modes:
+        command = [
+            sys.executable, "-m", "benchmarks.bench_local_llm", "--worker", mode,
+            "--model", args.model, "--gguf-model", args.gguf_model,
+            "--max-new-tokens", str(args.max_new_tokens), "--threads", str(args.threads)
+        ]
+        completed = subprocess.run(command, cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            runs.append({"mode": mode, "error": completed.stderr.strip().splitlines()[-1:]})
+            continue
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    write_results("local_llm", {"config": vars(args), "runs": runs}, args.output)
+
+
+if __name__ == "__main__":
+    main()
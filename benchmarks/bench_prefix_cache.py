@@ -0,0 +1,165 @@
+"""
+Prompt prefix cache benchmark.
+
+Compares the old RAG template (context before the instructions) with the
+current one (static instructions first) on prompts with varying context:
+
+- always: how much of each prompt is identical to the previous one, which is
+  what a backend's prefix cache can reuse
+- with ``--url``: the prompt-eval time and tokens a real Ollama server reports
+  per request through ``ManagedOllamaLLM``, with the model kept loaded or
+  unloaded after every request
+
+The stub server is not used for timings: it simulates prefix reuse itself, so
+its prompt-eval times would only echo the stub's cost model.
+
+With ``--hf-model`` it instead times prefill on the local transformers path with
+and without ``PrefixKVCache`` (requires torch and transformers).
+
+Usage:
+    python -m benchmarks.bench_prefix_cache --requests 20 --url http://localhost:11434 --model mistral
+    python -m benchmarks.bench_prefix_cache --hf-model sshleifer/tiny-gpt2
+"""
+import argparse
+import os
+import random
+import time
+
+from langchain.prompts import PromptTemplate
+
+from src.llm import ManagedOllamaLLM
+import src.llm.client as client_module
+from src.rag.rag_chain import PROMPT_PREFIX, PROMPT_TEMPLATE
+
+from .common import latency_summary, write_results
+
+# Template used before the static instructions were moved in front of the context
+CONTEXT_FIRST_TEMPLATE = """
+        You are a helpful assistant that answers questions based on the provided context.
+
+        Context:
+        {context}
+
+        Question:
+        {question}
+
+        Instructions:
+        - Answer the question based on the context provided.
+        - If the context doesn't contain the answer, then search on google or web if not found then say "I don't have enough information to answer this question."
+        - Provide detailed and accurate answers.
+        - Cite specific parts of the context when relevant.
+
+        Answer:
+        """
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark prompt prefix caching")
+    parser.add_argument("--url", help="Ollama server URL to time prompt evaluation against")
+    parser.add_argument("--model", default="stub")
+    parser.add_argument("--hf-model", help="Benchmark the transformers prefix KV cache with this model instead")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--context-words", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def make_prompts(template: str, args):
+    """Render prompts with a fresh random context and question per request."""
+    rng = random.Random(args.seed)
+    prompt = PromptTemplate(template=template, input_variables=["context", "question"])
+    return [
+        prompt.format(
+            context=" ".join(f"term{rng.randrange(5000)}" for _ in range(args.context_words)),
+            question=f"What does term{rng.randrange(5000)} mean?"
+        )
+        for _ in range(args.requests)
+    ]
+
+
+def shared_prefix(prompts: list) -> dict:
+    """Characters each prompt shares with the one before it."""
+    shared = [len(os.path.commonprefix([previous, prompt])) for previous, prompt in zip(prompts, prompts[1:])]
+    lengths = [len(prompt) for prompt in prompts[1:]]
+    return {
+        "mean_prompt_chars": sum(lengths) / len(lengths),
+        "mean_shared_prefix_chars": sum(shared) / len(shared),
+        "shared_fraction": sum(shared) / sum(lengths),
+    }
+
+
+def run_templates(args) -> list:
+    """Shared prefix per template and, with ``--url``, backend prompt-eval time per keep-alive setting."""
+    if args.url:
+        url = args.url.rstrip("/")
+        prompt_eval = client_module.LLM_PROMPT_EVAL_SECONDS.labels(backend=url)
+        prompt_tokens = client_module.LLM_PROMPT_TOKENS.labels(backend=url)
+    results = []
+    for name, template in (("context_first", CONTEXT_FIRST_TEMPLATE), ("prefix_first", PROMPT_TEMPLATE)):
+        prompts = make_prompts(template, args)
+        result = {"template": name, **shared_prefix(prompts)}
+        if args.url:
+            result["backend"] = []
+            for keep_alive in ("30m", "0"):
+                llm = ManagedOllamaLLM(model=args.model, base_url=url, keep_alive=keep_alive, num_predict=1)
+                eval_sum, eval_count, tokens = prompt_eval.sum, prompt_eval.count, prompt_tokens.value
+                latencies = []
+                for prompt in prompts:
+                    start = time.perf_counter()
+                    llm.invoke(prompt)
+                    latencies.append(time.perf_counter() - start)
+                count = prompt_eval.count - eval_count
+                result["backend"].append({
+                    "keep_alive": keep_alive,
+                    "latency": latency_summary(latencies),
+                    "mean_prompt_eval_ms": 1000 * (prompt_eval.sum - eval_sum) / count if count else None,
+                    "mean_prompt_tokens_evaluated": (prompt_tokens.value - tokens) / count if count else None,
+                })
+        results.append(result)
+    return results
+
+
+def run_transformers(args) -> list:
+    """Time prefill (one generated token) with and without the prefix KV cache."""
+    import torch
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    from src.llm.prefix_cache import PrefixKVCache
+
+    tokenizer = AutoTokenizer.from_pretrained(args.hf_model)
+    model = AutoModelForCausalLM.from_pretrained(args.hf_model)
+    model.eval()
+    prompts = make_prompts(PROMPT_TEMPLATE, args)
+
+    results = []
+    for name, prefix in (("no_cache", ""), ("prefix_cache", PROMPT_PREFIX)):
+        cache = PrefixKVCache(model, tokenizer, prefix)
+        cache.prepare(prompts[0])  # build the prefix state outside the timed loop
+        latencies = []
+        for prompt in prompts:
+            start = time.perf_counter()
+            input_ids, past_key_values, _ = cache.prepare(prompt)
+            with torch.no_grad():
+                model.generate(
+                    input_ids=input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    past_key_values=past_key_values,
+                    max_new_tokens=1,
+                    pad_token_id=tokenizer.eos_token_id
+                )
+            latencies.append(time.perf_counter() - start)
+        results.append({"mode": name, "prefill": latency_summary(latencies)})
+    return results
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    runs = run_transformers(args) if args.hf_model else run_templates(args)
+    write_results("prefix_cache", {"config": vars(args), "runs": runs}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+End-to-end ``/query`` latency benchmark.
+
+Builds a FAISS index over a synthetic corpus with fake embeddings, serves the
+FastAPI app in-process with a deterministic fake LLM and reports p50/p95/p99
+latency and QPS. Pass ``--url`` to benchmark a running server instead.
+
+Usage:
+    python -m benchmarks.bench_query --documents 200 --requests 500 --concurrency 8
+"""
+import argparse
+import asyncio
+import logging
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from .common import latency_summary, write_results
+from .corpus import generate_corpus
+from .fakes import FakeLLM, HashEmbeddings
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark /query latency and throughput")
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process app with fakes)")
+    parser.add_argument("--documents", type=int, default=50, help="Number of synthetic documents")
+    parser.add_argument("--sections", type=int, default=8, help="Sections per document")
+    parser.add_argument("--requests", type=int, default=200, help="Number of measured requests")
+    parser.add_argument("--warmup", type=int, default=10, help="Number of unmeasured warmup requests")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent in-flight requests")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Simulated seconds per LLM call")
+    parser.add_argument("--dimension", type=int, default=384, help="Fake embedding dimension")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def build_app(args, workdir: str):
+    """Create the API app backed by a synthetic index, fake embeddings and a fake LLM."""
+    from src.document_processor import DocumentProcessor
+    from src.vectorstore import get_vector_store
+    import src.rag.rag_chain as rag_module
+    
+    corpus_dir = Path(workdir) / "corpus"
+    probes = generate_corpus(str(corpus_dir), args.documents, args.sections, seed=args.seed)
+    documents = DocumentProcessor().process_documents([str(f) for f in sorted(corpus_dir.glob("*.txt"))])
+    
+    embeddings = HashEmbeddings(dimension=args.dimension)
+    vector_store = get_vector_store(
+        embedding_model=embeddings,
+        persist_directory=str(Path(workdir) / "vectordb"),
+        documents=documents
+    )
+    
+    # The API module builds its RAG chain from these factories when services load
+    rag_module.get_vector_store = lambda: vector_store
+    rag_module.get_llm = lambda **kwargs: FakeLLM(latency=args.llm_latency)
+    from src.api import app as app_module
+    
+    # ASGITransport does not run the lifespan hook, so load synchronously
+    app_module.load_services()
+    return app_module.create_app(), probes
+
+
+async def _drive(client: httpx.AsyncClient, questions, concurrency: int):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one(question: str):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/query", json={"question": question})
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+    
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in questions))
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run_async(args) -> dict:
+    """Run the query benchmark and return its results."""
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.url:
+            client = httpx.AsyncClient(base_url=args.url, timeout=None)
+            probes = generate_corpus(str(Path(workdir) / "corpus"), args.documents, args.sections, seed=args.seed)
+        else:
+            app, probes = build_app(args, workdir)
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None)
+        
+        rng = random.Random(args.seed)
+        questions = [rng.choice(probes)["question"] for _ in range(args.warmup + args.requests)]
+        
+        async with client:
+            await _drive(client, questions[:args.warmup], args.concurrency)
+            latencies, errors, elapsed = await _drive(client, questions[args.warmup:], args.concurrency)
+    
+    summary = latency_summary(latencies)
+    summary["qps"] = len(latencies) / elapsed if elapsed > 0 else 0.0
+    summary["errors"] = errors
+    summary["wall_seconds"] = elapsed
+    return {"config": vars(args), "query": summary}
+
+
+def main():
+    """Main entry point for the benchmark."""
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args()
+    write_results("query", asyncio.run(run_async(args)), args.output)
+
+
+if __name__ == "__main__":
+    main()
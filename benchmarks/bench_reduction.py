@@ -0,0 +1,154 @@
+"""
+Embedding dimensionality reduction report.
+
+Embeds a synthetic corpus once, then for each reduction method and target
+dimension fits the projection (``src.embeddings.reduction``), builds a FAISS
+index of the reduced vectors and compares it with the full-width index:
+
+- neighbour recall@k: overlap of the reduced top-k with the exact full-width top-k
+- answer recall@k: share of probe questions whose evidence chunk is retrieved
+- index size and per-query search latency
+
+Usage:
+    python -m benchmarks.bench_reduction --documents 200 --dimensions 256 128 64
+    python -m benchmarks.bench_reduction --real-embeddings --methods pca truncate
+"""
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain.schema import Document
+
+from src.document_processor import DocumentProcessor
+from src.embeddings import fit_projection
+
+from .common import Timer, latency_summary, write_results
+from .corpus import generate_corpus
+from .fakes import HashEmbeddings
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Report recall loss versus savings of embedding reduction")
+    parser.add_argument("--documents", type=int, default=100, help="Number of synthetic documents")
+    parser.add_argument("--sections", type=int, default=8, help="Sections per document")
+    parser.add_argument("--paragraphs", type=int, default=4, help="Paragraphs per section")
+    parser.add_argument("--dimension", type=int, default=384, help="Fake embedding dimension")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use get_embeddings() instead of offline hashing embeddings")
+    parser.add_argument("--methods", nargs="+", default=["pca", "truncate"], choices=["pca", "truncate"])
+    parser.add_argument("--dimensions", nargs="+", type=int, default=[256, 128, 64, 32])
+    parser.add_argument("--sample-size", type=int, default=20000, help="Vectors PCA is fitted on")
+    parser.add_argument("--index-type", default="Flat", help="FAISS index factory string")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200, help="Probe questions to evaluate")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def _build_index(vectors: np.ndarray, index_type: str):
+    from src.vectorstore.vector_store_factory import build_faiss_index
+
+    return build_faiss_index(np.ascontiguousarray(vectors, dtype=np.float32), index_type)
+
+
+def _index_bytes(index) -> int:
+    import faiss
+
+    return len(faiss.serialize_index(index))
+
+
+def _search(index, queries: np.ndarray, k: int):
+    """Search one query at a time, as the retriever does, returning ids and latencies."""
+    ids, latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, found = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        ids.append(found[0])
+    return np.asarray(ids), latencies
+
+
+def _answer_recall(ids: np.ndarray, evidence_hits: list) -> float:
+    return sum(bool(set(row.tolist()) & hits) for row, hits in zip(ids, evidence_hits)) / len(ids)
+
+
+def main():
+    """Main entry point for the benchmark."""
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args()
+    if args.real_embeddings:
+        from src.embeddings import get_embeddings
+        embeddings = get_embeddings()
+    else:
+        embeddings = HashEmbeddings(dimension=args.dimension)
+    processor = DocumentProcessor()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus_dir = Path(workdir) / "corpus"
+        probes = generate_corpus(str(corpus_dir), args.documents, args.sections, args.paragraphs, seed=args.seed)
+        chunks = []
+        for file_path in sorted(corpus_dir.glob("*.txt")):
+            doc = Document(page_content=processor.txt_loader.load(str(file_path)), metadata={"source": str(file_path)})
+            chunks.extend(processor.split_document(doc))
+
+    probes = probes[:args.queries]
+    with Timer() as embed_timer:
+        vectors = np.asarray(embeddings.embed_documents([chunk.page_content for chunk in chunks]), dtype=np.float32)
+        queries = np.asarray(embeddings.embed_documents([probe["question"] for probe in probes]), dtype=np.float32)
+    evidence_hits = [
+        {i for i, chunk in enumerate(chunks) if probe["evidence"] in chunk.page_content} for probe in probes
+    ]
+
+    full_index = _build_index(vectors, args.index_type)
+    exact_ids, full_latencies = _search(_build_index(vectors, "Flat"), queries, args.k)
+    if args.index_type != "Flat":
+        full_ids, full_latencies = _search(full_index, queries, args.k)
+    else:
+        full_ids = exact_ids
+    full_bytes = _index_bytes(full_index)
+
+    runs = [{
+        "method": "full",
+        "dimension": vectors.shape[1],
+        "neighbour_recall": float(np.mean([len(set(a) & set(b)) / args.k for a, b in zip(full_ids, exact_ids)])),
+        "answer_recall": _answer_recall(full_ids, evidence_hits),
+        "index_mb": full_bytes / 1e6,
+        "search_latency": latency_summary(full_latencies),
+    }]
+    for method in args.methods:
+        for dimension in args.dimensions:
+            if dimension >= vectors.shape[1]:
+                continue
+            with Timer() as fit_timer:
+                projection = fit_projection(vectors, method, dimension, args.sample_size, seed=args.seed)
+            index = _build_index(projection.apply(vectors), args.index_type)
+            ids, latencies = _search(index, projection.apply(queries), args.k)
+            index_bytes = _index_bytes(index)
+            runs.append({
+                "method": method,
+                "dimension": dimension,
+                "fit_seconds": fit_timer.elapsed,
+                "neighbour_recall": float(np.mean([len(set(a) & set(b)) / args.k for a, b in zip(ids, exact_ids)])),
+                "answer_recall": _answer_recall(ids, evidence_hits),
+                "index_mb": index_bytes / 1e6,
+                "memory_saving": 1 - index_bytes / full_bytes,
+                "search_latency": latency_summary(latencies),
+                "search_speedup": (
+                    np.mean(full_latencies) / np.mean(latencies) if np.mean(latencies) else 0.0
+                ),
+            })
+
+    write_results("reduction", {
+        "config": vars(args),
+        "chunks": len(chunks),
+        "embed_seconds": embed_timer.elapsed,
+        "runs": runs,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
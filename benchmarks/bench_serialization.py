@@ -0,0 +1,130 @@
+"""
+Per-request cost of serializing ``/query`` responses.
+
+Builds query results shaped like ``RAGChain.query`` output (an answer plus
+``k`` sources with 500 characters of content and chunk metadata) and times,
+for each ``fields`` selection:
+
+- the previous path: ``QueryResponse`` validation, ``jsonable_encoder`` and ``json.dumps``
+- field selection plus ``src.api.responses.dumps`` (orjson when installed) and the stdlib fallback
+- gzip and brotli compression of the encoded body, with the bytes saved
+
+Usage:
+    python -m benchmarks.bench_serialization --k 4 8 --iterations 2000
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+import zlib
+
+from fastapi.encoders import jsonable_encoder
+
+from src.api import responses
+from src.api.app import QueryResponse
+
+from .common import latency_summary, write_results
+
+WORDS = "retrieval index vector chunk answer latency throughput embedding model query document section".split()
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark response serialization and compression")
+    parser.add_argument("--k", nargs="+", type=int, default=[4, 8], help="Sources per response")
+    parser.add_argument("--answer-words", type=int, default=120, help="Words in the answer")
+    parser.add_argument("--iterations", type=int, default=2000, help="Timed serializations per case")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def make_result(rng: random.Random, k: int, answer_words: int) -> dict:
+    """A query result with the structure and sizes ``RAGChain.query`` produces."""
+    def text(words: int) -> str:
+        return " ".join(rng.choice(WORDS) for _ in range(words))
+
+    return {
+        "answer": text(answer_words),
+        "sources": [
+            {
+                "content": text(80)[:500] + "...",
+                "metadata": {
+                    "source": f"/data/documents/report-{rng.randrange(1000)}.pdf",
+                    "document_id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "page": rng.randrange(200),
+                    "section": text(5),
+                    "parent_id": f"{uuid.UUID(int=rng.getrandbits(128))}:{rng.randrange(40)}",
+                },
+            }
+            for _ in range(k)
+        ],
+    }
+
+
+def pydantic_path(result: dict) -> bytes:
+    """What FastAPI does for a dict returned from a route with ``response_model=QueryResponse``."""
+    model = QueryResponse.model_validate(result)
+    content = jsonable_encoder(model.model_dump(mode="json", exclude_none=True))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def stdlib_path(result: dict, fields: str) -> bytes:
+    content = responses.select_fields(result, fields)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def time_per_call(function, iterations: int) -> list:
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    rng = random.Random(args.seed)
+    runs = []
+    for k in args.k:
+        result = make_result(rng, k, args.answer_words)
+        baseline = time_per_call(lambda: pydantic_path(result), args.iterations)
+        baseline_bytes = len(pydantic_path(result))
+        for fields in responses.FIELD_SETS:
+            body = responses.dumps(responses.select_fields(result, fields))
+            fast = time_per_call(lambda: responses.dumps(responses.select_fields(result, fields)), args.iterations)
+            stdlib = time_per_call(lambda: stdlib_path(result, fields), args.iterations)
+            run = {
+                "k": k,
+                "fields": fields,
+                "encoder": "orjson" if responses.orjson is not None else "json",
+                "bytes": len(body),
+                "bytes_vs_previous": len(body) / baseline_bytes,
+                "previous_path": latency_summary(baseline),
+                "fast_path": latency_summary(fast),
+                "stdlib_json": latency_summary(stdlib),
+                "speedup_vs_previous": sum(baseline) / sum(fast),
+            }
+            compressors = {"gzip": lambda: zlib.compress(body, responses.GZIP_LEVEL, 31)}
+            if responses.brotli is not None:
+                compressors["br"] = lambda: responses.brotli.compress(body, quality=responses.BROTLI_QUALITY)
+            for name, compress in compressors.items():
+                run[name] = {
+                    "bytes": len(compress()),
+                    "ratio": len(compress()) / len(body),
+                    "latency": latency_summary(time_per_call(compress, args.iterations)),
+                }
+            runs.append(run)
+
+    write_results("serialization", {
+        "config": vars(args),
+        "compression_min_size": responses.COMPRESSION_MIN_SIZE,
+        "runs": runs,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+FAISS, Chroma and disk index backend comparison.
+
+Loads the same synthetic corpus into each ``get_vector_store`` backend, each in
+a fresh subprocess so peak RSS is per backend, and reports build time, on-disk
+size, peak RSS, reopen time and query latency percentiles. Query vectors are
+embedded up front so the latencies are the store's search alone.
+
+Usage:
+    python -m benchmarks.bench_vector_stores --documents 200 --queries 500
+    python -m benchmarks.bench_vector_stores --stores chroma --chroma-batch-sizes 64 256 1024
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from langchain.schema import Document
+
+from .common import ROOT_DIR, Timer, latency_summary, write_results
+from .corpus import generate_corpus
+from .fakes import HashEmbeddings
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Compare FAISS, Chroma and disk vector store backends")
+    parser.add_argument("--stores", nargs="+", default=["faiss", "chroma"], choices=["faiss", "chroma", "disk"])
+    parser.add_argument("--documents", type=int, default=100, help="Number of synthetic documents")
+    parser.add_argument("--sections", type=int, default=8, help="Sections per document")
+    parser.add_argument("--paragraphs", type=int, default=4, help="Paragraphs per section")
+    parser.add_argument("--dimension", type=int, default=384, help="Fake embedding dimension")
+    parser.add_argument("--embedding-latency", type=float, default=0.0, help="Simulated seconds per embedding call")
+    parser.add_argument("--index-type", default="Flat", help="FAISS index factory string")
+    parser.add_argument("--chroma-batch-sizes", nargs="+", type=int, default=[256], help="CHROMA_BATCH_SIZE values to try")
+    parser.add_argument("--chroma-workers", type=int, default=2, help="CHROMA_EMBEDDING_WORKERS")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def _disk_bytes(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+def run_worker(args) -> dict:
+    """Build, reopen and query one backend in this process."""
+    from src.document_processor import DocumentProcessor
+    from src.vectorstore import get_vector_store
+
+    embeddings = HashEmbeddings(dimension=args.dimension, latency=args.embedding_latency)
+    processor = DocumentProcessor()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        probes = generate_corpus(
+            str(Path(workdir) / "corpus"), args.documents, args.sections, args.paragraphs, seed=args.seed
+        )
+        chunks = []
+        for file_path in sorted((Path(workdir) / "corpus").glob("*.txt")):
+            doc = Document(
+                page_content=processor.txt_loader.load(str(file_path)),
+                metadata={"source": str(file_path), "document_id": file_path.stem}
+            )
+            chunks.extend(processor.split_document(doc))
+
+        persist_directory = str(Path(workdir) / "vectordb")
+        with Timer() as build_timer:
+            get_vector_store(
+                store_type=args.worker,
+                embedding_model=embeddings,
+                persist_directory=persist_directory,
+                documents=chunks,
+                index_type=args.index_type
+            )
+        disk_bytes = _disk_bytes(Path(persist_directory))
+
+        with Timer() as open_timer:
+            vector_store = get_vector_store(
+                store_type=args.worker, embedding_model=embeddings, persist_directory=persist_directory
+            )
+
+        questions = [probes[i % len(probes)]["question"] for i in range(args.queries)]
+        vectors = HashEmbeddings(dimension=args.dimension).embed_documents(questions)
+        vector_store.similarity_search_by_vector(vectors[0], k=args.k)  # warm up
+        latencies = []
+        for vector in vectors:
+            start = time.perf_counter()
+            vector_store.similarity_search_by_vector(vector, k=args.k)
+            latencies.append(time.perf_counter() - start)
+
+    return {
+        "store": args.worker,
+        "chroma_batch_size": int(os.environ["CHROMA_BATCH_SIZE"]) if args.worker == "chroma" else None,
+        "chunks": len(chunks),
+        "build_seconds": build_timer.elapsed,
+        "build_chunks_per_s": len(chunks) / build_timer.elapsed if build_timer.elapsed else 0.0,
+        "open_seconds": open_timer.elapsed,
+        "disk_mb": disk_bytes / 1e6,
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "query_latency": latency_summary(latencies),
+    }
+
+
+def main():
+    """Main entry point for the benchmark."""
+    args = parse_args()
+    if args.worker:
+        print(json.dumps(run_worker(args)))
+        return
+
+    runs = []
+    for store in args.stores:
+        for batch_size in (args.chroma_batch_sizes if store == "chroma" else [None]):
+            env = {**os.environ, "CHROMA_BATCH_SIZE": str(batch_size or args.chroma_batch_sizes[0]),
+                   "CHROMA_EMBEDDING_WORKERS": str(args.chroma_workers)}
+            command = [sys.executable, "-m", "benchmarks.bench_vector_stores", "--worker", store]
+            for name in ("documents", "sections", "paragraphs", "dimension", "embedding_latency",
+                         "index_type", "queries", "k", "seed"):
+                command += [f"--{name.replace('_', '-')}", str(getattr(args, name))]
+            completed = subprocess.run(command, cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+            if completed.returncode != 0:
+                runs.append({"store": store, "chroma_batch_size": batch_size,
+                             "error": completed.stderr.strip().splitlines()[-1:]})
+                continue
+            runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    write_results("vector_stores", {"config": vars(args), "runs": runs}, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Shared helpers for benchmark scripts.
+"""
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """Summarize latencies (in seconds) as milliseconds."""
+    return {
+        "count": len(latencies),
+        "mean_ms": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": 1000 * percentile(latencies, 50),
+        "p95_ms": 1000 * percentile(latencies, 95),
+        "p99_ms": 1000 * percentile(latencies, 99),
+        "max_ms": 1000 * max(latencies) if latencies else 0.0,
+    }
+
+
+class Timer:
+    """Context manager measuring wall-clock time."""
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.elapsed = 0.0
+        return self
+    
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def environment_info() -> Dict[str, Any]:
+    """Collect versions and the git revision so results can be compared across runs."""
+    info = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    for package in ("langchain", "langchain_community", "faiss", "numpy", "chromadb"):
+        try:
+            module = __import__(package)
+            info[package] = getattr(module, "__version__", "unknown")
+        except ImportError:
+            info[package] = None
+    try:
+        info["git_commit"] = subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        info["git_commit"] = None
+    return info
+
+
+def write_results(name: str, results: Dict[str, Any], output: Optional[str] = None) -> None:
+    """Emit benchmark results as JSON to a file or stdout."""
+    payload = {"benchmark": name, "environment": environment_info(), "results": results}
+    text = json.dumps(payload, indent=2, default=str)
+    if output:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        Path(output).write_text(text, encoding="utf-8")
+    else:
+        print(text)
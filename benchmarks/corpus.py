@@ -0,0 +1,79 @@
+"""
+Synthetic corpus generation for benchmarks.
+"""
+import json
+import random
+from pathlib import Path
+from typing import Dict, List
+
+_WORDS = (
+    "system data model index query vector latency throughput memory cache "
+    "document section table report policy revenue customer contract service "
+    "network storage compute budget schedule release security audit incident "
+    "metric threshold region partner product feature support invoice account"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 20))]
+    return " ".join(words).capitalize() + "."
+
+
+def generate_corpus(
+    output_dir: str,
+    num_documents: int = 50,
+    sections_per_document: int = 8,
+    paragraphs_per_section: int = 4,
+    seed: int = 42
+) -> List[Dict[str, str]]:
+    """
+    Write synthetic text documents and return question/answer probes for them.
+    
+    Every section contains a unique fact sentence; the returned probes ask about
+    it and record which file and section hold the answer.
+    
+    Args:
+        output_dir: Directory to write the ``.txt`` files to
+        num_documents: Number of documents to generate
+        sections_per_document: Headed sections per document
+        paragraphs_per_section: Filler paragraphs per section
+        seed: Random seed so runs are comparable
+    
+    Returns:
+        List of probes with ``question``, ``answer``, ``source``, ``section`` and
+        ``evidence`` (text the relevant chunk must contain) keys
+    """
+    rng = random.Random(seed)
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    
+    probes = []
+    for doc_index in range(num_documents):
+        file_path = output_path / f"doc_{doc_index:05d}.txt"
+        blocks = []
+        for section_index in range(sections_per_document):
+            title = f"Section {section_index + 1} of report {doc_index}"
+            code = f"K{doc_index:05d}S{section_index:02d}"
+            value = rng.randint(1000, 9999)
+            fact = f"The reference code {code} has the approved value {value}."
+            paragraphs = [
+                " ".join(_sentence(rng) for _ in range(rng.randint(3, 6)))
+                for _ in range(paragraphs_per_section)
+            ]
+            paragraphs.insert(rng.randint(0, len(paragraphs)), fact)
+            blocks.append(f"# {title}")
+            blocks.extend(paragraphs)
+            probes.append({
+                "question": f"What is the approved value for reference code {code}?",
+                "answer": str(value),
+                "source": str(file_path),
+                "section": title,
+                "evidence": code,
+            })
+        file_path.write_text("\n\n".join(blocks), encoding="utf-8")
+    
+    with open(output_path / "probes.jsonl", "w", encoding="utf-8") as f:
+        for probe in probes:
+            f.write(json.dumps(probe) + "\n")
+    
+    return probes
@@ -0,0 +1,351 @@
+"""
+Retrieval quality evaluation across index configurations.
+
+For every configuration (chunking, embedding model, store and index type, k) the
+corpus is indexed with ``get_vector_store`` and each question is run through the
+``RAGChain`` retriever. Reports recall@k, MRR and nDCG@k next to retrieval
+latency and index memory, the mean number of chunks retrieved and the resulting
+prompt size, and picks the fastest configuration above a recall floor.
+
+A dataset is JSONL with one question per line::
+
+    {"question": "...", "relevant": [{"source": "report.pdf", "contains": "net revenue"}]}
+
+Configuration keys: ``name``, ``chunking_mode``, ``chunk_size``, ``chunk_overlap``,
+``store_type``, ``index_type`` (FAISS factory string), ``top_k``, ``search_type``
+("similarity" or "mmr", with ``fetch_k`` and ``lambda_mult``), ``adaptive_k`` (with
+``min_k``, ``max_k``, ``min_score_ratio`` and ``min_score_gap``), ``route_documents``
+(two-stage FAISS search over the chunks of that many routed documents, with
+``document_centroids``), and
+``embedding_mode``/``embedding_model`` (with ``--real-embeddings``) or
+``embedding_dimension`` (offline).
+
+A retrieved chunk matches a judgment when its ``source`` (or file name) ends with the
+judgment's ``source`` and, if given, its text contains ``contains``. Judgments are
+independent of chunk boundaries, so different chunkings are scored consistently.
+
+Usage:
+    python -m benchmarks.eval_retrieval --synthetic 100 --configs configs.json --recall-floor 0.9
+    python -m benchmarks.eval_retrieval --corpus-dir data/documents --dataset qa.jsonl --real-embeddings
+"""
+import argparse
+import json
+import logging
+import math
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain.schema import Document
+from langchain_community.vectorstores import FAISS
+
+from src.document_processor import DocumentProcessor
+from src.rag import RAGChain
+from src.rag.rag_chain import PROMPT_TEMPLATE
+from src.config import DOCUMENT_CENTROIDS
+from src.vectorstore import get_vector_store
+from src.vectorstore.routing import document_index
+
+from .common import latency_summary, write_results
+from .corpus import generate_corpus
+from .fakes import FakeLLM, HashEmbeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIGS = [
+    {"name": "recursive-1000-flat", "chunking_mode": "recursive", "chunk_size": 1000, "chunk_overlap": 200},
+    {"name": "recursive-500-flat", "chunking_mode": "recursive", "chunk_size": 500, "chunk_overlap": 50},
+    {"name": "structure-1000-flat", "chunking_mode": "structure", "chunk_size": 1000},
+    {"name": "structure-1000-hnsw", "chunking_mode": "structure", "chunk_size": 1000, "index_type": "HNSW32"},
+    {"name": "recursive-1000-mmr", "chunking_mode": "recursive", "chunk_size": 1000, "chunk_overlap": 200,
+     "search_type": "mmr"},
+    {"name": "recursive-1000-adaptive", "chunking_mode": "recursive", "chunk_size": 1000, "chunk_overlap": 200,
+     "adaptive_k": True},
+    {"name": "recursive-1000-routed", "chunking_mode": "recursive", "chunk_size": 1000, "chunk_overlap": 200,
+     "route_documents": 3},
+]
+
+# Rough prompt size estimate, as in the Ollama stub
+CHARS_PER_TOKEN = 4
+
+ADAPTIVE_KEYS = ("min_k", "max_k", "min_score_ratio", "min_score_gap")
+
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality against latency and memory")
+    parser.add_argument("--dataset", help="JSONL file of questions with relevance judgments")
+    parser.add_argument("--corpus-dir", help="Directory of documents to index")
+    parser.add_argument("--synthetic", type=int, default=0, help="Generate a synthetic corpus with this many documents")
+    parser.add_argument("--configs", help="JSON file with a list of configurations (default: built-in grid)")
+    parser.add_argument("--top-k", type=int, default=5, help="Default k when a configuration does not set top_k")
+    parser.add_argument("--recall-floor", type=float, default=0.9, help="Minimum recall@k for the recommendation")
+    parser.add_argument("--real-embeddings", action="store_true", help="Use get_embeddings() instead of offline hashing embeddings")
+    parser.add_argument("--max-questions", type=int, default=0, help="Evaluate at most this many questions")
+    parser.add_argument("--plot", help="Save a recall/latency/memory chart to this PNG file (requires matplotlib)")
+    parser.add_argument("--output", "-o", help="Write JSON results to this file instead of stdout")
+    return parser.parse_args()
+
+
+def load_dataset(path: str) -> List[Dict[str, Any]]:
+    """Load questions and judgments, accepting synthetic probe lines as well."""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "relevant" not in item:
+                item = {
+                    "question": item["question"],
+                    "relevant": [{"source": item["source"], "contains": item.get("evidence")}],
+                }
+            items.append(item)
+    return items
+
+
+def _matches(doc: Document, judgment: Dict[str, Any]) -> bool:
+    source = str(doc.metadata.get("source", ""))
+    if judgment.get("source") and not source.endswith(judgment["source"]):
+        return False
+    contains = judgment.get("contains")
+    return not contains or contains in doc.page_content
+
+
+def score_ranking(retrieved: List[Document], judgments: List[Dict[str, Any]], k: int) -> Dict[str, float]:
+    """
+    Score a ranked list of retrieved chunks against relevance judgments.
+    
+    Each judgment counts once, at the rank of the first chunk that satisfies it.
+    
+    Returns:
+        Dictionary with ``recall``, ``reciprocal_rank`` and ``ndcg``
+    """
+    found = set()
+    gains = []
+    for doc in retrieved[:k]:
+        gain = 0.0
+        for index, judgment in enumerate(judgments):
+            if index not in found and _matches(doc, judgment):
+                found.add(index)
+                gain = 1.0
+                break
+        gains.append(gain)
+    
+    first_hit = next((rank for rank, gain in enumerate(gains, start=1) if gain), None)
+    dcg = sum(gain / math.log2(rank + 1) for rank, gain in enumerate(gains, start=1))
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(judgments), k) + 1))
+    return {
+        "recall": len(found) / len(judgments) if judgments else 0.0,
+        "reciprocal_rank": 1.0 / first_hit if first_hit else 0.0,
+        "ndcg": dcg / ideal if ideal else 0.0,
+    }
+
+
+def distinct_fraction(retrieved: List[Document], threshold: float = 0.8) -> float:
+    """Fraction of chunks whose word-set Jaccard similarity to every earlier chunk is below ``threshold``."""
+    if not retrieved:
+        return 1.0
+    seen: List[set] = []
+    distinct = 0
+    for doc in retrieved:
+        words = set(doc.page_content.lower().split())
+        if all(len(words & other) / max(len(words | other), 1) < threshold for other in seen):
+            distinct += 1
+        seen.append(words)
+    return distinct / len(retrieved)
+
+
+def index_memory_bytes(vector_store, persist_directory: str) -> Dict[str, int]:
+    """Estimate memory held by the vector index and the docstore."""
+    if hasattr(vector_store, "index"):
+        import faiss
+        index_bytes = int(faiss.serialize_index(vector_store.index).nbytes)
+        docstore_bytes = sum(
+            len(doc.page_content) + len(json.dumps(doc.metadata, default=str))
+            for doc in vector_store.docstore._dict.values()
+        )
+        return {"index_bytes": index_bytes, "docstore_bytes": docstore_bytes}
+    disk = sum(f.stat().st_size for f in Path(persist_directory).rglob("*") if f.is_file())
+    return {"index_bytes": disk, "docstore_bytes": 0}
+
+
+def evaluate_config(
+    config: Dict[str, Any],
+    files: List[str],
+    dataset: List[Dict[str, Any]],
+    embeddings,
+    workdir: str,
+    default_k: int
+) -> Dict[str, Any]:
+    """Index the corpus with one configuration and score every question."""
+    processor = DocumentProcessor(
+        chunk_size=config.get("chunk_size", 1000),
+        chunk_overlap=config.get("chunk_overlap", 200),
+        chunking_mode=config.get("chunking_mode", "recursive"),
+        # Shared by all configurations, so PDF/DOCX files are only parsed once
+        extraction_cache_dir=str(Path(workdir) / "extracted"),
+    )
+    documents = processor.process_documents(files)
+    
+    persist_directory = str(Path(workdir) / config["name"])
+    start = time.perf_counter()
+    vector_store = get_vector_store(
+        store_type=config.get("store_type", "faiss"),
+        embedding_model=embeddings,
+        persist_directory=persist_directory,
+        documents=documents,
+        index_type=config.get("index_type"),
+    )
+    build_seconds = time.perf_counter() - start
+    
+    k = config.get("top_k", default_k)
+    rag_chain = RAGChain(
+        vector_store=vector_store,
+        llm=FakeLLM(),
+        top_k=k,
+        search_type=config.get("search_type", "similarity"),
+        adaptive_k=config.get("adaptive_k", False)
+    )
+    retriever = rag_chain.retriever
+    retriever.fetch_k = config.get("fetch_k", retriever.fetch_k)
+    retriever.lambda_mult = config.get("lambda_mult", retriever.lambda_mult)
+    for key in ADAPTIVE_KEYS:
+        setattr(retriever, key, config.get(key, getattr(retriever, key)))
+    if retriever.adaptive_k:
+        # Scored at the largest k the retriever may return
+        k = retriever.max_k
+    retriever.route_documents = config.get("route_documents", retriever.route_documents)
+    if retriever.route_documents and isinstance(vector_store, FAISS):
+        # Built before timing, as ingestion would have done
+        document_index(vector_store, config.get("document_centroids", DOCUMENT_CENTROIDS))
+    
+    latencies = []
+    totals = {"recall": 0.0, "reciprocal_rank": 0.0, "ndcg": 0.0, "distinct": 0.0, "k": 0, "prompt_tokens": 0}
+    for item in dataset:
+        start = time.perf_counter()
+        retrieved = retriever.get_relevant_documents(item["question"])
+        latencies.append(time.perf_counter() - start)
+        for key, value in score_ranking(retrieved, item["relevant"], k).items():
+            totals[key] += value
+        # Share of retrieved chunks that are not near-copies of a higher-ranked one
+        totals["distinct"] += distinct_fraction(retrieved)
+        totals["k"] += len(retrieved)
+        prompt = PROMPT_TEMPLATE.format(
+            context="\n\n".join(doc.page_content for doc in retrieved), question=item["question"]
+        )
+        totals["prompt_tokens"] += len(prompt) / CHARS_PER_TOKEN
+    
+    count = len(dataset) or 1
+    return {
+        "config": config,
+        "chunks": len(documents),
+        f"recall@{k}": totals["recall"] / count,
+        "recall": totals["recall"] / count,
+        "mrr": totals["reciprocal_rank"] / count,
+        f"ndcg@{k}": totals["ndcg"] / count,
+        "distinct_fraction": totals["distinct"] / count,
+        "mean_k": totals["k"] / count,
+        "mean_prompt_tokens": totals["prompt_tokens"] / count,
+        "build_seconds": build_seconds,
+        "latency": latency_summary(latencies),
+        "memory": index_memory_bytes(vector_store, persist_directory),
+    }
+
+
+_embedding_cache: Dict[tuple, Any] = {}
+
+
+def load_embeddings(config: Dict[str, Any], real: bool):
+    """Return (cached) embeddings for a configuration."""
+    if real:
+        key = ("real", config.get("embedding_mode"), config.get("embedding_model"))
+    else:
+        key = ("hash", config.get("embedding_dimension", 384))
+    if key not in _embedding_cache:
+        if real:
+            from src.embeddings import get_embeddings
+            _embedding_cache[key] = get_embeddings(key[1], key[2])
+        else:
+            _embedding_cache[key] = HashEmbeddings(dimension=key[1])
+    return _embedding_cache[key]
+
+
+def recommend(results: List[Dict[str, Any]], recall_floor: float) -> Optional[Dict[str, Any]]:
+    """Pick the configuration with the lowest p50 latency whose recall meets the floor."""
+    eligible = [r for r in results if r["recall"] >= recall_floor]
+    if not eligible:
+        return None
+    return min(eligible, key=lambda r: (r["latency"]["p50_ms"], r["memory"]["index_bytes"]))
+
+
+def plot_results(results: List[Dict[str, Any]], path: str) -> None:
+    """Plot recall against p50 latency, with marker area proportional to index memory."""
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        logger.warning("matplotlib is not installed, skipping plot")
+        return
+    
+    fig, ax = plt.subplots(figsize=(8, 5))
+    largest = max(r["memory"]["index_bytes"] for r in results) or 1
+    for r in results:
+        size = 50 + 950 * r["memory"]["index_bytes"] / largest
+        ax.scatter(r["latency"]["p50_ms"], r["recall"], s=size, alpha=0.6)
+        ax.annotate(r["config"]["name"], (r["latency"]["p50_ms"], r["recall"]), fontsize=8)
+    ax.set_xlabel("p50 retrieval latency (ms)")
+    ax.set_ylabel("recall@k")
+    ax.set_title("Retrieval quality vs latency (marker area = index memory)")
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def main():
+    """Main entry point for the evaluation."""
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args()
+    
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs, encoding="utf-8") as f:
+            configs = json.load(f)
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        if args.synthetic:
+            corpus_dir = Path(workdir) / "corpus"
+            generate_corpus(str(corpus_dir), args.synthetic)
+            files = [str(f) for f in sorted(corpus_dir.glob("*.txt"))]
+            dataset = load_dataset(args.dataset or str(corpus_dir / "probes.jsonl"))
+        elif args.corpus_dir and args.dataset:
+            files = [str(f) for f in sorted(Path(args.corpus_dir).rglob("*"))
+                     if f.suffix.lower() in (".pdf", ".docx", ".doc", ".txt")]
+            dataset = load_dataset(args.dataset)
+        else:
+            raise SystemExit("Provide --synthetic N, or both --corpus-dir and --dataset")
+        
+        if args.max_questions:
+            dataset = dataset[:args.max_questions]
+        
+        results = []
+        for config in configs:
+            logger.warning(f"Evaluating configuration {config['name']}")
+            embeddings = load_embeddings(config, args.real_embeddings)
+            results.append(evaluate_config(config, files, dataset, embeddings, workdir, args.top_k))
+    
+    best = recommend(results, args.recall_floor)
+    if args.plot:
+        plot_results(results, args.plot)
+    
+    write_results("retrieval_eval", {
+        "questions": len(dataset),
+        "recall_floor": args.recall_floor,
+        "recommended": best["config"]["name"] if best else None,
+        "configs": results,
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Deterministic stand-ins for the embedding model and LLM so benchmarks run offline.
+"""
+import hashlib
+import re
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain.callbacks.manager import CallbackManagerForLLMRun
+from langchain.embeddings.base import Embeddings
+from langchain.llms.base import LLM
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Bag-of-words embeddings using the hashing trick.
+    
+    Texts sharing words get similar vectors, so retrieval over a synthetic corpus
+    behaves plausibly while costing almost nothing to compute.
+    """
+    
+    def __init__(self, dimension: int = 384, latency: float = 0.0):
+        """
+        Args:
+            dimension: Size of the embedding vectors
+            latency: Simulated seconds spent per embedding call
+        """
+        self.dimension = dimension
+        self.latency = latency
+    
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimension] += 1.0 if (value >> 63) else -1.0
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector /= norm
+        return vector.tolist()
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+    
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
+
+
+class FakeLLM(LLM):
+    """LLM returning a deterministic answer derived from the prompt."""
+    
+    latency: float = 0.0
+    answer_words: int = 32
+    
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+    
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        words = _TOKEN_RE.findall(prompt)[-self.answer_words:]
+        return " ".join(words)
@@ -0,0 +1,222 @@
+"""
+Minimal local server speaking the subset of the Ollama HTTP API used by the app.
+
+Generation cost is simulated from prompt length and output length, and the server
+reports the highest number of requests it saw in flight, so client-side pooling
+and concurrency limits can be exercised without a GPU or a real model. Like
+Ollama, it only evaluates the part of a prompt not shared with a recent prompt
+while the model stays loaded (``keep_alive`` other than 0).
+
+Usage:
+    python -m benchmarks.ollama_stub --port 11435 --token-latency 0.01
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+from .fakes import HashEmbeddings
+
+
+class StubState:
+    """Counters shared by all request handlers."""
+    
+    def __init__(self, prompt_latency: float, token_latency: float, answer_tokens: int, slots: int):
+        self.prompt_latency = prompt_latency
+        self.token_latency = token_latency
+        self.answer_tokens = answer_tokens
+        self.slots = threading.BoundedSemaphore(slots)
+        self.embeddings = HashEmbeddings()
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.cancelled = 0
+        self.connections = 0
+        # Prompts whose KV state is still cached, one per slot
+        self.cached_prompts = []
+        self.cache_size = slots
+    
+    def cached_chars(self, prompt: str) -> int:
+        """Length of the longest cached prefix of ``prompt``."""
+        with self.lock:
+            cached = list(self.cached_prompts)
+        return max((len(os.path.commonprefix([prompt, other])) for other in cached), default=0)
+    
+    def remember(self, prompt: str, keep_alive) -> None:
+        with self.lock:
+            if keep_alive in (0, "0", "0s"):
+                # The model is unloaded after the request, dropping its cache
+                self.cached_prompts = []
+                return
+            self.cached_prompts = (self.cached_prompts + [prompt])[-self.cache_size:]
+    
+    def enter(self) -> None:
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+    
+    def leave(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            # A client closed an idle keep-alive connection
+            pass
+    
+    def setup(self):
+        super().setup()
+        # One handler per TCP connection, so this counts connections, not requests
+        with self.state.lock:
+            self.state.connections += 1
+    
+    @property
+    def state(self) -> StubState:
+        return self.server.state
+    
+    def _send_json(self, payload, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+    
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": "stub"}]})
+        elif self.path == "/stats":
+            self._send_json({
+                "requests": self.state.requests,
+                "in_flight": self.state.in_flight,
+                "max_in_flight": self.state.max_in_flight,
+                "cancelled": self.state.cancelled,
+                "connections": self.state.connections,
+            })
+        else:
+            self._send_json({"error": "not found"}, 404)
+    
+    def do_POST(self):
+        request = self._read_json()
+        if self.path == "/api/generate":
+            self._generate(request)
+        elif self.path == "/api/embeddings":
+            self._send_json({"embedding": self.state.embeddings.embed_query(request.get("prompt", ""))})
+        elif self.path == "/api/embed":
+            inputs = request.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({"embeddings": self.state.embeddings.embed_documents(inputs)})
+        else:
+            self._send_json({"error": "not found"}, 404)
+    
+    def _generate(self, request) -> None:
+        state = self.state
+        prompt = request.get("prompt", "")
+        options = request.get("options") or {}
+        answer_tokens = min(options.get("num_predict") or state.answer_tokens, state.answer_tokens)
+        stream = request.get("stream", True)
+        
+        state.enter()
+        try:
+            # The stub, like Ollama, only runs a fixed number of generations at once
+            with state.slots:
+                start = time.perf_counter()
+                prompt_tokens = max(1, (len(prompt) - state.cached_chars(prompt)) // 4)
+                prompt_seconds = prompt_tokens * state.prompt_latency
+                time.sleep(prompt_seconds)
+                state.remember(prompt, request.get("keep_alive"))
+                
+                if stream:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-ndjson")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                
+                words = []
+                for i in range(answer_tokens):
+                    time.sleep(state.token_latency)
+                    word = f"token{i} "
+                    words.append(word)
+                    if stream:
+                        self._write_chunk({"model": request.get("model"), "response": word, "done": False})
+                
+                final = {
+                    "model": request.get("model"),
+                    "response": "" if stream else "".join(words),
+                    "done": True,
+                    "total_duration": int((time.perf_counter() - start) * 1e9),
+                    "prompt_eval_count": prompt_tokens,
+                    "prompt_eval_duration": int(prompt_seconds * 1e9),
+                    "eval_count": answer_tokens,
+                    "eval_duration": int(answer_tokens * state.token_latency * 1e9),
+                }
+                if stream:
+                    self._write_chunk(final)
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    self._send_json(final)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; like Ollama, stop generating
+            state.cancelled += 1
+            self.close_connection = True
+        finally:
+            state.leave()
+    
+    def _write_chunk(self, payload) -> None:
+        data = json.dumps(payload).encode("utf-8") + b"\n"
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_stub_server(
+    port: int = 0,
+    prompt_latency: float = 0.0001,
+    token_latency: float = 0.005,
+    answer_tokens: int = 32,
+    slots: int = 4
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub in a background thread and return the server and its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(prompt_latency, token_latency, answer_tokens, slots)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub Ollama server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--prompt-latency", type=float, default=0.0001, help="Seconds per prompt token")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Seconds per generated token")
+    parser.add_argument("--answer-tokens", type=int, default=32)
+    parser.add_argument("--slots", type=int, default=4, help="Generations the server runs at once")
+    args = parser.parse_args()
+    
+    server, url = start_stub_server(args.port, args.prompt_latency, args.token_latency, args.answer_tokens, args.slots)
+    print(f"Stub Ollama server listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+Script to export indexed chunks and vectors to Parquet, or rebuild a vector store from such a file.
+"""
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+from src.config import BULK_ROW_GROUP_SIZE
+from src.embeddings import get_embeddings
+from src.vectorstore import get_vector_store, export_vector_store, import_vector_store
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="Bulk export and import of the vector store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write all chunks and vectors to a Parquet file")
+    export_parser.add_argument("path", help="Parquet file to write")
+    export_parser.add_argument("--store", default="faiss", choices=["faiss", "chroma", "disk"], help="Store to export")
+    export_parser.add_argument("--persist-directory", help="Vector store directory (defaults to VECTOR_DB_PATH)")
+    export_parser.add_argument("--batch-size", type=int, default=BULK_ROW_GROUP_SIZE, help="Rows per row group")
+
+    import_parser = subparsers.add_parser("import", help="Build a vector store from a Parquet export")
+    import_parser.add_argument("path", help="Parquet file written by export")
+    import_parser.add_argument("--store", default="faiss", choices=["faiss", "chroma", "disk"], help="Store to build")
+    import_parser.add_argument("--persist-directory", help="Vector store directory (defaults to VECTOR_DB_PATH)")
+    import_parser.add_argument("--index-type", help="FAISS index factory string (defaults to FAISS_INDEX_TYPE)")
+    import_parser.add_argument("--batch-size", type=int, default=BULK_ROW_GROUP_SIZE, help="Rows read per batch")
+
+    return parser.parse_args()
+
+def main():
+    """Main entry point for the script."""
+    args = parse_args()
+    embedding_model = get_embeddings()
+
+    try:
+        if args.command == "export":
+            vector_store = get_vector_store(
+                store_type=args.store,
+                embedding_model=embedding_model,
+                persist_directory=args.persist_directory
+            )
+            count = export_vector_store(vector_store, args.path, batch_size=args.batch_size)
+            logger.info(f"Exported {count} chunks to {args.path}")
+        else:
+            import_vector_store(
+                args.path,
+                store_type=args.store,
+                embedding_model=embedding_model,
+                persist_directory=args.persist_directory,
+                index_type=args.index_type,
+                batch_size=args.batch_size
+            )
+
+    except Exception as e:
+        logger.error(f"Bulk {args.command} failed: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
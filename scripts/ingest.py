@@ -12,9 +12,22 @@ from typing import List
 # Add the parent directory to the path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from src.document_processor import DocumentProcessor
+from src.document_processor import DocumentProcessor, DirectoryWatcher
 from src.rag import RAGChain
-from src.config import DOCUMENTS_DIR
+from src.config import DOCUMENTS_DIR, WATCH_INTERVAL, WATCH_STATE_FILE
+from src.embeddings import get_embeddings
+from src.vectorstore import (
+    get_vector_store,
+    save_vector_store,
+    add_documents,
+    delete_documents,
+    compact_faiss_store,
+    needs_compaction,
+    current_snapshot,
+    load_snapshot,
+    publish_snapshot,
+    refit_projection
+)
 
 # Configure logging
 logging.basicConfig(
@@ -45,8 +58,44 @@ def parse_args():
         help="Directory containing files to ingest"
     )
     
+    parser.add_argument(
+        "--publish",
+        action="store_true",
+        help="Add to the latest index snapshot and publish a new one for reader workers "
+             "(only when no writer server is running)"
+    )
+    
+    parser.add_argument(
+        "--refit-projection",
+        action="store_true",
+        help="Refit the EMBEDDING_REDUCTION projection on every chunk in the index (re-embedding them if "
+             "the index is already reduced), then save or --publish it; runs after any ingestion"
+    )
+    
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep watching --directory (default: DOCUMENTS_DIR) and index added, modified "
+             "and deleted files as they change"
+    )
+    
+    parser.add_argument(
+        "--state-file",
+        default=WATCH_STATE_FILE,
+        help="Where --watch records which file versions are indexed"
+    )
+    
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=WATCH_INTERVAL,
+        help="Seconds between directory scans in --watch mode"
+    )
+    
     return parser.parse_args()
 
+SUPPORTED_EXTENSIONS = [".pdf", ".docx", ".doc"]
+
 def get_files_from_directory(directory: str) -> List[str]:
     """Get all PDF and DOCX files from a directory."""
     directory_path = Path(directory)
@@ -54,15 +103,90 @@ def get_files_from_directory(directory: str) -> List[str]:
         raise ValueError(f"Directory not found: {directory}")
     
     files = []
-    for ext in [".pdf", ".docx", ".doc"]:
+    for ext in SUPPORTED_EXTENSIONS:
         files.extend([str(f) for f in directory_path.glob(f"**/*{ext}")])
     
     return files
 
+def load_latest_store():
+    """Load the latest published snapshot, or the default store if none exists."""
+    embedding_model = get_embeddings()
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return get_vector_store(embedding_model=embedding_model)
+    return load_snapshot(snapshot[1], embedding_model, mmap=False)
+
+def refit(args, vector_store=None) -> None:
+    """Refit the embedding reduction projection of the FAISS index and store the result."""
+    try:
+        if vector_store is None:
+            vector_store = load_latest_store() if args.publish else get_vector_store(embedding_model=get_embeddings())
+        vector_store = refit_projection(vector_store)
+        if args.publish:
+            version = publish_snapshot(vector_store)
+            logger.info(f"Published index snapshot {version}")
+        else:
+            save_vector_store(vector_store)
+    except Exception as e:
+        logger.error(f"Error refitting projection: {str(e)}")
+        sys.exit(1)
+
+def watch(args) -> None:
+    """Index changes to a directory until interrupted."""
+    directory = args.directory or str(DOCUMENTS_DIR)
+    document_processor = DocumentProcessor()
+    vector_store = load_latest_store() if args.publish else get_vector_store(embedding_model=get_embeddings())
+    watcher = DirectoryWatcher(directory, args.state_file, SUPPORTED_EXTENSIONS)
+    
+    def apply(changes):
+        nonlocal vector_store
+        documents = []
+        failed = set()
+        for file_path in changes["added"] + changes["modified"]:
+            try:
+                documents.extend(document_processor.process_file(file_path))
+            except Exception as e:
+                # The indexed version stays and the file is retried on a later poll
+                logger.error(f"Error processing {file_path}: {str(e)}")
+                failed.add(file_path)
+        applied = {change: [path for path in paths if path not in failed] for change, paths in changes.items()}
+        
+        # Added files are cleared too, in case an interrupted run already indexed them
+        delete_documents(
+            vector_store,
+            sources=[path for paths in applied.values() for path in paths],
+            parent_store=document_processor.parent_store
+        )
+        if documents:
+            add_documents(vector_store, documents)
+        if needs_compaction(vector_store):
+            vector_store = compact_faiss_store(vector_store)
+        
+        if args.publish:
+            version = publish_snapshot(vector_store)
+            logger.info(f"Published index snapshot {version}")
+        else:
+            save_vector_store(vector_store)
+        logger.info(f"Indexed {len(documents)} chunks")
+        return applied
+    
+    try:
+        watcher.run(apply, interval=args.interval)
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
+
 def main():
     """Main entry point for the script."""
     args = parse_args()
     
+    if args.watch:
+        watch(args)
+        return
+    
+    if args.refit_projection and not (args.files or args.urls or args.directory):
+        refit(args)
+        return
+    
     # Check if at least one source is provided
     if not args.files and not args.urls and not args.directory:
         logger.error("No files or URLs provided. Use --files, --urls, or --directory")
@@ -95,7 +219,10 @@ def main():
     try:
         # Create processor and RAG chain
         document_processor = DocumentProcessor()
-        rag_chain = RAGChain()
+        if args.publish:
+            rag_chain = RAGChain(vector_store=load_latest_store())
+        else:
+            rag_chain = RAGChain()
         
         # Process documents
         documents = document_processor.process_documents(files, urls)
@@ -105,6 +232,12 @@ def main():
         rag_chain.add_documents(documents)
         logger.info("Documents added to vector store successfully")
         
+        if args.refit_projection:
+            refit(args, rag_chain.vector_store)
+        elif args.publish:
+            version = publish_snapshot(rag_chain.vector_store)
+            logger.info(f"Published index snapshot {version}")
+        
     except Exception as e:
         logger.error(f"Error ingesting documents: {str(e)}")
         sys.exit(1)
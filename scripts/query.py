@@ -1,17 +1,27 @@
 #!/usr/bin/env python
 """
 Script to query the RAG system from the command line.
+
+Besides answering a single question, it can answer a batch of questions from a
+file or stdin with one warm RAG chain (streaming JSONL answers), or run as a
+long-lived daemon on a Unix socket that later invocations query with --socket.
 """
 import argparse
+import json
 import logging
+import os
+import socket
+import socketserver
 import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, Dict, Iterator
 
 # Add the parent directory to the path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 
-from src.rag import RAGChain
-
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,21 +36,192 @@ def parse_args():
     # Add arguments
     parser.add_argument(
         "question",
+        nargs="?",
         help="Question to ask the RAG system"
     )
     
+    parser.add_argument(
+        "--server", "-s",
+        help="Base URL of a running RAG API (e.g. http://localhost:8000); skips loading models locally"
+    )
+    
+    parser.add_argument(
+        "--batch", "-b",
+        help="File with one question per line (plain text or JSON with 'question' and optional 'id'); "
+             "'-' reads stdin. Answers are written to stdout as JSONL"
+    )
+    
+    parser.add_argument(
+        "--parallel", "-p",
+        type=int,
+        default=1,
+        help="Number of questions answered concurrently in batch mode"
+    )
+    
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        help="Emit batch answers in input order instead of as they complete"
+    )
+    
+    parser.add_argument(
+        "--serve-socket",
+        help="Run as a daemon on this Unix socket, keeping the RAG chain warm between queries"
+    )
+    
+    parser.add_argument(
+        "--socket",
+        help="Unix socket of a running query daemon to send questions to"
+    )
+    
     return parser.parse_args()
 
+def query_server(server: str, question: str) -> dict:
+    """Send a question to a running RAG API."""
+    request = urllib.request.Request(
+        f"{server.rstrip('/')}/query",
+        data=json.dumps({"question": question}).encode("utf-8"),
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+def query_socket(socket_path: str, question: str) -> dict:
+    """Send a question to a running query daemon."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        with sock.makefile("rwb") as stream:
+            stream.write(json.dumps({"question": question}).encode("utf-8") + b"\n")
+            stream.flush()
+            result = json.loads(stream.readline().decode("utf-8"))
+    if "error" in result:
+        raise RuntimeError(result["error"])
+    return result
+
+def create_local_chain():
+    """Build a RAG chain in this process."""
+    # Imported here so --server and --socket do not pay for langchain and model imports
+    from src.rag import RAGChain
+    
+    return RAGChain()
+
+def query_local(question: str) -> dict:
+    """Answer a question with a RAG chain built in this process."""
+    rag_chain = create_local_chain()
+    return rag_chain.query(question)
+
+def get_answerer(args) -> Callable[[str], dict]:
+    """Return a function answering one question with the selected backend."""
+    if args.server:
+        return lambda question: query_server(args.server, question)
+    if args.socket:
+        return lambda question: query_socket(args.socket, question)
+
+    rag_chain = create_local_chain()
+    return rag_chain.query
+
+def read_questions(source: str) -> Iterator[Dict[str, str]]:
+    """Read questions from a file or stdin, one per line."""
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    try:
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                item = json.loads(line)
+                yield {"id": item.get("id", line_number), "question": item["question"]}
+            else:
+                yield {"id": line_number, "question": line}
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+def answer_item(answer: Callable[[str], dict], item: Dict[str, str]) -> dict:
+    """Answer one batch item, capturing errors in the result."""
+    start = time.perf_counter()
+    try:
+        result = answer(item["question"])
+    except Exception as e:
+        result = {"error": str(e)}
+    result = {"id": item["id"], "question": item["question"], **result}
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+def run_batch(args) -> None:
+    """Answer a batch of questions, streaming JSONL results to stdout."""
+    answer = get_answerer(args)
+    items = read_questions(args.batch)
+
+    def emit(result: dict) -> None:
+        sys.stdout.write(json.dumps(result, default=str) + "\n")
+        sys.stdout.flush()
+
+    if args.parallel <= 1:
+        for item in items:
+            emit(answer_item(answer, item))
+        return
+
+    with ThreadPoolExecutor(max_workers=args.parallel) as executor:
+        futures = [executor.submit(answer_item, answer, item) for item in items]
+        for future in (futures if args.ordered else as_completed(futures)):
+            emit(future.result())
+
+class _QueryHandler(socketserver.StreamRequestHandler):
+    """Answer JSON-line questions on a daemon connection."""
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line.decode("utf-8"))
+                result = self.server.rag_chain.query(request["question"])
+            except Exception as e:
+                result = {"error": str(e)}
+            self.wfile.write(json.dumps(result, default=str).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+def serve_socket(socket_path: str) -> None:
+    """Run the query daemon on a Unix socket until interrupted."""
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    rag_chain = create_local_chain()
+    server = socketserver.ThreadingUnixStreamServer(socket_path, _QueryHandler)
+    server.daemon_threads = True
+    server.rag_chain = rag_chain
+    logger.info(f"Query daemon listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
 def main():
     """Main entry point for the script."""
     args = parse_args()
     
     try:
-        # Create RAG chain
-        rag_chain = RAGChain()
+        if args.serve_socket:
+            serve_socket(args.serve_socket)
+            return
+        if args.batch:
+            run_batch(args)
+            return
+        if not args.question:
+            logger.error("No question provided. Pass a question, --batch or --serve-socket")
+            sys.exit(1)
         
         # Query the system
-        result = rag_chain.query(args.question)
+        if args.server:
+            result = query_server(args.server, args.question)
+        elif args.socket:
+            result = query_socket(args.socket, args.question)
+        else:
+            result = query_local(args.question)
         
         # Print the answer
         print("\n" + "="*80)
@@ -1,17 +1,26 @@
+import asyncio
+import hmac
 import logging
 import os
-from typing import List, Optional
+import threading
+from contextlib import asynccontextmanager
+from typing import Dict, List, Literal, Optional
 from pathlib import Path
 import tempfile
+import time
 
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl
 
-from ..config import DOCUMENTS_DIR
-from ..document_processor import DocumentProcessor
-from ..rag import RAGChain
-from ..vectorstore import get_vector_store
+from ..config import (
+    DOCUMENTS_DIR, SERVING_ROLE, VECTOR_STORE_TYPE, BATCH_LLM_CONCURRENCY, MAX_BATCH_SIZE,
+    ADMIN_ENDPOINTS_ENABLED, ADMIN_TOKEN, PROFILE_MAX_SECONDS, RESPONSE_COMPRESSION
+)
+from ..metrics import REGISTRY
+from .responses import CompressionMiddleware, FastJSONResponse, dumps, select_fields
 
 # Configure logging
 logging.basicConfig(
@@ -20,13 +29,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Seconds between checks for a disconnected client while a query is running
+DISCONNECT_POLL_INTERVAL = 0.25
+
 # Models for API requests and responses
 class QueryRequest(BaseModel):
     question: str
+    include_timings: bool = False
+    # "full": source content and metadata, "ids": source document ids only, "answer": no sources
+    fields: Literal["full", "ids", "answer"] = "full"
 
 class QueryResponse(BaseModel):
     answer: str
-    sources: List[dict]
+    sources: Optional[List[dict]] = None
+    timings: Optional[Dict[str, float]] = None
+
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    max_concurrency: Optional[int] = None
+    stream: bool = False
+    fields: Literal["full", "ids", "answer"] = "full"
+
+class BatchQueryResult(BaseModel):
+    index: int
+    answer: str
+    sources: Optional[List[dict]] = None
+
+class BatchQueryResponse(BaseModel):
+    results: List[BatchQueryResult]
 
 class DocumentUploadResponse(BaseModel):
     message: str
@@ -35,16 +65,252 @@ class DocumentUploadResponse(BaseModel):
 class UrlProcessRequest(BaseModel):
     urls: List[HttpUrl]
 
-# Create global instances
-document_processor = DocumentProcessor()
-rag_chain = RAGChain()
+class DocumentDeleteRequest(BaseModel):
+    document_ids: List[str] = []
+    sources: List[str] = []
+
+class DocumentDeleteResponse(BaseModel):
+    message: str
+    deleted_count: int
+
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "rag_http_request_seconds",
+    "HTTP request duration",
+    ["method", "path", "status"]
+)
+
+STARTUP_SECONDS = REGISTRY.gauge(
+    "rag_startup_seconds",
+    "Time taken to load models and indexes at startup"
+)
+
+# Global instances, created by load_services() so importing this module stays cheap
+document_processor = None
+rag_chain = None
+services_ready = threading.Event()
+services_error: Optional[str] = None
+snapshot_watcher = None
+_services_lock = threading.Lock()
+_write_lock = threading.Lock()
+_compaction_lock = threading.Lock()
+_profile_lock = threading.Lock()
+# Set on shutdown; the background loader checks it between loading stages
+_shutdown = threading.Event()
+# Compaction restarts if the store is re-projected while it rebuilds
+COMPACTION_ATTEMPTS = 3
+
+def _load_rag_chain():
+    """Build the RAG chain for this process's serving role."""
+    from ..rag import RAGChain
+    from ..embeddings import get_embeddings
+    from ..vectorstore import current_snapshot, load_snapshot, SnapshotWatcher
+    
+    if SERVING_ROLE not in ("standalone", "writer", "reader"):
+        raise ValueError(f"Invalid serving role: {SERVING_ROLE}")
+    if SERVING_ROLE != "standalone" and VECTOR_STORE_TYPE.lower() != "faiss":
+        # Snapshots are FAISS only; failing here beats a 500 after every successful write
+        raise ValueError(
+            f"SERVING_ROLE={SERVING_ROLE} publishes FAISS snapshots and needs VECTOR_STORE_TYPE=faiss, "
+            f"not {VECTOR_STORE_TYPE}; serve other stores with SERVING_ROLE=standalone"
+        )
+    
+    if SERVING_ROLE == "standalone":
+        return RAGChain(), None
+    
+    embedding_model = get_embeddings()
+    snapshot = current_snapshot()
+    if snapshot is not None:
+        version, path = snapshot
+        logger.info(f"Loading vector store snapshot {version}")
+        # The writer mutates its store, so only readers memory-map it
+        chain = RAGChain(vector_store=load_snapshot(path, embedding_model, mmap=SERVING_ROLE == "reader"))
+    else:
+        from ..vectorstore import get_vector_store
+        chain = RAGChain(vector_store=get_vector_store(embedding_model=embedding_model))
+        version = None
+    
+    watcher = None
+    if SERVING_ROLE == "reader":
+        watcher = SnapshotWatcher(
+            embedding_model,
+            on_snapshot=lambda _, vector_store: chain.set_vector_store(vector_store),
+            current_version=version
+        )
+        watcher.start()
+    return chain, watcher
+
+def _publish_if_writer() -> None:
+    """Publish the writer's index so reader workers pick up the change."""
+    if SERVING_ROLE == "writer":
+        from ..vectorstore import publish_snapshot
+        publish_snapshot(rag_chain.vector_store)
+
+def _compact_index() -> None:
+    """Rebuild the FAISS index without deleted rows and swap it in."""
+    from ..vectorstore import compact_faiss_store, snapshot_live_rows, catch_up_compacted
+    
+    try:
+        # Only the snapshot and the swap hold the write lock; writes during the
+        # rebuild are carried over to the new index before it is swapped in
+        for attempt in range(COMPACTION_ATTEMPTS):
+            with _write_lock:
+                store = rag_chain.vector_store
+                snapshot = snapshot_live_rows(store)
+            compacted = compact_faiss_store(store, snapshot=snapshot)
+            with _write_lock:
+                if rag_chain.vector_store is not store:
+                    logger.warning("Vector store replaced during compaction; discarding the rebuilt index")
+                    return
+                if catch_up_compacted(compacted, store, since=snapshot[0]):
+                    rag_chain.set_vector_store(compacted)
+                    _publish_if_writer()
+                    return
+            # The store switched to reduced embeddings while rebuilding; start over from its new rows
+            logger.info("Vector store was re-projected during compaction; rebuilding")
+        logger.warning(f"Giving up compaction after {COMPACTION_ATTEMPTS} attempts")
+    except Exception as e:
+        logger.error(f"Error compacting index: {str(e)}")
+    finally:
+        _compaction_lock.release()
+
+def _replace_documents(sources: List[str], documents: list) -> None:
+    """Swap the chunks of ``sources`` for ``documents``; blocking, so run it off the event loop."""
+    with _write_lock:
+        rag_chain.delete_documents(sources=sources)
+        rag_chain.add_documents(documents)
+        _publish_if_writer()
+    _schedule_compaction()
+
+def _delete_documents(document_ids: List[str], sources: List[str]) -> int:
+    """Delete documents; blocking, so run it off the event loop."""
+    with _write_lock:
+        deleted = rag_chain.delete_documents(document_ids, sources)
+        if deleted:
+            _publish_if_writer()
+    _schedule_compaction()
+    return deleted
+
+def _schedule_compaction(force: bool = False) -> bool:
+    """Start a background compaction if the index is fragmented enough and none is running."""
+    from ..vectorstore import needs_compaction, fragmentation
+    
+    store = rag_chain.vector_store
+    if not (needs_compaction(store) or (force and fragmentation(store) > 0)):
+        return False
+    if not _compaction_lock.acquire(blocking=False):
+        return False
+    threading.Thread(target=_compact_index, name="index-compaction", daemon=True).start()
+    return True
+
+def require_writable() -> None:
+    """Reject ingestion on read-only reader workers."""
+    if SERVING_ROLE == "reader":
+        raise HTTPException(
+            status_code=409,
+            detail="This worker serves a read-only index snapshot; send ingestion requests to the writer"
+        )
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """Check the admin token, when one is configured."""
+    if ADMIN_TOKEN and not hmac.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def load_services() -> None:
+    """
+    Import the heavy modules and build the document processor and RAG chain.
+    
+    Runs in a background thread from the lifespan hook; can also be called
+    directly (e.g. by scripts or benchmarks) to load synchronously. Returns
+    early, leaving the services unloaded, once shutdown has begun.
+    """
+    global document_processor, rag_chain, services_error, snapshot_watcher
+    
+    with _services_lock:
+        if services_ready.is_set():
+            return
+        
+        start = time.perf_counter()
+        try:
+            from ..document_processor import DocumentProcessor
+            
+            document_processor = DocumentProcessor()
+            if _shutdown.is_set():
+                return
+            chain, watcher = _load_rag_chain()
+            if _shutdown.is_set():
+                if watcher is not None:
+                    watcher.stop()
+                return
+            rag_chain, snapshot_watcher = chain, watcher
+            services_error = None
+            services_ready.set()
+            STARTUP_SECONDS.set(time.perf_counter() - start)
+            logger.info(f"Models and index loaded in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            services_error = str(e)
+            logger.error(f"Error loading models and index: {str(e)}")
+
+def require_services() -> None:
+    """Reject requests with 503 until models and indexes are loaded."""
+    if not services_ready.is_set():
+        detail = f"Service failed to load: {services_error}" if services_error else "Service is loading"
+        raise HTTPException(status_code=503, detail=detail, headers={"Retry-After": "5"})
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Bind the port immediately and load models and indexes in the background."""
+    _shutdown.clear()
+    loader = threading.Thread(target=load_services, name="service-loader", daemon=True)
+    loader.start()
+    yield
+    # A running thread cannot be cancelled: ask the loader to stop, then wait for it
+    _shutdown.set()
+    await asyncio.to_thread(loader.join)
+    if snapshot_watcher is not None:
+        snapshot_watcher.stop()
+
+class RequestMetricsMiddleware:
+    """
+    Records request durations per route and status.
+    
+    A plain ASGI middleware rather than ``@app.middleware("http")``: it leaves
+    ``receive`` untouched, so handlers can still detect client disconnects, and
+    it times streaming responses until their last chunk is sent.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start = time.perf_counter()
+        status = 500
+        
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"],
+                path=getattr(scope.get("route"), "path", "unmatched"),
+                status=status
+            ).observe(time.perf_counter() - start)
 
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application."""
     app = FastAPI(
         title="RAG API",
         description="API for Retrieval-Augmented Generation",
-        version="1.0.0"
+        version="1.0.0",
+        lifespan=lifespan
     )
     
     # Add CORS middleware
@@ -56,21 +322,88 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    if RESPONSE_COMPRESSION:
+        app.add_middleware(CompressionMiddleware)
+    
+    # Added last so it is outermost and its timings include compression
+    app.add_middleware(RequestMetricsMiddleware)
+    
     # Ensure documents directory exists
     DOCUMENTS_DIR.mkdir(exist_ok=True, parents=True)
     
     # Routes
-    @app.post("/query", response_model=QueryResponse)
-    async def query(request: QueryRequest):
+    @app.get("/health")
+    async def health():
+        """Liveness probe: the process is up and serving HTTP."""
+        return {"status": "ok"}
+    
+    @app.get("/ready")
+    async def ready():
+        """Readiness probe: models and indexes are loaded."""
+        require_services()
+        return {"status": "ready"}
+    
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        """Expose metrics in the Prometheus text format."""
+        return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+    
+    @app.post("/query", response_model=QueryResponse, response_model_exclude_none=True,
+              dependencies=[Depends(require_services)])
+    async def query(request: QueryRequest, http_request: Request):
         """Query the RAG system with a question."""
         try:
-            result = rag_chain.query(request.question)
-            return result
+            # Generation runs in a worker thread and is cancelled if the client disconnects
+            cancel_event = threading.Event()
+            task = asyncio.ensure_future(run_in_threadpool(
+                rag_chain.query,
+                request.question,
+                include_timings=request.include_timings,
+                cancel_event=cancel_event
+            ))
+            while not task.done():
+                await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+                if not task.done() and await http_request.is_disconnected():
+                    logger.info("Client disconnected, cancelling query")
+                    cancel_event.set()
+                    break
+            result = await task
+            return FastJSONResponse(select_fields(result, request.fields))
         except Exception as e:
             logger.error(f"Error processing query: {str(e)}")
             raise HTTPException(status_code=500, detail=str(e))
     
-    @app.post("/upload", response_model=DocumentUploadResponse)
+    @app.post("/query/batch", response_model=BatchQueryResponse, dependencies=[Depends(require_services)])
+    async def query_batch(request: BatchQueryRequest):
+        """
+        Answer many questions in one request.
+        
+        With ``stream`` the results are sent as NDJSON lines in completion order,
+        otherwise as a single JSON document in input order.
+        """
+        if len(request.questions) > MAX_BATCH_SIZE:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Batch of {len(request.questions)} questions exceeds the limit of {MAX_BATCH_SIZE}"
+            )
+        concurrency = min(request.max_concurrency or BATCH_LLM_CONCURRENCY, BATCH_LLM_CONCURRENCY)
+        results = rag_chain.batch_query(request.questions, max_concurrency=concurrency)
+        
+        if request.stream:
+            lines = (dumps({"index": index, **select_fields(result, request.fields)}) + b"\n" for index, result in results)
+            return StreamingResponse(lines, media_type="application/x-ndjson")
+        
+        try:
+            collected = await run_in_threadpool(lambda: sorted(results, key=lambda item: item[0]))
+            return FastJSONResponse({
+                "results": [{"index": index, **select_fields(result, request.fields)} for index, result in collected]
+            })
+        except Exception as e:
+            logger.error(f"Error processing batch query: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    @app.post("/upload", response_model=DocumentUploadResponse,
+              dependencies=[Depends(require_writable), Depends(require_services)])
     async def upload_files(files: List[UploadFile] = File(...)):
         """Upload and process documents."""
         try:
@@ -97,10 +430,10 @@ def create_app() -> FastAPI:
                 file_paths.append(str(file_path))
             
             # Process documents
-            documents = document_processor.process_documents(file_paths)
+            documents = await run_in_threadpool(document_processor.process_documents, file_paths)
             
-            # Add to vector store
-            rag_chain.add_documents(documents)
+            # Replace earlier versions of the files in the vector store
+            await run_in_threadpool(_replace_documents, file_paths, documents)
             
             return {
                 "message": f"Successfully processed {len(file_paths)} files",
@@ -113,15 +446,17 @@ def create_app() -> FastAPI:
             logger.error(f"Error processing files: {str(e)}")
             raise HTTPException(status_code=500, detail=str(e))
     
-    @app.post("/process-urls", response_model=DocumentUploadResponse)
+    @app.post("/process-urls", response_model=DocumentUploadResponse,
+              dependencies=[Depends(require_writable), Depends(require_services)])
     async def process_urls(request: UrlProcessRequest):
         """Process web URLs."""
         try:
             # Process URLs
-            documents = document_processor.process_documents([], urls=[str(url) for url in request.urls])
+            urls = [str(url) for url in request.urls]
+            documents = await run_in_threadpool(document_processor.process_documents, [], urls=urls)
             
-            # Add to vector store
-            rag_chain.add_documents(documents)
+            # Replace earlier versions of the pages in the vector store
+            await run_in_threadpool(_replace_documents, urls, documents)
             
             return {
                 "message": f"Successfully processed {len(request.urls)} URLs",
@@ -132,4 +467,59 @@ def create_app() -> FastAPI:
             logger.error(f"Error processing URLs: {str(e)}")
             raise HTTPException(status_code=500, detail=str(e))
     
-    return app
\ No newline at end of file
+    @app.delete("/documents", response_model=DocumentDeleteResponse,
+                dependencies=[Depends(require_writable), Depends(require_services)])
+    async def delete_documents(request: DocumentDeleteRequest):
+        """Delete documents by document_id or source."""
+        if not request.document_ids and not request.sources:
+            raise HTTPException(status_code=400, detail="Provide document_ids or sources to delete")
+        try:
+            deleted = await run_in_threadpool(_delete_documents, request.document_ids, request.sources)
+            
+            return {
+                "message": f"Deleted {deleted} chunks",
+                "deleted_count": deleted
+            }
+        
+        except Exception as e:
+            logger.error(f"Error deleting documents: {str(e)}")
+            raise HTTPException(status_code=500, detail=str(e))
+    
+    @app.post("/index/compact", status_code=202,
+              dependencies=[Depends(require_writable), Depends(require_services)])
+    async def compact_index():
+        """Rebuild the index without deleted rows in the background."""
+        started = await run_in_threadpool(_schedule_compaction, True)
+        return {"message": "Compaction started" if started else "Nothing to compact or compaction already running"}
+    
+    if ADMIN_ENDPOINTS_ENABLED:
+        _add_admin_routes(app)
+    
+    return app
+
+def _add_admin_routes(app: FastAPI) -> None:
+    """Register the diagnostics endpoints; not registered at all unless enabled."""
+    from .diagnostics import sample_stacks, folded, memory_report
+    
+    def profile_stacks(seconds: float, interval: float, include_idle: bool):
+        try:
+            return sample_stacks(seconds, interval, include_idle)
+        finally:
+            _profile_lock.release()
+    
+    @app.get("/admin/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+    async def profile(
+        seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+        interval: float = Query(0.01, ge=0.001, le=1.0),
+        include_idle: bool = False
+    ):
+        """Sample all threads' stacks for ``seconds`` and return them in folded (flamegraph) format."""
+        if not _profile_lock.acquire(blocking=False):
+            raise HTTPException(status_code=409, detail="A profile is already running")
+        stacks = await run_in_threadpool(profile_stacks, seconds, interval, include_idle)
+        return PlainTextResponse(folded(stacks), headers={"X-Profile-Samples": str(sum(stacks.values()))})
+    
+    @app.get("/admin/memory", dependencies=[Depends(require_admin)])
+    async def memory():
+        """Resident memory of this process broken down by index, docstore, embedding model and LLM."""
+        return await run_in_threadpool(memory_report, rag_chain)
\ No newline at end of file
@@ -0,0 +1,201 @@
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Leaf frames of threads blocked waiting for work; dropped from profiles unless requested
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+}
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+
+def _is_idle(frame) -> bool:
+    return (Path(frame.f_code.co_filename).name, frame.f_code.co_name) in IDLE_FRAMES
+
+def sample_stacks(seconds: float, interval: float = 0.01, include_idle: bool = False) -> Counter:
+    """
+    Sample the Python stacks of all threads for ``seconds``.
+
+    A statistical profiler: every ``interval`` seconds the calling thread reads
+    ``sys._current_frames()`` and counts each thread's stack. Nothing is
+    instrumented, so the only cost is the sampling thread itself, and only while
+    a profile is running. Native code (FAISS, torch) shows up as time spent in
+    the Python frame that called it.
+
+    Returns:
+        Counter of folded stacks ("thread;outer;...;inner") to sample counts
+    """
+    me = threading.get_ident()
+    deadline = time.perf_counter() + seconds
+    stacks: Counter = Counter()
+    while time.perf_counter() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me or (not include_idle and _is_idle(frame)):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}"))
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+    return stacks
+
+def folded(stacks: Counter) -> str:
+    """Render stacks in the folded format read by flamegraph.pl, inferno and speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+def _process_memory() -> Dict[str, Optional[int]]:
+    """Resident and peak resident set size of this process in bytes."""
+    memory = {"rss_bytes": None, "peak_rss_bytes": None}
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key == "VmRSS":
+                    memory["rss_bytes"] = int(value.split()[0]) * 1024
+                elif key == "VmHWM":
+                    memory["peak_rss_bytes"] = int(value.split()[0]) * 1024
+    except OSError:
+        import resource
+        # Linux reports kilobytes, macOS bytes
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory["peak_rss_bytes"] = peak if sys.platform == "darwin" else peak * 1024
+    return memory
+
+def faiss_index_bytes(index) -> int:
+    """
+    Estimate the memory held by a FAISS index without serializing it.
+
+    Counts the stored codes plus HNSW graph links and IVF list ids and
+    centroids. Memory-mapped indexes only add to RSS for the pages read.
+    """
+    import faiss
+
+    index = faiss.downcast_index(index)
+    try:
+        code_size = index.sa_code_size()
+    except RuntimeError:
+        code_size = index.d * 4
+    total = index.ntotal * code_size
+    if isinstance(index, faiss.IndexHNSW):
+        hnsw = index.hnsw
+        total += hnsw.neighbors.size() * 4 + hnsw.offsets.size() * 8 + hnsw.levels.size() * 4
+    if isinstance(index, faiss.IndexIVF):
+        total += index.ntotal * 8 + faiss_index_bytes(index.quantizer)
+    return total
+
+def _deep_size(obj: Any, seen: set) -> int:
+    """Size of ``obj`` and the containers and strings it references."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "page_content"):
+        size += _deep_size(obj.page_content, seen) + _deep_size(getattr(obj, "metadata", {}), seen)
+    return size
+
+def _tensor_bytes(tensors: Iterable) -> int:
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+def _module_bytes(module) -> int:
+    """Parameter and buffer bytes of a torch module, or 0 for anything else."""
+    if not (hasattr(module, "parameters") and hasattr(module, "buffers")):
+        return 0
+    return _tensor_bytes(module.parameters()) + _tensor_bytes(module.buffers())
+
+def _unwrap_embeddings(embeddings):
+    # Instrumented and reduced embeddings wrap the model in ``embeddings``
+    while "embeddings" in getattr(embeddings, "__dict__", {}):
+        embeddings = embeddings.__dict__["embeddings"]
+    return embeddings
+
+def _vector_store_memory(store) -> Dict[str, Any]:
+    index = getattr(store, "index", None)
+    if index is None:
+        # Chroma keeps its index in its own client; not broken down here
+        return {"type": type(store).__name__}
+    seen: set = set()
+    docstore = getattr(getattr(store, "docstore", None), "_dict", {})
+    if hasattr(index, "memory_bytes"):
+        # Disk index: PQ codes and cached blocks in memory, the graph on disk
+        index_bytes = index.memory_bytes()
+    else:
+        index_bytes = faiss_index_bytes(index)
+    return {
+        "type": type(store).__name__,
+        "vectors": index.ntotal,
+        "index_bytes": index_bytes,
+        "docstore_documents": len(docstore),
+        "docstore_bytes": _deep_size(docstore, seen) + _deep_size(store.index_to_docstore_id, seen),
+    }
+
+def _embedding_memory(embeddings) -> Dict[str, Any]:
+    model = _unwrap_embeddings(embeddings)
+    report = {"type": type(model).__name__, "parameter_bytes": _module_bytes(getattr(model, "client", None))}
+    projection = getattr(embeddings, "projection", None)
+    if projection is not None:
+        report["projection_bytes"] = projection.mean.nbytes + projection.components.nbytes
+    return report
+
+def _llm_memory(llm) -> Dict[str, Any]:
+    report = {"type": type(llm).__name__}
+    if getattr(llm, "model", None) is not None and hasattr(llm.model, "parameters"):
+        report["parameter_bytes"] = _module_bytes(llm.model)
+        if getattr(llm, "draft_model", None) is not None:
+            report["draft_parameter_bytes"] = _module_bytes(llm.draft_model)
+        past_key_values = getattr(getattr(llm, "prefix_cache", None), "_past_key_values", None)
+        if past_key_values is not None:
+            report["prefix_cache_bytes"] = _tensor_bytes(
+                tensor for layer in past_key_values for tensor in layer
+            )
+    elif getattr(llm, "model_path", None):
+        # llama.cpp memory-maps the GGUF file
+        report["model_file_bytes"] = os.path.getsize(llm.model_path)
+    else:
+        report["remote"] = True
+    return report
+
+def memory_report(rag_chain) -> Dict[str, Any]:
+    """
+    Break down the resident memory of this process by component of ``rag_chain``.
+
+    Component sizes are estimates from the objects' own bookkeeping (index
+    codes, tensor sizes, Python object sizes); ``unaccounted_bytes`` is what RSS
+    holds beyond them (interpreter, libraries, allocator slack, caches).
+    """
+    report: Dict[str, Any] = _process_memory()
+    if rag_chain is None:
+        return report
+
+    store = rag_chain.vector_store
+    components = {
+        "vector_store": _vector_store_memory(store),
+        "embeddings": _embedding_memory(getattr(store, "embeddings", None)),
+        "llm": _llm_memory(rag_chain.llm),
+    }
+    report["components"] = components
+    accounted = sum(
+        value for component in components.values()
+        for key, value in component.items() if key.endswith("_bytes") and key != "model_file_bytes"
+    )
+    report["accounted_bytes"] = accounted
+    if report["rss_bytes"] is not None:
+        report["unaccounted_bytes"] = report["rss_bytes"] - accounted
+    return report
@@ -0,0 +1,177 @@
+from typing import Any, Dict, Optional
+import json
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from ..config import COMPRESSION_MIN_SIZE
+
+# Response shapes selectable with the ``fields`` request option
+FIELD_SETS = ("full", "ids", "answer")
+
+# Metadata kept per source with fields="ids"
+SOURCE_ID_KEYS = ("document_id", "source")
+
+GZIP_LEVEL = 6
+# Brotli's default (11) is far too slow for per-request compression
+BROTLI_QUALITY = 4
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def select_fields(result: Dict[str, Any], fields: str) -> Dict[str, Any]:
+    """
+    Reduce a query result to the requested fields.
+
+    "full" keeps every source's content and metadata, "ids" keeps only each
+    source's document id and source, "answer" drops the sources.
+    """
+    if fields == "full":
+        return result
+    selected = {key: value for key, value in result.items() if key != "sources"}
+    if fields == "ids":
+        selected["sources"] = [
+            {key: source["metadata"].get(key) for key in SOURCE_ID_KEYS}
+            for source in result.get("sources", [])
+        ]
+    return selected
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON with orjson when installed, falling back to the json module."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, default=str, option=orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            # e.g. non-string dictionary keys in document metadata
+            pass
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+class FastJSONResponse(Response):
+    """
+    JSON response serialized directly from plain dicts.
+
+    Returning it from a route skips FastAPI's response model validation and
+    ``jsonable_encoder`` pass, which dominate the cost of serializing large
+    results; the route's ``response_model`` still documents the schema.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    encodings = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        if name:
+            encodings[name.lower()] = quality
+    return encodings
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" (if brotli is installed) or "gzip" from an Accept-Encoding header."""
+    accepted = _accepted_encodings(accept_encoding)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._process, self._flush, self._finish = (
+                self._compressor.process, self._compressor.flush, self._compressor.finish
+            )
+        else:
+            # wbits 31: gzip container
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._process = self._compressor.compress
+            self._flush = lambda: self._compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = self._compressor.flush
+
+    def flush(self, data: bytes) -> bytes:
+        """Compress a chunk of a streamed body so the client can decode it right away."""
+        return self._process(data) + self._flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self._process(data) + self._finish()
+
+def _compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return "content-encoding" not in headers and (content_type.startswith("text/") or "json" in content_type)
+
+class CompressionMiddleware:
+    """
+    Compresses JSON and text responses with brotli or gzip.
+
+    A single-message body is compressed only when it is at least
+    ``minimum_size`` bytes; streamed bodies (e.g. NDJSON batch results) are
+    always compressed, flushing after every chunk so no result is held back.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if passthrough or message["type"] not in ("http.response.start", "http.response.body"):
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                # Hold the headers until the first body chunk shows whether to compress
+                start_message = message
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=list(start_message["headers"]))
+                if not _compressible(headers) or (not more_body and len(body) < self.minimum_size):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding)
+                body = compressor.flush(body) if more_body else compressor.finish(body)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send({**start_message, "headers": headers.raw})
+            else:
+                body = compressor.flush(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
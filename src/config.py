@@ -22,19 +22,147 @@ LOCAL_MODEL_NAME = os.getenv("LOCAL_MODEL_NAME", "mistral")
 API_MODEL_NAME = os.getenv("API_MODEL_NAME", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 USE_OLLAMA = os.getenv("USE_OLLAMA", "true").lower() == "true"
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+# Comma-separated Ollama servers to load balance across (defaults to OLLAMA_BASE_URL)
+OLLAMA_BASE_URLS = [url.strip() for url in os.getenv("OLLAMA_BASE_URLS", OLLAMA_BASE_URL).split(",") if url.strip()]
+# Options: "least_outstanding" or "latency" (outstanding requests weighted by recent latency)
+LLM_ROUTING_STRATEGY = os.getenv("LLM_ROUTING_STRATEGY", "least_outstanding")
+LLM_HEALTH_CHECK_INTERVAL = float(os.getenv("LLM_HEALTH_CHECK_INTERVAL", "10"))
+# Smaller Ollama model for short, simple questions; empty disables model routing
+SMALL_MODEL_NAME = os.getenv("SMALL_MODEL_NAME", "")
+SMALL_MODEL_MAX_WORDS = int(os.getenv("SMALL_MODEL_MAX_WORDS", "12"))
+# How long Ollama keeps the model (and its cached prompt prefix) loaded between requests
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Reuse the KV state of the fixed prompt prefix on the local transformers path
+PREFIX_CACHE_ENABLED = os.getenv("PREFIX_CACHE_ENABLED", "true").lower() == "true"
+# Small model proposing tokens for speculative decoding on the transformers path; empty disables
+DRAFT_MODEL_NAME = os.getenv("DRAFT_MODEL_NAME", "")
+# "|"-separated strings that end an answer ("\n" means newline)
+STOP_SEQUENCES = [s.replace("\\n", "\n") for s in os.getenv("STOP_SEQUENCES", "\\nQuestion:|\\nContext:").split("|") if s]
+# Answer length limits (new tokens) for simple, ordinary and complex questions
+ADAPTIVE_MAX_TOKENS = os.getenv("ADAPTIVE_MAX_TOKENS", "true").lower() == "true"
+MAX_NEW_TOKENS_SHORT = int(os.getenv("MAX_NEW_TOKENS_SHORT", "128"))
+MAX_NEW_TOKENS = int(os.getenv("MAX_NEW_TOKENS", "384"))
+MAX_NEW_TOKENS_LONG = int(os.getenv("MAX_NEW_TOKENS_LONG", "768"))
+
+# Local (non-Ollama) model quantization on CPU: "none", "int8" (dynamic int8 linear
+# layers, converted once and cached) or "gguf" (llama.cpp with GGUF_MODEL)
+LOCAL_LLM_QUANTIZATION = os.getenv("LOCAL_LLM_QUANTIZATION", "none")
+# Local .gguf path or "repo_id:filename" on the Hugging Face Hub
+GGUF_MODEL = os.getenv("GGUF_MODEL", "")
+LLM_CPU_THREADS = int(os.getenv("LLM_CPU_THREADS", "0"))
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", str(DATA_DIR / "models"))
+
+# LLM client settings (per backend)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "8"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "120"))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "60"))
 
 # Embedding settings
 EMBEDDING_MODE = os.getenv("EMBEDDING_MODE", "local")
 LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
 API_EMBEDDING_MODEL = os.getenv("API_EMBEDDING_MODEL", "")
+# "cpu" or "cuda"; empty means detect (which imports torch)
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE", "")
 
 # Server settings
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000"))
+WORKERS = int(os.getenv("WORKERS", "1"))
+# "standalone" (single process reads and writes), "writer" (owns ingestion and
+# publishes index snapshots) or "reader" (serves queries from the latest snapshot)
+SERVING_ROLE = os.getenv("SERVING_ROLE", "standalone")
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", str(Path(VECTOR_DB_PATH) / "snapshots"))
+SNAPSHOT_POLL_INTERVAL = float(os.getenv("SNAPSHOT_POLL_INTERVAL", "2.0"))
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "3"))
+SNAPSHOT_MMAP = os.getenv("SNAPSHOT_MMAP", "true").lower() == "true"
+# Compress JSON responses with brotli (if installed) or gzip when the client accepts it;
+# single-message bodies under COMPRESSION_MIN_SIZE bytes are sent as is
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "true").lower() == "true"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+# /admin/profile and /admin/memory diagnostics (off by default); when ADMIN_TOKEN is set
+# requests must send it in the X-Admin-Token header
+ADMIN_ENDPOINTS_ENABLED = os.getenv("ADMIN_ENDPOINTS_ENABLED", "false").lower() == "true"
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
 
 # Chunking settings
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+# Options: "recursive" (fixed-size character chunks) or "structure" (layout-aware)
+CHUNKING_MODE = os.getenv("CHUNKING_MODE", "recursive")
+STRUCTURE_CHUNK_OVERLAP = int(os.getenv("STRUCTURE_CHUNK_OVERLAP", "0"))
+# Store the enclosing section of each chunk and send it to the LLM instead of the chunk
+USE_PARENT_CHUNKS = os.getenv("USE_PARENT_CHUNKS", "false").lower() == "true"
+PARENT_CHUNK_SIZE = int(os.getenv("PARENT_CHUNK_SIZE", "4000"))
+# Parent sections are kept here, once per section, keyed by the chunks' parent_id
+PARENT_STORE_DIR = os.getenv("PARENT_STORE_DIR", str(Path(VECTOR_DB_PATH) / "parents"))
+
+# Optional dimensionality reduction between the embedding model and FAISS:
+# "none", "pca" (fitted once PCA_SAMPLE_SIZE chunks are indexed) or "truncate" (Matryoshka models)
+EMBEDDING_REDUCTION = os.getenv("EMBEDDING_REDUCTION", "none")
+REDUCED_DIMENSION = int(os.getenv("REDUCED_DIMENSION", "256"))
+PCA_SAMPLE_SIZE = int(os.getenv("PCA_SAMPLE_SIZE", "20000"))
+
+# Cache of text extracted from documents, keyed by file content hash ("" disables it)
+EXTRACTION_CACHE_DIR = os.getenv("EXTRACTION_CACHE_DIR", str(DATA_DIR / "extracted"))
+
+# scripts/ingest.py --watch: seconds between scans of DOCUMENTS_DIR, seconds a file must stay
+# unchanged before it is indexed, and where the indexed file state is kept
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "2.0"))
+WATCH_DEBOUNCE = float(os.getenv("WATCH_DEBOUNCE", "5.0"))
+WATCH_STATE_FILE = os.getenv("WATCH_STATE_FILE", str(DATA_DIR / "watch_state.json"))
+
+# Vector store settings
+# FAISS index factory string used when building an index, e.g. "Flat", "HNSW32", "IVF256,Flat"
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "Flat")
+# Chunks embedded and written per Chroma batch, and batches embedded concurrently
+CHROMA_BATCH_SIZE = int(os.getenv("CHROMA_BATCH_SIZE", "256"))
+CHROMA_EMBEDDING_WORKERS = int(os.getenv("CHROMA_EMBEDDING_WORKERS", "2"))
+# Rows per Parquet row group in bulk exports, and vectors used to train IVF/PQ indexes on import
+BULK_ROW_GROUP_SIZE = int(os.getenv("BULK_ROW_GROUP_SIZE", "10000"))
+BULK_TRAIN_SIZE = int(os.getenv("BULK_TRAIN_SIZE", "100000"))
+# Rebuild the FAISS index in the background once deleted rows exceed this share of it
+COMPACTION_THRESHOLD = float(os.getenv("COMPACTION_THRESHOLD", "0.2"))
+# Store used by the API and scripts: "faiss", "chroma" or "disk" (graph index on SSD for corpora
+# larger than RAM; only compressed vectors and DISK_CACHE_MB of index pages are kept in memory)
+VECTOR_STORE_TYPE = os.getenv("VECTOR_STORE_TYPE", "faiss")
+# Disk index graph: edges per node, candidate list size and pruning factor (>1 keeps longer edges) when building
+DISK_GRAPH_DEGREE = int(os.getenv("DISK_GRAPH_DEGREE", "48"))
+DISK_BUILD_LIST_SIZE = int(os.getenv("DISK_BUILD_LIST_SIZE", "96"))
+DISK_GRAPH_ALPHA = float(os.getenv("DISK_GRAPH_ALPHA", "1.2"))
+# Disk index search: candidate list size (recall vs. reads), nodes read concurrently per step,
+# bytes per in-memory product-quantized vector, memory for cached index pages, and whether reads
+# bypass the OS page cache (O_DIRECT) so DISK_CACHE_MB is the only cache
+DISK_SEARCH_LIST_SIZE = int(os.getenv("DISK_SEARCH_LIST_SIZE", "64"))
+DISK_BEAM_WIDTH = int(os.getenv("DISK_BEAM_WIDTH", "4"))
+DISK_PQ_BYTES = int(os.getenv("DISK_PQ_BYTES", "32"))
+DISK_CACHE_MB = int(os.getenv("DISK_CACHE_MB", "256"))
+DISK_DIRECT_IO = os.getenv("DISK_DIRECT_IO", "false").lower() == "true"
 
 # Retrieval settings
-TOP_K_RETRIEVAL = 5
\ No newline at end of file
+TOP_K_RETRIEVAL = 5
+# Choose k per query from the similarity scores instead of always sending TOP_K_RETRIEVAL chunks:
+# keep between ADAPTIVE_K_MIN and ADAPTIVE_K_MAX results, stopping at the first result scoring
+# below ADAPTIVE_K_SCORE_RATIO times the best score, or at the largest drop between neighbouring
+# scores if it is at least ADAPTIVE_K_MIN_GAP (scores are cosine similarities)
+ADAPTIVE_K = os.getenv("ADAPTIVE_K", "false").lower() == "true"
+ADAPTIVE_K_MIN = int(os.getenv("ADAPTIVE_K_MIN", "2"))
+ADAPTIVE_K_MAX = int(os.getenv("ADAPTIVE_K_MAX", "8"))
+ADAPTIVE_K_SCORE_RATIO = float(os.getenv("ADAPTIVE_K_SCORE_RATIO", "0.85"))
+ADAPTIVE_K_MIN_GAP = float(os.getenv("ADAPTIVE_K_MIN_GAP", "0.05"))
+# Two-stage FAISS retrieval: rank documents by their chunk centroids first and search only the
+# chunks of the ROUTING_DOCUMENTS best ones (0 searches every chunk); DOCUMENT_CENTROIDS is the
+# number of centroids (k-means) kept per document
+ROUTING_DOCUMENTS = int(os.getenv("ROUTING_DOCUMENTS", "0"))
+DOCUMENT_CENTROIDS = int(os.getenv("DOCUMENT_CENTROIDS", "1"))
+# "similarity" or "mmr" (diverse top-k chosen by Maximal Marginal Relevance)
+SEARCH_TYPE = os.getenv("SEARCH_TYPE", "similarity")
+MMR_FETCH_K = int(os.getenv("MMR_FETCH_K", "20"))
+# 1 ranks purely by relevance, 0 purely by diversity
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))
+# Concurrent LLM calls per /query/batch request and the largest accepted batch
+BATCH_LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
\ No newline at end of file
@@ -1,2 +1,6 @@
 from .processor import DocumentProcessor
-from .loaders import PDFLoader, DocxLoader, WebLoader
\ No newline at end of file
+from .loaders import PDFLoader, DocxLoader, WebLoader
+from .structure import StructureAwareSplitter
+from .watcher import DirectoryWatcher
+from .text_cache import ExtractionCache
+from .parents import ParentStore
@@ -1,4 +1,8 @@
 import logging
+import re
+from statistics import median
+from typing import List, Dict, Any
+
 from langchain_community.document_loaders import (
     PyMuPDFLoader,
     PDFPlumberLoader,
@@ -10,11 +14,50 @@ from langchain_community.document_loaders import (
 
 logger = logging.getLogger(__name__)
 
+
+def make_element(element_type: str, text: str, level: int = 0, page: int = 0) -> Dict[str, Any]:
+    """Build a layout element as returned by the loaders' ``load_elements``."""
+    return {"type": element_type, "text": text, "level": level, "page": page}
+
+
+def elements_from_text(text: str) -> List[Dict[str, Any]]:
+    """
+    Derive layout elements from plain text.
+    
+    Blank lines separate paragraphs; markdown-style ``#`` lines are treated as headings.
+    """
+    elements = []
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if not block:
+            continue
+        match = re.match(r"^(#{1,6})\s+(.*)$", block)
+        if match and "\n" not in block:
+            elements.append(make_element("heading", match.group(2).strip(), level=len(match.group(1))))
+        else:
+            elements.append(make_element("paragraph", block))
+    return elements
+
+
+def _table_to_text(rows: List[List[Any]]) -> str:
+    """Render table rows as pipe-separated lines."""
+    lines = []
+    for row in rows:
+        cells = [" ".join(str(cell or "").split()) for cell in row]
+        if any(cells):
+            lines.append(" | ".join(cells))
+    return "\n".join(lines)
+
+
 class PDFLoader:
     """Loader for PDF documents using LangChain with PyMuPDF and pdfplumber fallback."""
     
     def load(self, file_path: str) -> str:
         """Extract text from a PDF file using LangChain loaders."""
+        return "\n".join(self.load_pages(file_path))
+    
+    def load_pages(self, file_path: str) -> List[str]:
+        """Extract the text of each page of a PDF file."""
         try:
             return self._load_with_pymupdf(file_path)
         except Exception as e:
@@ -25,17 +68,75 @@ class PDFLoader:
                 logger.error(f"Failed to extract text from PDF {file_path}: {str(e)}")
                 raise
     
-    def _load_with_pymupdf(self, file_path: str) -> str:
-        """Extract text using LangChain's PyMuPDFLoader."""
+    def _load_with_pymupdf(self, file_path: str) -> List[str]:
+        """Extract page texts using LangChain's PyMuPDFLoader."""
         loader = PyMuPDFLoader(file_path)
         documents = loader.load()
-        return "\n".join(doc.page_content for doc in documents)
+        return [doc.page_content for doc in documents]
 
-    def _load_with_pdfplumber(self, file_path: str) -> str:
-        """Extract text using LangChain's PDFPlumberLoader."""
+    def _load_with_pdfplumber(self, file_path: str) -> List[str]:
+        """Extract page texts using LangChain's PDFPlumberLoader."""
         loader = PDFPlumberLoader(file_path)
         documents = loader.load()
-        return "\n".join(doc.page_content for doc in documents)
+        return [doc.page_content for doc in documents]
+
+    def load_elements(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        Extract layout elements (headings, paragraphs, tables) from a PDF file.
+        
+        Headings are detected from font size relative to the document's body text,
+        tables with PyMuPDF's table finder when available.
+        """
+        import fitz  # PyMuPDF
+        
+        elements = []
+        with fitz.open(file_path) as pdf:
+            blocks = []
+            for page_number, page in enumerate(pdf, start=1):
+                table_rects = []
+                page_tables = []
+                if hasattr(page, "find_tables"):
+                    try:
+                        for table in page.find_tables().tables:
+                            table_rects.append(fitz.Rect(table.bbox))
+                            page_tables.append((table.bbox[1], _table_to_text(table.extract())))
+                    except Exception as e:
+                        logger.warning(f"Table detection failed on page {page_number} of {file_path}: {str(e)}")
+                
+                page_blocks = []
+                for block in page.get_text("dict")["blocks"]:
+                    if block.get("type") != 0:
+                        continue
+                    if any(fitz.Rect(block["bbox"]).intersects(rect) for rect in table_rects):
+                        continue
+                    spans = [span for line in block["lines"] for span in line["spans"] if span["text"].strip()]
+                    if not spans:
+                        continue
+                    text = "\n".join(
+                        "".join(span["text"] for span in line["spans"]).strip() for line in block["lines"]
+                    ).strip()
+                    size = max(span["size"] for span in spans)
+                    bold = all(span["flags"] & 16 for span in spans)
+                    page_blocks.append((block["bbox"][1], "text", text, size, bold))
+                
+                page_blocks.extend((y, "table", text, 0.0, False) for y, text in page_tables if text)
+                page_blocks.sort(key=lambda item: item[0])
+                blocks.extend((page_number,) + item[1:] for item in page_blocks)
+        
+        text_sizes = [size for _, kind, _, size, _ in blocks if kind == "text"]
+        body_size = median(text_sizes) if text_sizes else 0.0
+        heading_sizes = sorted({round(size) for size in text_sizes if size > body_size * 1.15}, reverse=True)
+        
+        for page_number, kind, text, size, bold in blocks:
+            if kind == "table":
+                elements.append(make_element("table", text, page=page_number))
+            elif len(text) < 200 and "\n" not in text and (size > body_size * 1.15 or bold):
+                level = heading_sizes.index(round(size)) + 1 if round(size) in heading_sizes else len(heading_sizes) + 1
+                elements.append(make_element("heading", text, level=level, page=page_number))
+            else:
+                elements.append(make_element("paragraph", text, page=page_number))
+        
+        return elements
 
 
 class DocxLoader:
@@ -51,6 +152,42 @@ class DocxLoader:
             logger.error(f"Failed to extract text from DOCX {file_path}: {str(e)}")
             raise
 
+    def load_elements(self, file_path: str) -> List[Dict[str, Any]]:
+        """Extract headings, paragraphs and tables from a DOCX file in document order."""
+        import docx
+        from docx.table import Table
+        from docx.text.paragraph import Paragraph
+        
+        try:
+            document = docx.Document(file_path)
+        except Exception as e:
+            logger.error(f"Failed to extract text from DOCX {file_path}: {str(e)}")
+            raise
+        
+        elements = []
+        for child in document.element.body.iterchildren():
+            tag = child.tag.rsplit("}", 1)[-1]
+            if tag == "p":
+                paragraph = Paragraph(child, document)
+                text = paragraph.text.strip()
+                if not text:
+                    continue
+                style = paragraph.style.name if paragraph.style is not None else ""
+                if style == "Title":
+                    elements.append(make_element("heading", text, level=1))
+                elif style.startswith("Heading"):
+                    digits = "".join(ch for ch in style if ch.isdigit())
+                    elements.append(make_element("heading", text, level=int(digits) if digits else 1))
+                else:
+                    elements.append(make_element("paragraph", text))
+            elif tag == "tbl":
+                table = Table(child, document)
+                text = _table_to_text([[cell.text for cell in row.cells] for row in table.rows])
+                if text:
+                    elements.append(make_element("table", text))
+        
+        return elements
+
 
 class TxtLoader:
     """Loader for TXT files using LangChain."""
@@ -0,0 +1,69 @@
+from pathlib import Path
+from typing import Dict, Iterable
+import json
+import logging
+import os
+
+from ..config import PARENT_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+def parent_document_id(parent_id: str) -> str:
+    """The ``document_id`` part of a ``"<document_id>:<section>"`` parent id."""
+    return parent_id.rpartition(":")[0]
+
+class ParentStore:
+    """
+    On-disk store of parent sections keyed by ``parent_id``.
+
+    Chunks only carry the ``parent_id`` of their enclosing section; the section
+    text is written here once per document (one JSON file per ``document_id``)
+    and looked up at retrieval time. The directory sits outside the index, so
+    snapshot readers share it with the writer.
+    """
+
+    def __init__(self, directory: str = PARENT_STORE_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, document_id: str) -> Path:
+        return self.directory / document_id[:2] / f"{document_id}.json"
+
+    def put(self, document_id: str, parents: Dict[str, str]) -> None:
+        """Store the parent sections of one document, replacing any earlier ones."""
+        path = self._path(document_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        with open(staging, "w", encoding="utf-8") as f:
+            json.dump(parents, f, ensure_ascii=False)
+        os.replace(staging, path)
+
+    def get_many(self, parent_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        Return the text of the given parents, reading each document's file once.
+
+        Parents that are missing (e.g. deleted since the chunk was retrieved) are
+        left out of the result.
+        """
+        by_document: Dict[str, list] = {}
+        for parent_id in parent_ids:
+            by_document.setdefault(parent_document_id(parent_id), []).append(parent_id)
+
+        found = {}
+        for document_id, ids in by_document.items():
+            path = self._path(document_id)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    parents = json.load(f)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable parent store entry {path}: {str(e)}")
+                continue
+            found.update({parent_id: parents[parent_id] for parent_id in ids if parent_id in parents})
+        return found
+
+    def delete(self, document_ids: Iterable[str]) -> None:
+        """Drop the parent sections of the given documents."""
+        for document_id in document_ids:
+            if document_id:
+                self._path(document_id).unlink(missing_ok=True)
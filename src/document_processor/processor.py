@@ -3,35 +3,93 @@ from typing import List, Dict, Any, Optional
 from pathlib import Path
 import uuid
 import logging
+import time
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 
 from langchain_community.document_loaders import WebBaseLoader
 
-from .loaders import PDFLoader, DocxLoader, WebLoader, TxtLoader
-from ..config import CHUNK_SIZE, CHUNK_OVERLAP
+from .loaders import PDFLoader, DocxLoader, WebLoader, TxtLoader, elements_from_text
+from .parents import ParentStore
+from .structure import StructureAwareSplitter
+from .text_cache import ExtractionCache
+from ..metrics import REGISTRY
+from ..config import (
+    CHUNK_SIZE,
+    CHUNK_OVERLAP,
+    CHUNKING_MODE,
+    STRUCTURE_CHUNK_OVERLAP,
+    USE_PARENT_CHUNKS,
+    EXTRACTION_CACHE_DIR
+)
 
 logger = logging.getLogger(__name__)
 
+PROCESS_SECONDS = REGISTRY.histogram(
+    "rag_document_process_seconds",
+    "Time spent parsing and splitting a document",
+    ["file_type"]
+)
+PROCESSED_DOCUMENTS = REGISTRY.counter(
+    "rag_processed_documents_total",
+    "Number of documents processed",
+    ["file_type", "status"]
+)
+CREATED_CHUNKS = REGISTRY.counter(
+    "rag_created_chunks_total",
+    "Number of chunks produced by document processing"
+)
+CHUNK_CHARS = REGISTRY.counter(
+    "rag_chunk_chars_total",
+    "Number of characters in produced chunks"
+)
+
+def _record_processing(file_type: str, start: float, docs: List[Document]) -> None:
+    """Record metrics for a successfully processed document."""
+    PROCESS_SECONDS.labels(file_type=file_type).observe(time.perf_counter() - start)
+    PROCESSED_DOCUMENTS.labels(file_type=file_type, status="success").inc()
+    CREATED_CHUNKS.inc(len(docs))
+    CHUNK_CHARS.inc(sum(len(doc.page_content) for doc in docs))
+
 class DocumentProcessor:
     """Main document processing class that handles different document types."""
     
-    def __init__(self, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP):
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        chunk_overlap: int = CHUNK_OVERLAP,
+        chunking_mode: str = CHUNKING_MODE,
+        use_parent_chunks: bool = USE_PARENT_CHUNKS,
+        extraction_cache_dir: Optional[str] = EXTRACTION_CACHE_DIR
+    ):
+        if chunking_mode not in ("recursive", "structure"):
+            raise ValueError(f"Invalid chunking mode: {chunking_mode}")
+        
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
+        self.chunking_mode = chunking_mode
         self.web_loader = WebBaseLoader()
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=chunk_size,
             chunk_overlap=chunk_overlap,
             length_function=len,
         )
+        # Parent sections of structure chunks; deletes must drop them too
+        self.parent_store = ParentStore()
+        self.structure_splitter = StructureAwareSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=STRUCTURE_CHUNK_OVERLAP,
+            use_parent_chunks=use_parent_chunks,
+            parent_store=self.parent_store
+        )
         
         # Initialize loaders
         self.pdf_loader = PDFLoader()
         self.docx_loader = DocxLoader()
         self.txt_loader = TxtLoader()
         self.web_loader = WebLoader()
+        self.extraction_cache = ExtractionCache(extraction_cache_dir) if extraction_cache_dir else None
 
     def process_file(self, file_path: str) -> List[Document]:
         """Process a file based on its extension."""
@@ -42,15 +100,6 @@ class DocumentProcessor:
         
         extension = file_path.suffix.lower()
         
-        if extension == ".pdf":
-            text = self.pdf_loader.load(str(file_path))
-        elif extension in [".docx", ".doc"]:
-            text = self.docx_loader.load(str(file_path))
-        elif extension in [".txt"]:
-            text = self.txt_loader.load(str(file_path))
-        else:
-            raise ValueError(f"Unsupported file type: {extension}")
-        
         # Create metadata
         metadata = {
             "source": str(file_path),
@@ -59,10 +108,38 @@ class DocumentProcessor:
             "document_id": str(uuid.uuid4())
         }
         
+        if extension not in [".pdf", ".docx", ".doc", ".txt"]:
+            raise ValueError(f"Unsupported file type: {extension}")
+        
+        if self.chunking_mode == "structure" and extension in [".pdf", ".docx"]:
+            loader = self.pdf_loader if extension == ".pdf" else self.docx_loader
+            try:
+                elements = self._extract(file_path, "elements", lambda: loader.load_elements(str(file_path)))
+                return self.structure_splitter.split_elements(elements, metadata)
+            except Exception as e:
+                logger.warning(f"Layout extraction failed for {file_path}, using plain text: {str(e)}")
+        
+        pages = self._extract(file_path, "pages", lambda: self._load_pages(file_path, extension))
+        
         # Create a document and split it
-        doc = Document(page_content=text, metadata=metadata)
+        doc = Document(page_content="\n".join(pages), metadata=metadata)
         return self.split_document(doc)
     
+    def _load_pages(self, file_path: Path, extension: str) -> List[str]:
+        """Extract a file's text, one entry per page for PDFs."""
+        if extension == ".pdf":
+            return self.pdf_loader.load_pages(str(file_path))
+        if extension in [".docx", ".doc"]:
+            return [self.docx_loader.load(str(file_path))]
+        return [self.txt_loader.load(str(file_path))]
+    
+    def _extract(self, file_path: Path, kind: str, extract) -> Any:
+        """Run a PDF/DOCX loader through the extraction cache, if enabled."""
+        # Reading a text file costs no more than hashing it
+        if self.extraction_cache is None or file_path.suffix.lower() == ".txt":
+            return extract()
+        return self.extraction_cache.get_or_extract(str(file_path), kind, extract)
+    
     def process_url(self, url: str) -> List[Document]:
         """Process a web URL."""
         try:
@@ -85,6 +162,9 @@ class DocumentProcessor:
     
     def split_document(self, document: Document) -> List[Document]:
         """Split a document into chunks."""
+        if self.chunking_mode == "structure":
+            elements = elements_from_text(document.page_content)
+            return self.structure_splitter.split_elements(elements, document.metadata)
         return self.text_splitter.split_documents([document])
     
     def process_documents(self, file_paths: List[str], urls: Optional[List[str]] = None) -> List[Document]:
@@ -93,21 +173,28 @@ class DocumentProcessor:
         
         # Process files
         for file_path in file_paths:
+            file_type = Path(file_path).suffix.lower() or "unknown"
+            start = time.perf_counter()
             try:
                 docs = self.process_file(file_path)
                 documents.extend(docs)
+                _record_processing(file_type, start, docs)
                 logger.info(f"Processed file: {file_path}, generated {len(docs)} chunks")
             except Exception as e:
+                PROCESSED_DOCUMENTS.labels(file_type=file_type, status="error").inc()
                 logger.error(f"Error processing file {file_path}: {str(e)}")
         
         # Process URLs
         if urls:
             for url in urls:
+                start = time.perf_counter()
                 try:
                     docs = self.process_url(url)
                     documents.extend(docs)
+                    _record_processing("web", start, docs)
                     logger.info(f"Processed URL: {url}, generated {len(docs)} chunks")
                 except Exception as e:
+                    PROCESSED_DOCUMENTS.labels(file_type="web", status="error").inc()
                     logger.error(f"Error processing URL {url}: {str(e)}")
         
         return documents
@@ -0,0 +1,164 @@
+from typing import List, Dict, Any, Optional
+import logging
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.schema import Document
+
+from ..config import CHUNK_SIZE, STRUCTURE_CHUNK_OVERLAP, PARENT_CHUNK_SIZE
+from .parents import ParentStore
+
+logger = logging.getLogger(__name__)
+
+class StructureAwareSplitter:
+    """
+    Split layout elements into chunks that follow the document structure.
+
+    Chunks never cross a heading, tables are kept whole where they fit, and
+    paragraphs are packed together up to ``chunk_size`` so only oversized
+    paragraphs need overlapping character splits.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        chunk_overlap: int = STRUCTURE_CHUNK_OVERLAP,
+        use_parent_chunks: bool = False,
+        parent_chunk_size: int = PARENT_CHUNK_SIZE,
+        parent_store: Optional[ParentStore] = None
+    ):
+        """
+        Initialize the splitter.
+
+        Args:
+            chunk_size: Maximum number of characters per chunk
+            chunk_overlap: Overlap used only when a single paragraph must be split
+            use_parent_chunks: Store the enclosing section of every chunk
+            parent_chunk_size: Maximum number of characters kept for a parent section
+            parent_store: Where parent sections are written (default: PARENT_STORE_DIR)
+        """
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.use_parent_chunks = use_parent_chunks
+        self.parent_chunk_size = parent_chunk_size
+        self.parent_store = parent_store or (ParentStore() if use_parent_chunks else None)
+
+    def split_elements(self, elements: List[Dict[str, Any]], metadata: Dict[str, Any]) -> List[Document]:
+        """
+        Split layout elements into chunk documents.
+
+        With parent chunks enabled, each chunk gets the ``parent_id`` of its
+        section and the section texts are written to the parent store.
+
+        Args:
+            elements: Elements as returned by a loader's ``load_elements``
+            metadata: Document-level metadata copied to every chunk
+
+        Returns:
+            List of chunk documents
+        """
+        chunks = []
+        parents: Dict[str, str] = {}
+        for section_index, section in enumerate(self._group_sections(elements)):
+            section_chunks = self._split_section(section)
+            if not section_chunks:
+                continue
+
+            parent_id = None
+            if self.use_parent_chunks:
+                parent_id = f"{metadata.get('document_id', '')}:{section_index}"
+                parents[parent_id] = self._section_text(section)[:self.parent_chunk_size]
+
+            for text, page in section_chunks:
+                chunk_metadata = dict(metadata)
+                chunk_metadata["section"] = section["title"]
+                chunk_metadata["chunk_index"] = len(chunks)
+                if page:
+                    chunk_metadata["page"] = page
+                if parent_id is not None:
+                    chunk_metadata["parent_id"] = parent_id
+                chunks.append(Document(page_content=text, metadata=chunk_metadata))
+
+        if parents:
+            self.parent_store.put(metadata.get("document_id", ""), parents)
+        return chunks
+
+    def _group_sections(self, elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Group elements into sections, each starting at a heading."""
+        sections = []
+        headings: List[Dict[str, Any]] = []
+        current = {"title": "", "elements": []}
+
+        for element in elements:
+            if element["type"] == "heading":
+                if current["elements"]:
+                    sections.append(current)
+                # Keep the heading path so nested sections carry their parents' titles
+                headings = [h for h in headings if h["level"] < element["level"]] + [element]
+                current = {"title": " > ".join(h["text"] for h in headings), "elements": []}
+            else:
+                current["elements"].append(element)
+
+        if current["elements"]:
+            sections.append(current)
+
+        return sections
+
+    def _split_section(self, section: Dict[str, Any]) -> List[tuple]:
+        """Pack a section's elements into (text, page) chunks."""
+        header = f"{section['title']}\n\n" if section["title"] else ""
+        budget = max(self.chunk_size - len(header), self.chunk_size // 2)
+
+        chunks = []
+        parts: List[str] = []
+        size = 0
+        page: Optional[int] = None
+
+        def flush():
+            nonlocal parts, size, page
+            if parts:
+                chunks.append((header + "\n\n".join(parts), page))
+            parts, size, page = [], 0, None
+
+        for element in section["elements"]:
+            for piece in self._element_pieces(element, budget):
+                if size and size + len(piece) + 2 > budget:
+                    flush()
+                parts.append(piece)
+                size += len(piece) + 2
+                if page is None:
+                    page = element.get("page") or None
+        flush()
+
+        return chunks
+
+    def _element_pieces(self, element: Dict[str, Any], budget: int) -> List[str]:
+        """Break a single element into pieces no longer than the budget."""
+        text = element["text"].strip()
+        if len(text) <= budget:
+            return [text] if text else []
+
+        if element["type"] == "table":
+            # Split tables by rows and repeat the header row in each piece
+            rows = text.split("\n")
+            head, body = rows[0], rows[1:]
+            pieces, current = [], [head]
+            for row in body:
+                if len("\n".join(current + [row])) > budget and len(current) > 1:
+                    pieces.append("\n".join(current))
+                    current = [head]
+                current.append(row)
+            pieces.append("\n".join(current))
+            return pieces
+
+        splitter = RecursiveCharacterTextSplitter(
+            chunk_size=budget,
+            chunk_overlap=min(self.chunk_overlap, budget // 2),
+            length_function=len,
+        )
+        return splitter.split_text(text)
+
+    @staticmethod
+    def _section_text(section: Dict[str, Any]) -> str:
+        """Full text of a section including its title."""
+        body = "\n\n".join(element["text"].strip() for element in section["elements"])
+        return f"{section['title']}\n\n{body}" if section["title"] else body
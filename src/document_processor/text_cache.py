@@ -0,0 +1,90 @@
+from pathlib import Path
+from typing import Any, Callable, Optional
+import gzip
+import hashlib
+import json
+import logging
+import os
+
+from ..config import EXTRACTION_CACHE_DIR
+from ..metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_CACHE_REQUESTS = REGISTRY.counter(
+    "rag_extraction_cache_requests_total",
+    "Extracted text cache lookups",
+    ["kind", "outcome"]
+)
+
+# Part of every cache file name; bump it when a loader's output changes
+EXTRACTOR_VERSION = "1"
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """
+    On-disk cache of loader output keyed by file content hash.
+
+    Entries are gzip-compressed JSON: the page texts of a file for plain
+    chunking, or its layout elements for structure-aware chunking (``kind``).
+    Chunking settings are not part of the key, so re-chunking or re-indexing
+    an unchanged file skips PDF/DOCX extraction entirely. Renamed or copied
+    files hit the same entry.
+    """
+
+    def __init__(self, directory: str = EXTRACTION_CACHE_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, digest: str, kind: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.{kind}.v{EXTRACTOR_VERSION}.json.gz"
+
+    def get(self, digest: str, kind: str) -> Optional[Any]:
+        """Return the cached payload, or None on a miss or unreadable entry."""
+        path = self._path(digest, kind)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring corrupt extraction cache entry {path}: {str(e)}")
+            return None
+
+    def put(self, digest: str, kind: str, payload: Any) -> None:
+        path = self._path(digest, kind)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        with gzip.open(staging, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(staging, path)
+
+    def get_or_extract(self, file_path: str, kind: str, extract: Callable[[], Any], digest: Optional[str] = None) -> Any:
+        """
+        Return the cached extraction of ``file_path``, running ``extract`` on a miss.
+
+        Args:
+            file_path: File the payload was extracted from
+            kind: Payload type, e.g. "pages" or "elements"
+            extract: Produces the JSON-serializable payload on a miss
+            digest: Content hash of the file, if already known
+        """
+        digest = digest or file_hash(file_path)
+        payload = self.get(digest, kind)
+        if payload is not None:
+            EXTRACTION_CACHE_REQUESTS.labels(kind=kind, outcome="hit").inc()
+            return payload
+
+        EXTRACTION_CACHE_REQUESTS.labels(kind=kind, outcome="miss").inc()
+        payload = extract()
+        try:
+            self.put(digest, kind, payload)
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache entry for {file_path}: {str(e)}")
+        return payload
@@ -0,0 +1,202 @@
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+import json
+import logging
+import os
+import threading
+import time
+
+from ..config import WATCH_DEBOUNCE, WATCH_INTERVAL
+from ..metrics import REGISTRY
+from .text_cache import file_hash
+
+logger = logging.getLogger(__name__)
+
+WATCHED_CHANGES = REGISTRY.counter(
+    "rag_watched_file_changes_total",
+    "File changes applied by the directory watcher",
+    ["change"]
+)
+
+class DirectoryWatcher:
+    """
+    Detects added, modified and deleted files under a directory by polling.
+
+    Each poll is one ``os.scandir`` walk comparing mtime and size with the last
+    applied state; only files whose stat changed are hashed, and a file whose
+    content hash is unchanged (e.g. touched) is not reported. Changes are held
+    back until a file has been stable for ``debounce`` seconds, so a burst of
+    writes (a copy in progress, an editor saving twice) is applied once.
+
+    The applied state is persisted to ``state_file`` by ``commit``, so a
+    restarted watcher only reports what changed while it was down.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        state_file: str,
+        extensions: Iterable[str],
+        debounce: float = WATCH_DEBOUNCE
+    ):
+        self.directory = Path(directory)
+        self.state_file = Path(state_file)
+        self.extensions = {ext.lower() for ext in extensions}
+        self.debounce = debounce
+        # path -> {"mtime_ns", "size", "sha256"} of the last applied version
+        self.state: Dict[str, Dict] = self._load_state()
+        # path -> (stat signature, time it was first seen) of changes still settling
+        self._pending: Dict[str, tuple] = {}
+
+    def _load_state(self) -> Dict[str, Dict]:
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                return json.load(f)["files"]
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable watch state {self.state_file}: {str(e)}")
+            return {}
+
+    def _save_state(self) -> None:
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        staging = self.state_file.with_suffix(f".tmp-{os.getpid()}")
+        with open(staging, "w", encoding="utf-8") as f:
+            json.dump({"directory": str(self.directory), "files": self.state}, f)
+        os.replace(staging, self.state_file)
+
+    def _walk(self, directory: Path) -> Iterable[os.DirEntry]:
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from self._walk(Path(entry.path))
+            elif entry.is_file() and Path(entry.name).suffix.lower() in self.extensions:
+                yield entry
+
+    def scan(self) -> Dict[str, tuple]:
+        """Current (mtime_ns, size) of every watched file."""
+        signatures = {}
+        for entry in self._walk(self.directory):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            signatures[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return signatures
+
+    def poll(self, now: Optional[float] = None) -> Dict[str, List[str]]:
+        """
+        Return changes that have settled since the last commit.
+
+        Returns:
+            Dictionary with ``added``, ``modified`` and ``deleted`` path lists
+            (empty lists when nothing is ready)
+        """
+        now = time.monotonic() if now is None else now
+        current = self.scan()
+        changes = {"added": [], "modified": [], "deleted": []}
+
+        candidates = set(current) | set(self.state)
+        for path in sorted(candidates):
+            signature = current.get(path)
+            known = self.state.get(path)
+            if known is not None and signature == (known["mtime_ns"], known["size"]):
+                self._pending.pop(path, None)
+                continue
+
+            pending = self._pending.get(path)
+            if pending is None or pending[0] != signature:
+                # New or still changing: restart the quiet period, unless the file
+                # was last written long enough ago (e.g. changed while not watching)
+                settled = signature is not None and time.time() - signature[0] / 1e9 >= self.debounce
+                self._pending[path] = (signature, now - self.debounce if settled else now)
+                if not settled:
+                    continue
+            elif now - pending[1] < self.debounce:
+                continue
+
+            if signature is None:
+                changes["deleted"].append(path)
+            elif known is None:
+                changes["added"].append(path)
+            else:
+                try:
+                    digest = file_hash(path)
+                except FileNotFoundError:
+                    continue
+                if digest == known.get("sha256"):
+                    # Touched but unchanged: remember the new stat, skip re-indexing
+                    self.state[path] = {"mtime_ns": signature[0], "size": signature[1], "sha256": digest}
+                    self._pending.pop(path, None)
+                    continue
+                changes["modified"].append(path)
+
+        # Files created and removed again before they settled
+        for path in set(self._pending) - candidates:
+            del self._pending[path]
+        return changes
+
+    def commit(self, changes: Dict[str, List[str]]) -> None:
+        """Record ``changes`` as applied and persist the state file."""
+        for path in changes["deleted"]:
+            self.state.pop(path, None)
+            self._pending.pop(path, None)
+        for path in changes["added"] + changes["modified"]:
+            signature, _ = self._pending.pop(path, (None, None))
+            try:
+                stat = os.stat(path)
+                digest = file_hash(path)
+            except FileNotFoundError:
+                continue
+            if signature is not None and signature != (stat.st_mtime_ns, stat.st_size):
+                # Changed again while being indexed; the next poll picks it up
+                continue
+            self.state[path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+        for change, paths in changes.items():
+            WATCHED_CHANGES.labels(change=change).inc(len(paths))
+        self._save_state()
+
+    def defer(self, paths: Iterable[str], now: Optional[float] = None) -> None:
+        """Hold reported ``paths`` back for another quiet period, e.g. after indexing them failed."""
+        now = time.monotonic() if now is None else now
+        for path in paths:
+            pending = self._pending.get(path)
+            if pending is not None:
+                self._pending[path] = (pending[0], now)
+
+    def run(
+        self,
+        apply: Callable[[Dict[str, List[str]]], Optional[Dict[str, List[str]]]],
+        interval: float = WATCH_INTERVAL,
+        stop_event: Optional[threading.Event] = None
+    ) -> None:
+        """
+        Poll every ``interval`` seconds and pass settled changes to ``apply``.
+
+        ``apply`` may return the subset of changes it applied; only those are
+        committed, and the rest (like all changes when ``apply`` raises) are
+        retried after another quiet period.
+        """
+        stop_event = stop_event or threading.Event()
+        logger.info(f"Watching {self.directory} (every {interval}s, debounce {self.debounce}s)")
+        while not stop_event.is_set():
+            changes = self.poll()
+            if any(changes.values()):
+                logger.info(
+                    f"Applying {len(changes['added'])} added, {len(changes['modified'])} modified "
+                    f"and {len(changes['deleted'])} deleted files"
+                )
+                try:
+                    applied = apply(changes)
+                except Exception as e:
+                    logger.error(f"Error applying file changes: {str(e)}")
+                    applied = {change: [] for change in changes}
+                if applied is None:
+                    applied = changes
+                done = {path for paths in applied.values() for path in paths}
+                self.defer(path for paths in changes.values() for path in paths if path not in done)
+                self.commit(applied)
+            stop_event.wait(interval)
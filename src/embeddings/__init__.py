@@ -1 +1,3 @@
-from .embedding_factory import get_embeddings
\ No newline at end of file
+from .embedding_factory import get_embeddings
+from .instrumented import InstrumentedEmbeddings
+from .reduction import Projection, ReducedEmbeddings, fit_projection, with_projection, save_projection
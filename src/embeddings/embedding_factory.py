@@ -2,19 +2,17 @@ from typing import Optional
 import logging
 
 from langchain.embeddings.base import Embeddings
-from langchain.embeddings import HuggingFaceEmbeddings, OllamaEmbeddings
-
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_ollama import OllamaEmbeddings  # Ollama has moved to a separate package
 
 from ..config import (
     EMBEDDING_MODE, 
     LOCAL_EMBEDDING_MODEL, 
     API_EMBEDDING_MODEL,
     OPENAI_API_KEY,
-    USE_OLLAMA
+    USE_OLLAMA,
+    OLLAMA_BASE_URL,
+    EMBEDDING_DEVICE
 )
+from .instrumented import InstrumentedEmbeddings
 
 logger = logging.getLogger(__name__)
 
@@ -30,15 +28,23 @@ def get_embeddings(
         model_name: Name of the model to use (defaults to config value)
     
     Returns:
-        An instance of Embeddings
+        An instance of Embeddings, instrumented with latency metrics
     """
+    return InstrumentedEmbeddings(_create_embeddings(mode, model_name))
+
+def _create_embeddings(
+    mode: Optional[str] = None, 
+    model_name: Optional[str] = None
+) -> Embeddings:
+    """Create the underlying embeddings model for ``get_embeddings``."""
     mode = mode or EMBEDDING_MODE
     
     # If USE_OLLAMA is True, try to use Ollama for embeddings
     if USE_OLLAMA and mode == "local":
         try:
             logger.info("Attempting to use Ollama for embeddings")
-            return OllamaEmbeddings(model="nomic-embed-text")
+            from langchain_ollama import OllamaEmbeddings  # Ollama has moved to a separate package
+            return OllamaEmbeddings(model="nomic-embed-text", base_url=OLLAMA_BASE_URL)
         except Exception as e:
             logger.warning(f"Failed to use Ollama for embeddings: {str(e)}. Falling back to HuggingFace.")
     
@@ -46,11 +52,7 @@ def get_embeddings(
         model_name = model_name or LOCAL_EMBEDDING_MODEL
         logger.info(f"Using local embeddings model: {model_name}")
         
-        return HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={"device": "cuda" if is_cuda_available() else "cpu"},
-            encode_kwargs={"normalize_embeddings": True}
-        )
+        return get_huggingface_embeddings(model_name)
     
     elif mode == "api" and OPENAI_API_KEY:
         model_name = model_name or API_EMBEDDING_MODEL
@@ -68,11 +70,19 @@ def get_embeddings(
         model_name = model_name or LOCAL_EMBEDDING_MODEL
         logger.info(f"Defaulting to local embeddings model: {model_name}")
         
-        return HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={"device": "cuda" if is_cuda_available() else "cpu"},
-            encode_kwargs={"normalize_embeddings": True}
-        )
+        return get_huggingface_embeddings(model_name)
+
+def get_huggingface_embeddings(model_name: str) -> Embeddings:
+    """Get a local SentenceTransformers embeddings model."""
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    
+    # An explicit device skips importing torch just to probe for CUDA
+    device = EMBEDDING_DEVICE or ("cuda" if is_cuda_available() else "cpu")
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": device},
+        encode_kwargs={"normalize_embeddings": True}
+    )
 
 def is_cuda_available() -> bool:
     """Check if CUDA is available for GPU acceleration."""
@@ -0,0 +1,52 @@
+from typing import List
+import time
+
+from langchain.embeddings.base import Embeddings
+
+from ..metrics import REGISTRY, record_stage
+
+EMBEDDING_SECONDS = REGISTRY.histogram(
+    "rag_embedding_seconds",
+    "Time spent computing embeddings",
+    ["operation"]
+)
+EMBEDDED_TEXTS = REGISTRY.counter(
+    "rag_embedded_texts_total",
+    "Number of texts embedded",
+    ["operation"]
+)
+
+class InstrumentedEmbeddings(Embeddings):
+    """Embeddings wrapper that records latency and volume metrics."""
+    
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self._query_seconds = EMBEDDING_SECONDS.labels(operation="query")
+        self._documents_seconds = EMBEDDING_SECONDS.labels(operation="documents")
+        self._query_texts = EMBEDDED_TEXTS.labels(operation="query")
+        self._documents_texts = EMBEDDED_TEXTS.labels(operation="documents")
+    
+    def __getattr__(self, name):
+        # Expose attributes of the wrapped model (e.g. model_name)
+        embeddings = self.__dict__.get("embeddings")
+        if embeddings is None:
+            raise AttributeError(name)
+        return getattr(embeddings, name)
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        start = time.perf_counter()
+        vectors = self.embeddings.embed_documents(texts)
+        elapsed = time.perf_counter() - start
+        self._documents_seconds.observe(elapsed)
+        self._documents_texts.inc(len(texts))
+        record_stage("embed", elapsed)
+        return vectors
+    
+    def embed_query(self, text: str) -> List[float]:
+        start = time.perf_counter()
+        vector = self.embeddings.embed_query(text)
+        elapsed = time.perf_counter() - start
+        self._query_seconds.observe(elapsed)
+        self._query_texts.inc()
+        record_stage("embed", elapsed)
+        return vector
@@ -0,0 +1,161 @@
+from pathlib import Path
+from typing import List, Optional
+import logging
+import os
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Saved next to index.faiss so the projection travels with the index
+PROJECTION_FILE = "projection.npz"
+
+class Projection:
+    """
+    Linear map from full-width embeddings to ``dimension`` components.
+
+    PCA centers vectors on ``mean`` and projects them onto the rows of
+    ``components``; being an orthogonal projection it approximately preserves
+    the distances between embeddings. Projected vectors are re-normalized to unit
+    length, as Matryoshka models expect of truncated ones, so FAISS L2
+    distances keep converting to cosine similarity.
+    """
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, method: str):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.method = method
+
+    @property
+    def input_dimension(self) -> int:
+        return self.components.shape[1]
+
+    @property
+    def dimension(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit_pca(cls, vectors: np.ndarray, dimension: int) -> "Projection":
+        """
+        Fit a PCA projection keeping the ``dimension`` directions of largest variance.
+
+        Args:
+            vectors: Sample of full-width embeddings, shape (n, d)
+            dimension: Number of components to keep
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if dimension >= vectors.shape[1]:
+            raise ValueError(f"Target dimension {dimension} must be below the embedding width {vectors.shape[1]}")
+        mean = vectors.mean(axis=0)
+        # Rows of vt are the principal axes, ordered by explained variance
+        _, singular_values, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        if len(vt) < dimension:
+            raise ValueError(f"PCA to {dimension} dimensions needs at least {dimension} sample vectors")
+        explained = (singular_values[:dimension] ** 2).sum() / (singular_values ** 2).sum()
+        logger.info(
+            f"Fitted PCA {vectors.shape[1]} -> {dimension} on {len(vectors)} vectors "
+            f"({explained:.1%} of variance kept)"
+        )
+        return cls(mean, vt[:dimension], "pca")
+
+    @classmethod
+    def truncation(cls, input_dimension: int, dimension: int) -> "Projection":
+        """
+        Keep the first ``dimension`` coordinates.
+
+        Only sensible for Matryoshka-trained models such as ``nomic-embed-text``,
+        whose leading dimensions carry most of the signal.
+        """
+        if dimension >= input_dimension:
+            raise ValueError(f"Target dimension {dimension} must be below the embedding width {input_dimension}")
+        return cls(np.zeros(input_dimension), np.eye(dimension, input_dimension), "truncate")
+
+    def apply(self, vectors: np.ndarray) -> np.ndarray:
+        """Project a (n, d) matrix to (n, dimension)."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == "truncate":
+            reduced = np.array(vectors[:, :self.dimension])
+        else:
+            reduced = (vectors - self.mean) @ self.components.T
+        # Unit length like unreduced embeddings, so L2 distances still map to cosine similarity
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        np.divide(reduced, norms, out=reduced, where=norms > 0)
+        return reduced
+
+    def save(self, path: str) -> None:
+        staging = Path(f"{path}.tmp-{os.getpid()}.npz")
+        np.savez(staging, mean=self.mean, components=self.components, method=np.array(self.method))
+        os.replace(staging, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["Projection"]:
+        """Load a projection file, or return None if it does not exist."""
+        if not Path(path).exists():
+            return None
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"], str(data["method"]))
+
+class ReducedEmbeddings(Embeddings):
+    """Embeddings wrapper that projects every vector with a fitted ``Projection``."""
+
+    def __init__(self, embeddings: Embeddings, projection: Projection):
+        self.embeddings = embeddings
+        self.projection = projection
+
+    def __getattr__(self, name):
+        # Expose attributes of the wrapped model (e.g. model_name)
+        embeddings = self.__dict__.get("embeddings")
+        if embeddings is None:
+            raise AttributeError(name)
+        return getattr(embeddings, name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.projection.apply(self.embeddings.embed_documents(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.projection.apply([self.embeddings.embed_query(text)])[0].tolist()
+
+def fit_projection(vectors: np.ndarray, method: str, dimension: int, sample_size: int, seed: int = 0) -> Projection:
+    """
+    Fit a projection of the given method ("pca" or "truncate") on a sample of vectors.
+
+    Args:
+        vectors: Full-width embeddings, shape (n, d)
+        method: "pca" or "truncate"
+        dimension: Target dimension
+        sample_size: Maximum number of vectors PCA is fitted on
+        seed: Random seed for drawing the sample
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if method == "truncate":
+        return Projection.truncation(vectors.shape[1], dimension)
+    if method != "pca":
+        raise ValueError(f"Invalid embedding reduction: {method}")
+    if len(vectors) > sample_size:
+        rows = np.random.default_rng(seed).choice(len(vectors), sample_size, replace=False)
+        vectors = vectors[rows]
+    return Projection.fit_pca(vectors, dimension)
+
+def with_projection(embeddings: Embeddings, directory: str) -> Embeddings:
+    """Wrap ``embeddings`` with the projection saved in ``directory``, if any."""
+    if isinstance(embeddings, ReducedEmbeddings):
+        return embeddings
+    projection = Projection.load(Path(directory) / PROJECTION_FILE)
+    if projection is None:
+        return embeddings
+    logger.info(f"Using {projection.method} projection to {projection.dimension} dimensions from {directory}")
+    return ReducedEmbeddings(embeddings, projection)
+
+def save_projection(embeddings: Embeddings, directory: str) -> None:
+    """
+    Save the projection of ``embeddings`` to ``directory``.
+
+    Removes a stale projection file when ``embeddings`` is not reduced, so the
+    directory never pairs an index with the wrong projection.
+    """
+    path = Path(directory) / PROJECTION_FILE
+    if isinstance(embeddings, ReducedEmbeddings):
+        embeddings.projection.save(path)
+    else:
+        path.unlink(missing_ok=True)
@@ -1 +1,7 @@
-from .llm_factory import get_llm
\ No newline at end of file
+from .llm_factory import get_llm
+from .callbacks import MetricsCallbackHandler
+from .client import OllamaClient, get_ollama_client
+from .ollama import ManagedOllamaLLM
+from .router import BackendPool, get_backend_pool, routing_question
+from .generation import GenerationCancelled, cancellation
+from .transformers_llm import TransformersLLM
\ No newline at end of file
@@ -0,0 +1,80 @@
+from typing import Any, Dict, List
+from uuid import UUID
+import time
+
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.schema import LLMResult
+
+from ..metrics import REGISTRY, record_stage, record_value
+
+LLM_REQUESTS = REGISTRY.counter(
+    "rag_llm_requests_total",
+    "Number of LLM calls",
+    ["status"]
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "rag_llm_seconds",
+    "Total LLM call duration"
+)
+LLM_TTFT_SECONDS = REGISTRY.histogram(
+    "rag_llm_time_to_first_token_seconds",
+    "Time from LLM call start to the first streamed token"
+)
+LLM_GENERATION_SECONDS = REGISTRY.histogram(
+    "rag_llm_generation_seconds",
+    "Time from the first streamed token to the end of generation"
+)
+LLM_STREAMED_TOKENS = REGISTRY.counter(
+    "rag_llm_streamed_tokens_total",
+    "Number of tokens streamed by the LLM"
+)
+PROMPT_CHARS = REGISTRY.histogram(
+    "rag_prompt_chars",
+    "Prompt size in characters",
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+)
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Callback handler that records LLM latency metrics.
+    
+    Time to first token and generation time are only available for backends that
+    stream tokens through callbacks (e.g. Ollama); others report total time only.
+    """
+    
+    def __init__(self):
+        self._runs: Dict[UUID, Dict[str, float]] = {}
+    
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any) -> None:
+        prompt_chars = sum(len(prompt) for prompt in prompts)
+        PROMPT_CHARS.observe(prompt_chars)
+        record_value("prompt_chars", prompt_chars)
+        self._runs[run_id] = {"start": time.perf_counter()}
+    
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.get(run_id)
+        if run is None:
+            return
+        if "first_token" not in run:
+            run["first_token"] = time.perf_counter()
+        LLM_STREAMED_TOKENS.inc()
+    
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "success")
+    
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "error")
+    
+    def _finish(self, run_id: UUID, status: str) -> None:
+        run = self._runs.pop(run_id, None)
+        LLM_REQUESTS.labels(status=status).inc()
+        if run is None:
+            return
+        end = time.perf_counter()
+        LLM_SECONDS.observe(end - run["start"])
+        record_stage("llm", end - run["start"])
+        if "first_token" in run:
+            LLM_TTFT_SECONDS.observe(run["first_token"] - run["start"])
+            LLM_GENERATION_SECONDS.observe(end - run["first_token"])
+            record_stage("llm_time_to_first_token", run["first_token"] - run["start"])
+            record_stage("llm_generation", end - run["first_token"])
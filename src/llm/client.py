@@ -0,0 +1,228 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+import json
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_POOL_SIZE,
+    LLM_CONNECT_TIMEOUT,
+    LLM_REQUEST_TIMEOUT
+)
+from ..metrics import REGISTRY, record_stage, record_value
+
+logger = logging.getLogger(__name__)
+
+LLM_IN_FLIGHT = REGISTRY.gauge(
+    "rag_llm_in_flight_requests",
+    "LLM requests currently being processed by a backend",
+    ["backend"]
+)
+LLM_BACKEND_ERRORS = REGISTRY.counter(
+    "rag_llm_backend_errors_total",
+    "LLM backend request failures",
+    ["backend", "reason"]
+)
+LLM_PROMPT_EVAL_SECONDS = REGISTRY.histogram(
+    "rag_llm_prompt_eval_seconds",
+    "Prompt evaluation time reported by the backend",
+    ["backend"]
+)
+LLM_PROMPT_TOKENS = REGISTRY.counter(
+    "rag_llm_prompt_tokens_total",
+    "Prompt tokens evaluated by the backend",
+    ["backend"]
+)
+LLM_SLOT_WAIT_SECONDS = REGISTRY.histogram(
+    "rag_llm_slot_wait_seconds",
+    "Time LLM requests wait for a free slot on a backend",
+    ["backend"]
+)
+
+class LLMBackendBusy(RuntimeError):
+    """Raised when a request finds every slot of a backend in use."""
+
+
+class LLMQueueTimeout(TimeoutError):
+    """Raised when a request waits too long for a free slot."""
+
+
+class BackendSlots:
+    """
+    Caps the requests in flight to one backend with a bounded semaphore.
+
+    With ``queue_timeout`` 0 a request that finds no free slot fails at once
+    with ``LLMBackendBusy``; otherwise it waits up to ``queue_timeout`` seconds
+    and then fails with ``LLMQueueTimeout``. Waits are recorded per backend.
+    """
+
+    def __init__(self, backend: str, max_concurrency: int, queue_timeout: float = 0.0):
+        self.backend = backend
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._in_flight = LLM_IN_FLIGHT.labels(backend=backend)
+        self._wait_seconds = LLM_SLOT_WAIT_SECONDS.labels(backend=backend)
+
+    def acquire(self) -> None:
+        if self.queue_timeout <= 0:
+            if not self._semaphore.acquire(blocking=False):
+                LLM_BACKEND_ERRORS.labels(backend=self.backend, reason="busy").inc()
+                raise LLMBackendBusy(f"No free slot on {self.backend} ({self.max_concurrency} requests in flight)")
+        else:
+            start = time.perf_counter()
+            acquired = self._semaphore.acquire(timeout=self.queue_timeout)
+            waited = time.perf_counter() - start
+            self._wait_seconds.observe(waited)
+            record_stage("llm_queue", waited)
+            if not acquired:
+                LLM_BACKEND_ERRORS.labels(backend=self.backend, reason="queue_timeout").inc()
+                raise LLMQueueTimeout(f"Waited {waited:.1f}s for a free slot on {self.backend}")
+        self._in_flight.inc()
+
+    def release(self) -> None:
+        self._in_flight.dec()
+        self._semaphore.release()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold a slot for the duration of the block."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class OllamaClient:
+    """
+    Pooled HTTP client for one Ollama server.
+
+    Connections are kept alive in a ``requests`` session and the number of
+    requests in flight is capped by a semaphore. Requests do not wait for a slot
+    here: ``BackendPool`` queues them until it has reserved one, so a request
+    that still finds none free (another pool using the same server) fails fast
+    with ``LLMBackendBusy``.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        pool_size: int = LLM_POOL_SIZE,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        request_timeout: float = LLM_REQUEST_TIMEOUT
+    ):
+        """
+        Args:
+            base_url: Ollama server URL, e.g. http://localhost:11434
+            max_concurrency: Maximum number of requests in flight
+            pool_size: Number of keep-alive connections kept open
+            connect_timeout: Seconds to wait for a connection
+            request_timeout: Seconds a whole request may take
+        """
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.connect_timeout = connect_timeout
+        self.request_timeout = request_timeout
+        self._slots = BackendSlots(self.base_url, max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, max_concurrency))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._prompt_eval_seconds = LLM_PROMPT_EVAL_SECONDS.labels(backend=self.base_url)
+        self._prompt_tokens = LLM_PROMPT_TOKENS.labels(backend=self.base_url)
+
+    def generate(
+        self,
+        model: str,
+        prompt: str,
+        options: Optional[Dict[str, Any]] = None,
+        **params: Any
+    ) -> Iterator[str]:
+        """
+        Stream a completion from ``/api/generate``.
+
+        Args:
+            model: Model name
+            prompt: Prompt text
+            options: Ollama model options (temperature, num_ctx, stop, ...)
+            **params: Additional top-level request fields (e.g. keep_alive)
+
+        Returns:
+            Iterator over generated text fragments
+        """
+        payload = {"model": model, "prompt": prompt, "stream": True, "options": options or {}}
+        payload.update({key: value for key, value in params.items() if value is not None})
+
+        self._slots.acquire()
+        try:
+            deadline = time.monotonic() + self.request_timeout
+            with self.session.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                stream=True,
+                timeout=(self.connect_timeout, self.request_timeout)
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Request to {self.base_url} exceeded {self.request_timeout}s")
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        raise RuntimeError(f"Ollama error: {chunk['error']}")
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        # Not breaking: reading the end of the chunked body lets the connection be reused
+                        self._record_done(chunk)
+        except requests.RequestException as e:
+            LLM_BACKEND_ERRORS.labels(backend=self.base_url, reason=type(e).__name__).inc()
+            raise
+        finally:
+            self._slots.release()
+
+    def _record_done(self, chunk: Dict[str, Any]) -> None:
+        """Record the timing statistics Ollama reports with the final chunk."""
+        if "prompt_eval_duration" in chunk:
+            seconds = chunk["prompt_eval_duration"] / 1e9
+            self._prompt_eval_seconds.observe(seconds)
+            record_stage("llm_prompt_eval", seconds)
+        if "prompt_eval_count" in chunk:
+            self._prompt_tokens.inc(chunk["prompt_eval_count"])
+            # Excludes prompt prefix tokens served from Ollama's KV cache
+            record_value("prompt_eval_tokens", chunk["prompt_eval_count"])
+
+    def is_healthy(self, timeout: float = 2.0) -> bool:
+        """Check that the server answers ``/api/tags``."""
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=timeout)
+            return response.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_clients: Dict[str, OllamaClient] = {}
+_clients_lock = threading.Lock()
+
+def get_ollama_client(base_url: str, **kwargs: Any) -> OllamaClient:
+    """Return the shared client (and connection pool) for an Ollama server."""
+    key = base_url.rstrip("/")
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OllamaClient(key, **kwargs)
+            _clients[key] = client
+        return client
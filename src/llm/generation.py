@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, List, Optional
+import re
+import threading
+
+from ..config import (
+    ADAPTIVE_MAX_TOKENS,
+    MAX_NEW_TOKENS_SHORT,
+    MAX_NEW_TOKENS,
+    MAX_NEW_TOKENS_LONG,
+    STOP_SEQUENCES
+)
+from ..metrics import REGISTRY
+from .router import current_question, is_simple_question
+
+CANCELLED_GENERATIONS = REGISTRY.counter(
+    "rag_llm_cancelled_generations_total",
+    "Generations stopped early because the client went away"
+)
+
+# Set when the caller no longer needs the answer (e.g. the HTTP client disconnected)
+_cancel_event: ContextVar[Optional[threading.Event]] = ContextVar("rag_cancel_event", default=None)
+
+_LONG_ANSWER = re.compile(
+    r"\b(explain|describe|compare|summari[sz]e|list|steps?|walk me through|in detail|overview|differences?)\b",
+    re.IGNORECASE
+)
+
+class GenerationCancelled(Exception):
+    """Raised when a generation is stopped because its result is no longer needed."""
+
+
+@contextmanager
+def cancellation(event: Optional[threading.Event]) -> Iterator[None]:
+    """Stop generations started in this context once ``event`` is set."""
+    token = _cancel_event.set(event)
+    try:
+        yield
+    finally:
+        _cancel_event.reset(token)
+
+def cancel_event() -> Optional[threading.Event]:
+    """The cancellation event of the current request, if any."""
+    return _cancel_event.get()
+
+def check_cancelled(event: Optional[threading.Event]) -> None:
+    """Raise ``GenerationCancelled`` if ``event`` has been set."""
+    if event is not None and event.is_set():
+        CANCELLED_GENERATIONS.inc()
+        raise GenerationCancelled("Generation cancelled")
+
+def answer_token_budget(question: Optional[str] = None, default: int = MAX_NEW_TOKENS) -> int:
+    """
+    Maximum new tokens for an answer to ``question`` (defaults to the current one).
+
+    Short factual lookups get a small budget and requests for explanations,
+    comparisons or summaries a large one, so runaway generations on simple
+    questions stop early.
+    """
+    question = question if question is not None else current_question()
+    if not ADAPTIVE_MAX_TOKENS or not question:
+        return default
+    if _LONG_ANSWER.search(question):
+        return MAX_NEW_TOKENS_LONG
+    if is_simple_question(question):
+        return MAX_NEW_TOKENS_SHORT
+    return default
+
+def stop_sequences(stop: Optional[List[str]] = None) -> List[str]:
+    """Caller stop sequences plus the configured defaults."""
+    return list(dict.fromkeys((stop or []) + STOP_SEQUENCES))
+
+def truncate_at_stop(text: str, stop: List[str]) -> str:
+    """Cut ``text`` at the earliest stop sequence."""
+    positions = [text.find(sequence) for sequence in stop if sequence in text]
+    return text[:min(positions)] if positions else text
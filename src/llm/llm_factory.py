@@ -3,15 +3,32 @@ import logging
 import os
 
 from langchain.llms.base import LLM
-from langchain.llms import HuggingFacePipeline, Ollama
 
 from ..config import (
     LLM_MODE,
     LOCAL_MODEL_NAME,
     API_MODEL_NAME,
     OPENAI_API_KEY,
-    USE_OLLAMA
+    USE_OLLAMA,
+    OLLAMA_BASE_URL,
+    OLLAMA_BASE_URLS,
+    SMALL_MODEL_NAME,
+    OLLAMA_KEEP_ALIVE,
+    PREFIX_CACHE_ENABLED,
+    DRAFT_MODEL_NAME,
+    MAX_NEW_TOKENS,
+    STOP_SEQUENCES,
+    LOCAL_LLM_QUANTIZATION,
+    GGUF_MODEL,
+    LLM_CPU_THREADS,
+    LLM_MAX_CONCURRENCY,
+    LLM_POOL_SIZE,
+    LLM_CONNECT_TIMEOUT,
+    LLM_REQUEST_TIMEOUT
 )
+from .ollama import ManagedOllamaLLM
+from .quantization import load_int8_model, resolve_gguf_model
+from .transformers_llm import TransformersLLM
 
 logger = logging.getLogger(__name__)
 
@@ -47,13 +64,27 @@ def get_llm(
         model_name = model_name or API_MODEL_NAME
         logger.info(f"Using API LLM: {model_name}")
         
-        from langchain.chat_models import ChatOpenAI
+        import httpx
+        from .openai_chat import ManagedChatOpenAI
         
-        return ChatOpenAI(
+        # Requests queue for a slot in ManagedChatOpenAI, so the pool never has to make them wait
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONCURRENCY,
+                max_keepalive_connections=LLM_POOL_SIZE
+            ),
+            timeout=httpx.Timeout(LLM_REQUEST_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        )
+        
+        return ManagedChatOpenAI(
             model_name=model_name,
             openai_api_key=OPENAI_API_KEY,
             temperature=kwargs.get("temperature", 0.9),
-            max_tokens=kwargs.get("max_tokens", 2048)
+            # None adapts the limit to each question (see ManagedChatOpenAI)
+            max_tokens=kwargs.get("max_tokens"),
+            stop=STOP_SEQUENCES,
+            request_timeout=LLM_REQUEST_TIMEOUT,
+            http_client=http_client
         )
     
     else:
@@ -77,8 +108,12 @@ def get_local_llm(model_name: str, **kwargs) -> LLM:
         if kwargs.get("use_ollama", False) or USE_OLLAMA:
             return get_ollama_llm(model_name, **kwargs)
         
+        quantization = kwargs.get("quantization", LOCAL_LLM_QUANTIZATION)
+        if quantization == "gguf":
+            return get_gguf_llm(kwargs.get("gguf_model", GGUF_MODEL), **kwargs)
+        
         # Otherwise use HuggingFace Transformers
-        from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+        from transformers import AutoConfig, AutoTokenizer, AutoModelForCausalLM
         import torch
         
         # Determine device
@@ -88,6 +123,9 @@ def get_local_llm(model_name: str, **kwargs) -> LLM:
         # Load tokenizer and model
         tokenizer = AutoTokenizer.from_pretrained(model_name)
         
+        # bitsandbytes quantization needs a GPU; on CPU use dynamic int8 instead
+        cpu_int8 = device == "cpu" and quantization == "int8"
+        
         # Determine quantization settings
         load_in_8bit = kwargs.get("load_in_8bit", device == "cuda")
         load_in_4bit = kwargs.get("load_in_4bit", False)
@@ -97,34 +135,89 @@ def get_local_llm(model_name: str, **kwargs) -> LLM:
             "torch_dtype": torch.float16 if device == "cuda" else torch.float32,
         }
         
-        if load_in_8bit:
+        if cpu_int8:
+            model_kwargs = {"torch_dtype": torch.float32, "low_cpu_mem_usage": True}
+            if LLM_CPU_THREADS:
+                torch.set_num_threads(LLM_CPU_THREADS)
+        elif load_in_8bit:
             model_kwargs["load_in_8bit"] = True
         elif load_in_4bit:
             model_kwargs["load_in_4bit"] = True
         
-        model = AutoModelForCausalLM.from_pretrained(
-            model_name,
-            **model_kwargs
-        )
+        def load_model(name: str):
+            if cpu_int8:
+                return load_int8_model(
+                    name,
+                    lambda: AutoModelForCausalLM.from_pretrained(name, **model_kwargs),
+                    build_model=lambda: AutoModelForCausalLM.from_config(
+                        AutoConfig.from_pretrained(name), torch_dtype=torch.float32
+                    )
+                )
+            return AutoModelForCausalLM.from_pretrained(name, **model_kwargs)
+        
+        model = load_model(model_name)
+        
+        prefix_cache = None
+        prompt_prefix = kwargs.get("prompt_prefix")
+        if prompt_prefix and kwargs.get("prefix_cache", PREFIX_CACHE_ENABLED):
+            from .prefix_cache import PrefixKVCache
+            
+            logger.info("Caching the KV state of the prompt prefix")
+            prefix_cache = PrefixKVCache(model, tokenizer, prompt_prefix)
         
-        # Create pipeline
-        pipe = pipeline(
-            "text-generation",
+        draft_model = None
+        draft_model_name = kwargs.get("draft_model_name", DRAFT_MODEL_NAME)
+        if draft_model_name:
+            logger.info(f"Using {draft_model_name} as draft model for speculative decoding")
+            draft_model = load_model(draft_model_name)
+        
+        return TransformersLLM(
             model=model,
             tokenizer=tokenizer,
-            max_length=kwargs.get("max_tokens", 2048),
+            prefix_cache=prefix_cache,
+            draft_model=draft_model,
+            max_new_tokens=kwargs.get("max_new_tokens", MAX_NEW_TOKENS),
             temperature=kwargs.get("temperature", 0.1),
             top_p=kwargs.get("top_p", 0.95),
             repetition_penalty=kwargs.get("repetition_penalty", 1.1)
         )
-        
-        # Create LangChain LLM
-        return HuggingFacePipeline(pipeline=pipe)
     
     except Exception as e:
         logger.error(f"Error loading local model {model_name}: {str(e)}")
         raise
 
+def get_gguf_llm(model_spec: str, **kwargs) -> LLM:
+    """
+    Get a quantized (e.g. Q4_K_M or Q8_0) GGUF model served by llama.cpp on the CPU.
+    
+    Args:
+        model_spec: Local ``.gguf`` path or ``repo_id:filename`` on the Hugging Face Hub
+        **kwargs: Additional arguments to pass to the LLM constructor
+    
+    Returns:
+        An instance of LLM
+    """
+    try:
+        from langchain_community.llms import LlamaCpp
+        
+        model_path = resolve_gguf_model(model_spec)
+        logger.info(f"Using GGUF LLM: {model_path}")
+        
+        return LlamaCpp(
+            model_path=model_path,
+            n_ctx=kwargs.get("num_ctx", 4096),
+            n_threads=kwargs.get("n_threads", LLM_CPU_THREADS or None),
+            max_tokens=kwargs.get("max_new_tokens", MAX_NEW_TOKENS),
+            temperature=kwargs.get("temperature", 0.1),
+            top_p=kwargs.get("top_p", 0.95),
+            repeat_penalty=kwargs.get("repetition_penalty", 1.1),
+            stop=STOP_SEQUENCES
+        )
+    
+    except Exception as e:
+        logger.error(f"Error loading GGUF model {model_spec}: {str(e)}")
+        raise
+
 def get_ollama_llm(model_name: str, **kwargs) -> LLM:
     """
     Get an LLM using Ollama.
@@ -139,8 +232,19 @@ def get_ollama_llm(model_name: str, **kwargs) -> LLM:
     try:
         logger.info(f"Using Ollama LLM: {model_name}")
         
-        return Ollama(
+        base_urls = kwargs.get("base_urls", [kwargs["base_url"]] if "base_url" in kwargs else OLLAMA_BASE_URLS)
+        if len(base_urls) > 1:
+            logger.info(f"Load balancing across Ollama backends: {', '.join(base_urls)}")
+        small_model = kwargs.get("small_model", SMALL_MODEL_NAME) or None
+        if small_model:
+            logger.info(f"Routing simple questions to {small_model}")
+
+        return ManagedOllamaLLM(
             model=model_name,
+            base_url=base_urls[0] if base_urls else OLLAMA_BASE_URL,
+            base_urls=base_urls,
+            small_model=small_model,
+            keep_alive=kwargs.get("keep_alive", OLLAMA_KEEP_ALIVE),
             temperature=kwargs.get("temperature", 0.1),
             num_ctx=kwargs.get("num_ctx", 4096)
         )
@@ -0,0 +1,86 @@
+from contextlib import closing
+from typing import Any, Dict, Iterator, List, Optional
+
+from langchain.callbacks.manager import CallbackManagerForLLMRun
+from langchain.llms.base import LLM
+from langchain_core.outputs import GenerationChunk
+
+from ..config import OLLAMA_BASE_URL
+from .generation import answer_token_budget, cancel_event, check_cancelled, stop_sequences
+from .router import BackendPool, get_backend_pool, select_model
+
+class ManagedOllamaLLM(LLM):
+    """
+    Ollama LLM backed by shared, pooled ``OllamaClient`` instances.
+
+    Every instance pointing at the same server shares keep-alive connections and
+    one concurrency limit, so bursts queue in the client instead of overwhelming
+    the server. With several ``base_urls`` requests are load balanced across the
+    servers, and with a ``small_model`` simple questions are answered by it.
+    Without an explicit ``num_predict`` the answer length limit adapts to the
+    question, and generation stops when the request is cancelled.
+    """
+
+    model: str
+    base_url: str = OLLAMA_BASE_URL
+    base_urls: Optional[List[str]] = None
+    small_model: Optional[str] = None
+    # Keeping the model loaded lets Ollama reuse the KV cache of a shared prompt prefix
+    keep_alive: Optional[str] = None
+    temperature: float = 0.1
+    num_ctx: int = 4096
+    num_predict: Optional[int] = None
+    stop: Optional[List[str]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "small_model": self.small_model,
+            "base_urls": self.base_urls or [self.base_url],
+            **self._options()
+        }
+
+    @property
+    def pool(self) -> BackendPool:
+        return get_backend_pool(self.base_urls or [self.base_url])
+
+    def _options(self, stop: Optional[List[str]] = None) -> Dict[str, Any]:
+        return {
+            "temperature": self.temperature,
+            "num_ctx": self.num_ctx,
+            "num_predict": self.num_predict if self.num_predict is not None else answer_token_budget(),
+            "stop": stop_sequences(stop or self.stop)
+        }
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[GenerationChunk]:
+        model = select_model(self.model, self.small_model)
+        event = cancel_event()
+        check_cancelled(event)
+        # Closing the stream on cancellation drops the connection, which stops Ollama generating
+        with closing(self.pool.generate(model, prompt, self._options(stop), keep_alive=self.keep_alive)) as stream:
+            for text in stream:
+                check_cancelled(event)
+                chunk = GenerationChunk(text=text)
+                if run_manager:
+                    run_manager.on_llm_new_token(text, chunk=chunk)
+                yield chunk
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> str:
+        return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
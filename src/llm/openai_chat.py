@@ -0,0 +1,80 @@
+from typing import Any, Dict, Iterator, List, Optional
+import threading
+
+from langchain.callbacks.manager import CallbackManagerForLLMRun
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+
+from ..config import LLM_MAX_CONCURRENCY, LLM_QUEUE_TIMEOUT
+from .client import BackendSlots
+from .generation import answer_token_budget, cancel_event, check_cancelled
+
+DEFAULT_API_BASE = "https://api.openai.com/v1"
+
+_slots: Dict[str, BackendSlots] = {}
+_slots_lock = threading.Lock()
+
+def get_backend_slots(backend: str, max_concurrency: int, queue_timeout: float) -> BackendSlots:
+    """Return the shared slot limiter for an API endpoint."""
+    with _slots_lock:
+        slots = _slots.get(backend)
+        if slots is None:
+            slots = BackendSlots(backend, max_concurrency, queue_timeout)
+            _slots[backend] = slots
+        return slots
+
+class ManagedChatOpenAI(ChatOpenAI):
+    """
+    ``ChatOpenAI`` whose requests take a slot of a shared per-endpoint limiter.
+
+    At most ``max_concurrency`` requests are in flight to one API endpoint;
+    further requests queue here for up to ``queue_timeout`` seconds (recorded
+    in ``rag_llm_slot_wait_seconds``) and then fail with ``LLMQueueTimeout``
+    instead of waiting inside the HTTP connection pool without a bound.
+    Without an explicit ``max_tokens`` the answer length limit adapts to the
+    question, and generation stops when the request is cancelled.
+    """
+
+    max_concurrency: int = LLM_MAX_CONCURRENCY
+    queue_timeout: float = LLM_QUEUE_TIMEOUT
+
+    @property
+    def slots(self) -> BackendSlots:
+        return get_backend_slots(self.openai_api_base or DEFAULT_API_BASE, self.max_concurrency, self.queue_timeout)
+
+    def _request_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if self.max_tokens is None:
+            kwargs.setdefault("max_tokens", answer_token_budget())
+        return kwargs
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        if self.streaming:
+            # Delegates to _stream, which takes the slot and checks for cancellation
+            return super()._generate(messages, stop, run_manager, **kwargs)
+        event = cancel_event()
+        check_cancelled(event)
+        with self.slots.slot():
+            result = super()._generate(messages, stop, run_manager, **self._request_kwargs(kwargs))
+        check_cancelled(event)
+        return result
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> Iterator[ChatGenerationChunk]:
+        event = cancel_event()
+        check_cancelled(event)
+        with self.slots.slot():
+            for chunk in super()._stream(messages, stop, run_manager, **self._request_kwargs(kwargs)):
+                check_cancelled(event)
+                yield chunk
@@ -0,0 +1,76 @@
+from typing import Any, Optional, Tuple
+import copy
+import logging
+import threading
+import time
+
+from ..metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PREFIX_CACHE_TOKENS = REGISTRY.counter(
+    "rag_llm_prefix_cache_tokens_total",
+    "Prompt tokens served from the prefix KV cache instead of being prefilled"
+)
+PREFIX_CACHE_REQUESTS = REGISTRY.counter(
+    "rag_llm_prefix_cache_requests_total",
+    "Local generations by prefix cache outcome",
+    ["outcome"]
+)
+
+class PrefixKVCache:
+    """
+    Key/value attention state for a fixed prompt prefix.
+
+    The prefix is run through the model once; every prompt starting with it
+    reuses a copy of that state, so only the remaining tokens are prefilled.
+    """
+
+    def __init__(self, model: Any, tokenizer: Any, prefix: str):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.prefix = prefix
+        self._prefix_ids = None
+        self._past_key_values = None
+        self._lock = threading.Lock()
+
+    def _ensure_prefix(self) -> None:
+        import torch
+
+        with self._lock:
+            if self._past_key_values is not None:
+                return
+            start = time.perf_counter()
+            ids = self.tokenizer(self.prefix, return_tensors="pt").input_ids.to(self.model.device)
+            with torch.no_grad():
+                output = self.model(input_ids=ids, use_cache=True)
+            self._prefix_ids = ids
+            self._past_key_values = output.past_key_values
+            logger.info(f"Cached {ids.shape[-1]} prompt prefix tokens in {time.perf_counter() - start:.2f}s")
+
+    def prepare(self, prompt: str) -> Tuple[Any, Optional[Any], int]:
+        """
+        Tokenize a prompt, reusing the cached prefix state when it applies.
+
+        Returns:
+            (input_ids, past_key_values or None, number of cached tokens)
+        """
+        import torch
+
+        if not self.prefix or not prompt.startswith(self.prefix):
+            PREFIX_CACHE_REQUESTS.labels(outcome="miss").inc()
+            ids = self.tokenizer(prompt, return_tensors="pt").input_ids.to(self.model.device)
+            return ids, None, 0
+
+        self._ensure_prefix()
+        # Tokenize the suffix on its own so the prefix token ids match the cached ones exactly
+        suffix_ids = self.tokenizer(
+            prompt[len(self.prefix):], return_tensors="pt", add_special_tokens=False
+        ).input_ids.to(self.model.device)
+        input_ids = torch.cat([self._prefix_ids, suffix_ids], dim=-1)
+        cached = self._prefix_ids.shape[-1]
+        PREFIX_CACHE_REQUESTS.labels(outcome="hit").inc()
+        PREFIX_CACHE_TOKENS.inc(cached)
+        # generate() extends the cache in place, so each request gets its own copy
+        return input_ids, copy.deepcopy(self._past_key_values), cached
+
@@ -0,0 +1,243 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+import re
+import threading
+import time
+
+import requests
+
+from ..config import (
+    LLM_QUEUE_TIMEOUT,
+    LLM_ROUTING_STRATEGY,
+    LLM_HEALTH_CHECK_INTERVAL,
+    SMALL_MODEL_NAME,
+    SMALL_MODEL_MAX_WORDS
+)
+from ..metrics import REGISTRY, record_stage
+from .client import LLMBackendBusy, LLMQueueTimeout, OllamaClient, get_ollama_client
+
+logger = logging.getLogger(__name__)
+
+ROUTED_REQUESTS = REGISTRY.counter(
+    "rag_llm_routed_requests_total",
+    "LLM requests routed to each backend and model",
+    ["backend", "model"]
+)
+FAILOVERS = REGISTRY.counter(
+    "rag_llm_failovers_total",
+    "LLM requests retried on another backend",
+    ["backend"]
+)
+ROUTE_WAIT_SECONDS = REGISTRY.histogram(
+    "rag_llm_route_wait_seconds",
+    "Time LLM requests wait for any backend to have a free slot"
+)
+ROUTE_QUEUE_TIMEOUTS = REGISTRY.counter(
+    "rag_llm_queue_timeouts_total",
+    "LLM requests that gave up waiting for a free backend slot"
+)
+BACKEND_HEALTHY = REGISTRY.gauge(
+    "rag_llm_backend_healthy",
+    "Whether an LLM backend passed its last health check",
+    ["backend"]
+)
+
+# Question being answered by the current request, used for model routing
+_current_question: ContextVar[Optional[str]] = ContextVar("rag_question", default=None)
+
+_COMPLEX_QUESTION = re.compile(
+    r"\b(why|how does|how do|explain|compare|difference|differences|summari[sz]e|analy[sz]e|"
+    r"evaluate|pros and cons|step by step|list all|implications?)\b",
+    re.IGNORECASE
+)
+
+@contextmanager
+def routing_question(question: str) -> Iterator[None]:
+    """Make the user's question visible to the LLM router while answering it."""
+    token = _current_question.set(question)
+    try:
+        yield
+    finally:
+        _current_question.reset(token)
+
+def current_question() -> Optional[str]:
+    """The question being answered in this context, if known."""
+    return _current_question.get()
+
+def is_simple_question(question: str, max_words: int = SMALL_MODEL_MAX_WORDS) -> bool:
+    """Heuristic: short factual lookups can go to the small model."""
+    return len(question.split()) <= max_words and not _COMPLEX_QUESTION.search(question)
+
+def select_model(model: str, small_model: Optional[str] = SMALL_MODEL_NAME) -> str:
+    """Pick the small model for simple questions when one is configured."""
+    question = current_question()
+    if small_model and question and is_simple_question(question):
+        return small_model
+    return model
+
+
+class _Backend:
+    """Routing state for one Ollama server."""
+
+    def __init__(self, client: OllamaClient):
+        self.client = client
+        self.active = 0  # requests this pool has routed here and not finished
+        self.healthy = True
+        self.latency = 0.0  # EWMA of request duration in seconds
+        self._healthy_gauge = BACKEND_HEALTHY.labels(backend=client.base_url)
+        self._healthy_gauge.set(1)
+
+    def mark(self, healthy: bool) -> None:
+        if healthy != self.healthy:
+            logger.warning(f"LLM backend {self.client.base_url} is now {'healthy' if healthy else 'unhealthy'}")
+        self.healthy = healthy
+        self._healthy_gauge.set(1 if healthy else 0)
+
+    def observe(self, seconds: float, alpha: float = 0.2) -> None:
+        self.latency = seconds if self.latency == 0.0 else (1 - alpha) * self.latency + alpha * seconds
+
+    @property
+    def has_free_slot(self) -> bool:
+        return self.active < self.client.max_concurrency
+
+    def score(self, strategy: str) -> float:
+        if strategy == "latency":
+            # Expected wait: requests ahead of us times how long each takes here
+            return (self.active + 1) * (self.latency or 1.0)
+        return self.active
+
+
+class BackendPool:
+    """
+    Routes generations across several Ollama servers.
+
+    A request is bound to a backend only once some backend has a free slot, so a
+    burst drains through whichever servers finish first instead of queueing behind
+    a slow one. This is the only place requests queue; one that waits longer than
+    ``queue_timeout`` fails with ``LLMQueueTimeout``. Among backends with a free slot it picks the one with the fewest
+    outstanding requests ("least_outstanding") or the lowest expected wait
+    ("latency"). A backend that
+    fails before streaming any output is marked unhealthy and the request fails
+    over to the next one; a background thread periodically re-checks every backend.
+    """
+
+    def __init__(
+        self,
+        base_urls: Sequence[str],
+        strategy: str = LLM_ROUTING_STRATEGY,
+        health_check_interval: float = LLM_HEALTH_CHECK_INTERVAL,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT
+    ):
+        if not base_urls:
+            raise ValueError("At least one LLM backend URL is required")
+        if strategy not in ("least_outstanding", "latency"):
+            raise ValueError(f"Invalid routing strategy: {strategy}")
+
+        self.strategy = strategy
+        self.queue_timeout = queue_timeout
+        self.backends = [_Backend(get_ollama_client(url)) for url in base_urls]
+        self._available = threading.Condition()
+        self._stop_event = threading.Event()
+        if len(self.backends) > 1 and health_check_interval > 0:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(health_check_interval,), name="llm-health", daemon=True
+            )
+            self._health_thread.start()
+
+    def _choose(self, exclude: List[_Backend]) -> Optional[_Backend]:
+        """Wait for a backend with a free slot and reserve it; None if every backend was tried."""
+        start = time.perf_counter()
+        with self._available:
+            while True:
+                candidates = [b for b in self.backends if b.healthy and b not in exclude]
+                if not candidates:
+                    # Everything looks down: try the remaining backends anyway rather than fail outright
+                    candidates = [b for b in self.backends if b not in exclude]
+                if not candidates:
+                    return None
+
+                free = [b for b in candidates if b.has_free_slot]
+                if free:
+                    backend = min(free, key=lambda b: b.score(self.strategy))
+                    backend.active += 1
+                    break
+                remaining = self.queue_timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    backend = None
+                    break
+                self._available.wait(remaining)
+
+        waited = time.perf_counter() - start
+        ROUTE_WAIT_SECONDS.observe(waited)
+        record_stage("llm_queue", waited)
+        if backend is None:
+            ROUTE_QUEUE_TIMEOUTS.inc()
+            raise LLMQueueTimeout(
+                f"Waited {waited:.1f}s for a free slot on {len(self.backends)} LLM backends"
+            )
+        return backend
+
+    def _finish(self, backend: _Backend) -> None:
+        with self._available:
+            backend.active -= 1
+            self._available.notify()
+
+    def generate(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None, **params: Any) -> Iterator[str]:
+        """Stream a completion from the best available backend, failing over on errors."""
+        tried: List[_Backend] = []
+        while True:
+            backend = self._choose(tried)
+            if backend is None:
+                raise RuntimeError(f"All {len(self.backends)} LLM backends failed")
+            tried.append(backend)
+
+            ROUTED_REQUESTS.labels(backend=backend.client.base_url, model=model).inc()
+            start = time.perf_counter()
+            started = False
+            try:
+                for text in backend.client.generate(model, prompt, options, **params):
+                    started = True
+                    yield text
+                backend.observe(time.perf_counter() - start)
+                return
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError, TimeoutError, LLMBackendBusy) as e:
+                response = getattr(e, "response", None)
+                if response is not None and response.status_code < 500:
+                    raise
+                if not isinstance(e, LLMBackendBusy):
+                    # No free slot means busy, not down
+                    backend.mark(False)
+                if started:
+                    # Output was already streamed to the caller; retrying would duplicate it
+                    raise
+                FAILOVERS.labels(backend=backend.client.base_url).inc()
+                logger.warning(f"LLM backend {backend.client.base_url} failed, failing over: {str(e)}")
+            finally:
+                self._finish(backend)
+
+    def _health_loop(self, interval: float) -> None:
+        while not self._stop_event.wait(interval):
+            for backend in self.backends:
+                backend.mark(backend.client.is_healthy())
+            with self._available:
+                # Recovered backends may unblock waiting requests
+                self._available.notify_all()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+
+_pools: Dict[Tuple[str, ...], BackendPool] = {}
+_pools_lock = threading.Lock()
+
+def get_backend_pool(base_urls: Sequence[str]) -> BackendPool:
+    """Return the shared pool for a set of backend URLs."""
+    key = tuple(url.rstrip("/") for url in base_urls)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = BackendPool(key)
+            _pools[key] = pool
+        return pool
@@ -0,0 +1,124 @@
+from typing import Any, Dict, List, Optional
+
+from langchain.callbacks.manager import CallbackManagerForLLMRun
+from langchain.llms.base import LLM
+
+from ..metrics import record_value
+from .generation import answer_token_budget, cancel_event, check_cancelled, stop_sequences, truncate_at_stop
+
+def _supports_stop_strings() -> bool:
+    """Whether ``generate()`` accepts ``stop_strings`` (transformers 4.39 and later)."""
+    import transformers
+
+    return hasattr(transformers, "StopStringCriteria")
+
+class TransformersLLM(LLM):
+    """
+    Local transformers causal LM with generation controls for RAG answers.
+
+    - ``prefix_cache`` (a ``PrefixKVCache``) reuses the KV state of the fixed prompt prefix
+    - ``draft_model`` enables speculative (assisted) decoding: the small model proposes
+      tokens that the main model verifies in one forward pass. Assisted generation
+      manages both models' caches itself, so the prefix cache is not used with it
+    - the answer length limit adapts to the question and stop sequences end it early
+    - generation stops when the request's cancellation event is set
+    """
+
+    model: Any
+    tokenizer: Any
+    prefix_cache: Any = None
+    draft_model: Any = None
+    max_new_tokens: int = 512
+    temperature: float = 0.1
+    top_p: float = 0.95
+    repetition_penalty: float = 1.1
+    stop: Optional[List[str]] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "huggingface_transformers"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "model": getattr(self.model, "name_or_path", None),
+            "draft_model": getattr(self.draft_model, "name_or_path", None),
+            "max_new_tokens": self.max_new_tokens,
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "repetition_penalty": self.repetition_penalty
+        }
+
+    def _stopping_criteria(self, event, stop: List[str], prompt_length: int) -> Any:
+        """Criteria for cancellation and, on transformers < 4.39 (no ``stop_strings``), stop sequences."""
+        from transformers import StoppingCriteria, StoppingCriteriaList
+
+        tokenizer = self.tokenizer
+        criteria = StoppingCriteriaList()
+        # Only the tail can contain a stop sequence that was not there one step ago
+        window = max((len(sequence) for sequence in stop), default=0) + 8
+
+        class _Cancelled(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs) -> bool:
+                return event.is_set()
+
+        class _StopStrings(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs) -> bool:
+                tail = tokenizer.decode(input_ids[0, prompt_length:][-window:], skip_special_tokens=True)
+                return any(sequence in tail for sequence in stop)
+
+        if event is not None:
+            criteria.append(_Cancelled())
+        if stop and not _supports_stop_strings():
+            criteria.append(_StopStrings())
+        return criteria
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> str:
+        import torch
+
+        event = cancel_event()
+        check_cancelled(event)
+
+        past_key_values, cached = None, 0
+        if self.prefix_cache is not None and self.draft_model is None:
+            input_ids, past_key_values, cached = self.prefix_cache.prepare(prompt)
+        else:
+            input_ids = self.tokenizer(prompt, return_tensors="pt").input_ids.to(self.model.device)
+        record_value("prompt_tokens", input_ids.shape[-1])
+        record_value("prompt_cached_tokens", cached)
+
+        stop = stop_sequences(stop or self.stop)
+        generate_kwargs = {
+            "input_ids": input_ids,
+            "attention_mask": torch.ones_like(input_ids),
+            "max_new_tokens": answer_token_budget(default=self.max_new_tokens),
+            "repetition_penalty": self.repetition_penalty,
+            "pad_token_id": self.tokenizer.pad_token_id or self.tokenizer.eos_token_id
+        }
+        if stop and _supports_stop_strings():
+            # Lets generate() stop as soon as a stop sequence is produced
+            generate_kwargs.update(stop_strings=stop, tokenizer=self.tokenizer)
+        if past_key_values is not None:
+            generate_kwargs["past_key_values"] = past_key_values
+        if self.draft_model is not None:
+            generate_kwargs["assistant_model"] = self.draft_model
+        if self.temperature > 0:
+            generate_kwargs.update(do_sample=True, temperature=self.temperature, top_p=self.top_p)
+        criteria = self._stopping_criteria(event, stop, input_ids.shape[-1])
+        if criteria:
+            generate_kwargs["stopping_criteria"] = criteria
+
+        with torch.no_grad():
+            output = self.model.generate(**generate_kwargs)
+        check_cancelled(event)
+
+        new_tokens = output[0, input_ids.shape[-1]:]
+        record_value("generated_tokens", len(new_tokens))
+        text = self.tokenizer.decode(new_tokens, skip_special_tokens=True)
+        return truncate_at_stop(text, stop)
@@ -2,7 +2,7 @@ import logging
 import uvicorn
 from pathlib import Path
 
-from .config import HOST, PORT
+from .config import HOST, PORT, WORKERS, SERVING_ROLE
 from .api import create_app
 
 # Configure logging
@@ -14,7 +14,22 @@ logger = logging.getLogger(__name__)
 
 def main():
     """Main entry point for the application."""
-    logger.info("Starting RAG API server")
+    logger.info(f"Starting RAG API server ({SERVING_ROLE}, {WORKERS} worker(s))")
+    
+    if WORKERS > 1:
+        if SERVING_ROLE != "reader":
+            logger.warning("Multiple workers without SERVING_ROLE=reader keep separate, diverging indexes")
+        
+        # Each worker process builds its own app from the import string
+        uvicorn.run(
+            "src.api.app:create_app",
+            factory=True,
+            host=HOST,
+            port=PORT,
+            workers=WORKERS,
+            log_level="info"
+        )
+        return
     
     # Create the FastAPI app
     app = create_app()
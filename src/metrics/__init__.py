@@ -0,0 +1,2 @@
+from .registry import REGISTRY, Counter, Gauge, Histogram, MetricsRegistry
+from .tracing import start_trace, end_trace, record_stage, record_value, stage
\ No newline at end of file
@@ -0,0 +1,195 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import bisect
+import threading
+
+# Latency buckets in seconds, from sub-millisecond vector searches to long generations
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render a Prometheus label set."""
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Base class for metrics with optional labels."""
+    
+    metric_type = ""
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+    
+    def labels(self, **labels: str):
+        """Return the child metric for a label set."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+    
+    def _default(self):
+        return self.labels()
+    
+    def _new_child(self):
+        raise NotImplementedError
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _CounterValue:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+    
+    def render(self, name, labelnames, key) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, key)} {self.value}"]
+
+
+class _GaugeValue(_CounterValue):
+    def set(self, value: float) -> None:
+        self.value = value
+    
+    def dec(self, amount: float = 1.0) -> None:
+        self.inc(-amount)
+
+
+class _HistogramValue:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+    
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+    
+    def render(self, name, labelnames, key) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            le = 'le="%s"' % bound
+            lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{name}_bucket{_format_labels(labelnames, key, le)} {self.count}")
+        lines.append(f"{name}_sum{_format_labels(labelnames, key)} {self.sum}")
+        lines.append(f"{name}_count{_format_labels(labelnames, key)} {self.count}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+    
+    metric_type = "counter"
+    
+    def _new_child(self):
+        return _CounterValue()
+    
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+    
+    metric_type = "gauge"
+    
+    def _new_child(self):
+        return _GaugeValue()
+    
+    def set(self, value: float) -> None:
+        self._default().set(value)
+    
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+    
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+
+class Histogram(_Metric):
+    """Histogram with fixed cumulative buckets."""
+    
+    metric_type = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+    
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+    
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+
+class MetricsRegistry:
+    """Process-wide collection of metrics."""
+    
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = metric_class(name, *args, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"Metric {name} already registered as {metric.metric_type}")
+            return metric
+    
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+    
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+    
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None
+    ) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets)
+    
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
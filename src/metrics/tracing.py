@@ -0,0 +1,50 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+import time
+
+from .registry import Histogram
+
+# Per-request stage timings, only populated while a trace is active
+_current_trace: ContextVar[Optional[Dict[str, float]]] = ContextVar("rag_trace", default=None)
+
+def start_trace() -> Dict[str, float]:
+    """Start collecting stage timings for the current request."""
+    trace: Dict[str, float] = {}
+    _current_trace.set(trace)
+    return trace
+
+def end_trace() -> Optional[Dict[str, float]]:
+    """Stop collecting stage timings and return them."""
+    trace = _current_trace.get()
+    _current_trace.set(None)
+    return trace
+
+def record_stage(name: str, seconds: float) -> None:
+    """Add a duration to the active trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace[name] = trace.get(name, 0.0) + seconds
+
+def record_value(name: str, value: float) -> None:
+    """Attach a non-timing value (e.g. prompt size) to the active trace, if any."""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace[name] = value
+
+@contextmanager
+def stage(name: str, histogram: Optional[Histogram] = None) -> Iterator[None]:
+    """
+    Time a block of code.
+    
+    The duration is observed on ``histogram`` and added to the active trace
+    under ``name`` (in seconds).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if histogram is not None:
+            histogram.observe(elapsed)
+        record_stage(name, elapsed)
@@ -1,5 +1,7 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
+import threading
 
 from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
@@ -7,12 +9,55 @@ from langchain.schema import Document
 from langchain.vectorstores.base import VectorStore
 from langchain.llms.base import LLM
 
-from ..config import TOP_K_RETRIEVAL
-from ..llm import get_llm
-from ..vectorstore import get_vector_store
+from ..config import TOP_K_RETRIEVAL, USE_PARENT_CHUNKS, SEARCH_TYPE, BATCH_LLM_CONCURRENCY, ADAPTIVE_K
+from ..document_processor.parents import ParentStore
+from ..llm import get_llm, MetricsCallbackHandler, GenerationCancelled, cancellation, routing_question
+from ..metrics import REGISTRY, start_trace, end_trace, stage
+from ..vectorstore import get_vector_store, add_documents, delete_documents
+from .retriever import ContextRetriever, RETRIEVAL_SECONDS
 
 logger = logging.getLogger(__name__)
 
+# Identical on every request, so it comes first: backends that cache the KV state
+# of a prompt prefix (Ollama, the transformers path's PrefixKVCache) only prefill the context and question
+PROMPT_PREFIX = """
+        You are a helpful assistant that answers questions based on the provided context.
+        
+        Instructions:
+        - Answer the question based on the context provided.
+        - If the context doesn't contain the answer, then search on google or web if not found then say "I don't have enough information to answer this question."
+        - Provide detailed and accurate answers.
+        - Cite specific parts of the context when relevant.
+        """
+
+PROMPT_TEMPLATE = PROMPT_PREFIX + """
+        Context:
+        {context}
+        
+        Question:
+        {question}
+        
+        Answer:
+        """
+
+QUERY_SECONDS = REGISTRY.histogram(
+    "rag_query_seconds",
+    "End-to-end RAG query duration"
+)
+QUERIES = REGISTRY.counter(
+    "rag_queries_total",
+    "Number of RAG queries",
+    ["status"]
+)
+INDEX_ADD_SECONDS = REGISTRY.histogram(
+    "rag_index_add_seconds",
+    "Time spent adding documents to the vector store"
+)
+INDEXED_CHUNKS = REGISTRY.counter(
+    "rag_indexed_chunks_total",
+    "Number of chunks added to the vector store"
+)
+
 class RAGChain:
     """Main RAG chain that combines retrieval and generation."""
     
@@ -20,7 +65,10 @@ class RAGChain:
         self,
         vector_store: Optional[VectorStore] = None,
         llm: Optional[LLM] = None,
-        top_k: int = TOP_K_RETRIEVAL
+        top_k: int = TOP_K_RETRIEVAL,
+        use_parent_chunks: bool = USE_PARENT_CHUNKS,
+        search_type: str = SEARCH_TYPE,
+        adaptive_k: bool = ADAPTIVE_K
     ):
         """
         Initialize the RAG chain.
@@ -29,43 +77,42 @@ class RAGChain:
             vector_store: Vector store for retrieval
             llm: Language model for generation
             top_k: Number of documents to retrieve
+            use_parent_chunks: Send the enclosing section of each retrieved chunk to the LLM
+            search_type: "similarity" or "mmr" (diverse top-k by Maximal Marginal Relevance)
+            adaptive_k: Choose the number of chunks per query from their similarity scores
+                (between ADAPTIVE_K_MIN and ADAPTIVE_K_MAX) instead of always using ``top_k``
         """
         self.vector_store = vector_store or get_vector_store()
-        self.llm = llm or get_llm()
+        self.llm = llm or get_llm(prompt_prefix=PROMPT_PREFIX)
         self.top_k = top_k
+        self.use_parent_chunks = use_parent_chunks
+        # Also used when parent chunks are off, so deletes drop stored sections
+        self.parent_store = ParentStore()
+        self.search_type = search_type
+        self.adaptive_k = adaptive_k
+        self.metrics_callback = MetricsCallbackHandler()
         
         # Create the retriever
-        self.retriever = self.vector_store.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": self.top_k}
-        )
+        self.retriever = self._create_retriever()
         
         # Create the chain
         self.chain = self._create_chain()
     
+    def _create_retriever(self) -> ContextRetriever:
+        """Create the retriever over the vector store."""
+        return ContextRetriever(
+            vector_store=self.vector_store,
+            search_kwargs={"k": self.top_k},
+            expand_parents=self.use_parent_chunks,
+            parent_store=self.parent_store,
+            search_type=self.search_type,
+            adaptive_k=self.adaptive_k
+        )
+    
     def _create_chain(self) -> RetrievalQA:
         """Create the retrieval QA chain."""
-        # Define the prompt template
-        template = """
-        You are a helpful assistant that answers questions based on the provided context.
-        
-        Context:
-        {context}
-        
-        Question:
-        {question}
-        
-        Instructions:
-        - Answer the question based on the context provided.
-        - If the context doesn't contain the answer, then search on google or web if not found then say "I don't have enough information to answer this question."
-        - Provide detailed and accurate answers.
-        - Cite specific parts of the context when relevant.
-        
-        Answer:
-        """
-        
         prompt = PromptTemplate(
-            template=template,
+            template=PROMPT_TEMPLATE,
             input_variables=["context", "question"]
         )
         
@@ -78,46 +125,172 @@ class RAGChain:
             chain_type_kwargs={"prompt": prompt}
         )
     
-    def query(self, question: str) -> Dict[str, Any]:
+    def query(
+        self,
+        question: str,
+        include_timings: bool = False,
+        cancel_event: Optional[threading.Event] = None
+    ) -> Dict[str, Any]:
         """
         Query the RAG chain.
         
         Args:
             question: Question to answer
+            include_timings: Add a per-stage timing breakdown (in milliseconds) to the result
+            cancel_event: Stops generation when set, e.g. once the client has disconnected
         
         Returns:
             Dictionary with answer and source documents
         """
         logger.info(f"Querying RAG chain with question: {question}")
         
+        start_trace()
         try:
-            result = self.chain({"query": question})
+            with stage("total", QUERY_SECONDS), routing_question(question), cancellation(cancel_event):
+                result = self.chain({"query": question}, callbacks=[self.metrics_callback])
             
             # Format the result
             answer = result.get("result", "")
             source_documents = result.get("source_documents", [])
             
             # Extract source information
-            sources = []
-            for doc in source_documents:
-                source = {
-                    "content": doc.page_content[:500] + "..." if len(doc.page_content) > 500 else doc.page_content,
-                    "metadata": doc.metadata
-                }
-                sources.append(source)
+            sources = self._format_sources(source_documents)
             
-            return {
+            QUERIES.labels(status="success").inc()
+            response = {
                 "answer": answer,
                 "sources": sources
             }
+            trace = end_trace()
+            if include_timings:
+                response["timings"] = self._format_timings(trace)
+            return response
+        
+        except GenerationCancelled:
+            end_trace()
+            QUERIES.labels(status="cancelled").inc()
+            logger.info("Query cancelled before the answer was complete")
+            return {"answer": "", "sources": []}
         
         except Exception as e:
+            end_trace()
+            QUERIES.labels(status="error").inc()
             logger.error(f"Error querying RAG chain: {str(e)}")
             return {
                 "answer": f"Error: {str(e)}",
                 "sources": []
             }
     
+    @staticmethod
+    def _format_sources(source_documents: List[Document]) -> List[Dict[str, Any]]:
+        """Extract source information for a response."""
+        sources = []
+        for doc in source_documents:
+            source = {
+                "content": doc.page_content[:500] + "..." if len(doc.page_content) > 500 else doc.page_content,
+                "metadata": {k: v for k, v in doc.metadata.items() if k != "parent_content"}
+            }
+            sources.append(source)
+        return sources
+    
+    def batch_query(
+        self,
+        questions: List[str],
+        max_concurrency: int = BATCH_LLM_CONCURRENCY
+    ) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Answer many questions, yielding results as they complete.
+        
+        Distinct questions are embedded as queries, exactly as ``query`` does, and
+        searched as a single matrix against the index; identical questions share
+        one retrieval and one LLM call. LLM calls run on up to ``max_concurrency`` threads.
+        
+        Args:
+            questions: Questions to answer
+            max_concurrency: Maximum number of concurrent LLM calls
+        
+        Returns:
+            Iterator of (index into ``questions``, result) pairs in completion order
+        """
+        logger.info(f"Batch querying RAG chain with {len(questions)} questions")
+        
+        # Deduplicate identical questions
+        positions: Dict[str, List[int]] = {}
+        for index, question in enumerate(questions):
+            positions.setdefault(question.strip(), []).append(index)
+        unique_questions = list(positions)
+        
+        retriever = self.retriever
+        combine_chain = self.chain.combine_documents_chain
+        
+        try:
+            with stage("retrieval", RETRIEVAL_SECONDS):
+                embeddings = self.vector_store.embeddings
+                # Query-side embeddings: models with query/passage prompts embed the two differently
+                vectors = [embeddings.embed_query(question) for question in unique_questions]
+                retrieved = retriever.search_by_vectors(vectors)
+        except Exception as e:
+            logger.error(f"Error retrieving documents for batch: {str(e)}")
+            error = {"answer": f"Error: {str(e)}", "sources": []}
+            for index in range(len(questions)):
+                QUERIES.labels(status="error").inc()
+                yield index, error
+            return
+        
+        def generate(question: str, documents: List[Document]) -> Dict[str, Any]:
+            try:
+                with stage("total", QUERY_SECONDS), routing_question(question), cancellation(stopped):
+                    output = combine_chain(
+                        {"input_documents": documents, "question": question},
+                        callbacks=[self.metrics_callback]
+                    )
+                QUERIES.labels(status="success").inc()
+                return {"answer": output.get("output_text", ""), "sources": self._format_sources(documents)}
+            except GenerationCancelled:
+                QUERIES.labels(status="cancelled").inc()
+                return {"answer": "", "sources": []}
+            except Exception as e:
+                QUERIES.labels(status="error").inc()
+                logger.error(f"Error answering batch question: {str(e)}")
+                return {"answer": f"Error: {str(e)}", "sources": []}
+        
+        stopped = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=max(1, max_concurrency))
+        try:
+            futures = {
+                executor.submit(generate, question, documents): question
+                for question, documents in zip(unique_questions, retrieved)
+            }
+            for future in as_completed(futures):
+                result = future.result()
+                for index in positions[futures[future]]:
+                    yield index, result
+        finally:
+            # Drop queued LLM calls and stop running ones if the consumer stops early (e.g. client disconnect)
+            stopped.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    @staticmethod
+    def _format_timings(trace: Optional[Dict[str, float]]) -> Dict[str, float]:
+        """Convert a trace to milliseconds, leaving size values untouched."""
+        timings = {}
+        for name, value in (trace or {}).items():
+            if name.endswith(("_chars", "_tokens", "_chunks")):
+                timings[name] = value
+            else:
+                timings[f"{name}_ms"] = round(value * 1000, 3)
+        return timings
+    
+    def set_vector_store(self, vector_store: VectorStore) -> None:
+        """
+        Switch to a different vector store, e.g. a newly published snapshot.
+        
+        Queries already running keep the chain (and store) they started with.
+        """
+        self.vector_store = vector_store
+        self.retriever = self._create_retriever()
+        self.chain = self._create_chain()
+    
     def add_documents(self, documents: List[Document]) -> None:
         """
         Add documents to the vector store.
@@ -128,13 +301,12 @@ class RAGChain:
         logger.info(f"Adding {len(documents)} documents to vector store")
         
         try:
-            self.vector_store.add_documents(documents)
+            with stage("index_add", INDEX_ADD_SECONDS):
+                add_documents(self.vector_store, documents)
+            INDEXED_CHUNKS.inc(len(documents))
             
             # Update the retriever
-            self.retriever = self.vector_store.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": self.top_k}
-            )
+            self.retriever = self._create_retriever()
             
             # Recreate the chain
             self.chain = self._create_chain()
@@ -143,4 +315,22 @@ class RAGChain:
         
         except Exception as e:
             logger.error(f"Error adding documents to vector store: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    def delete_documents(
+        self,
+        document_ids: Optional[List[str]] = None,
+        sources: Optional[List[str]] = None
+    ) -> int:
+        """
+        Delete all chunks of the given documents from the vector store.
+        
+        Args:
+            document_ids: ``document_id`` values of the documents to delete
+            sources: Source file paths or URLs of the documents to delete
+            
+        Returns:
+            Number of chunks deleted
+        """
+        logger.info(f"Deleting documents (ids={document_ids}, sources={sources})")
+        return delete_documents(self.vector_store, document_ids, sources, parent_store=self.parent_store)
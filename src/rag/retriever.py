@@ -0,0 +1,404 @@
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import logging
+
+from langchain.callbacks.manager import CallbackManagerForRetrieverRun
+from langchain.schema import BaseRetriever, Document
+from langchain.vectorstores.base import VectorStore
+from langchain_community.vectorstores import FAISS, Chroma
+from langchain_community.vectorstores.utils import DistanceStrategy
+import numpy as np
+
+from ..config import (
+    SEARCH_TYPE, MMR_FETCH_K, MMR_LAMBDA,
+    ADAPTIVE_K, ADAPTIVE_K_MIN, ADAPTIVE_K_MAX, ADAPTIVE_K_SCORE_RATIO, ADAPTIVE_K_MIN_GAP,
+    ROUTING_DOCUMENTS
+)
+from ..document_processor.parents import ParentStore
+from ..metrics import REGISTRY, record_value, stage
+from ..vectorstore.maintenance import filtered_search_with_distances, reconstruct_vectors
+from ..vectorstore.routing import routed_search
+
+VECTOR_SEARCH_SECONDS = REGISTRY.histogram(
+    "rag_vector_search_seconds",
+    "Time spent searching the vector index"
+)
+RETRIEVAL_SECONDS = REGISTRY.histogram(
+    "rag_retrieval_seconds",
+    "Total retrieval time including query embedding"
+)
+MMR_SECONDS = REGISTRY.histogram(
+    "rag_mmr_seconds",
+    "Time spent on diversity (MMR) selection, including vector reconstruction"
+)
+RETRIEVED_CHUNKS = REGISTRY.histogram(
+    "rag_retrieved_chunks",
+    "Chunks retrieved per query (before parent expansion)",
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20)
+)
+
+logger = logging.getLogger(__name__)
+
+def expand_parent_documents(documents: List[Document], parent_store: Optional[ParentStore] = None) -> List[Document]:
+    """
+    Replace chunks that have a parent section with that section.
+
+    Sections are looked up in ``parent_store`` by the chunks' ``parent_id``
+    (chunks indexed before the store existed carry it as ``parent_content``).
+    Chunks sharing a parent collapse into a single document, so the prompt gets
+    each enclosing section once; chunks whose parent is missing are kept as is.
+    """
+    parent_ids = {doc.metadata["parent_id"] for doc in documents if doc.metadata.get("parent_id")}
+    parents = parent_store.get_many(parent_ids) if parent_store is not None and parent_ids else {}
+
+    expanded = []
+    seen_parents = set()
+    for doc in documents:
+        parent_id = doc.metadata.get("parent_id")
+        parent_content = parents.get(parent_id) or doc.metadata.get("parent_content")
+        if not parent_id or not parent_content:
+            expanded.append(doc)
+            continue
+        if parent_id in seen_parents:
+            continue
+        seen_parents.add(parent_id)
+        metadata = {key: value for key, value in doc.metadata.items() if key != "parent_content"}
+        expanded.append(Document(page_content=parent_content, metadata=metadata))
+    return expanded
+
+
+def mmr_select(
+    query_vector: np.ndarray,
+    candidate_vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Pick ``k`` candidates by Maximal Marginal Relevance.
+
+    Each step takes the candidate maximizing
+    ``lambda_mult * sim(query, c) - (1 - lambda_mult) * max sim(c, selected)`` using
+    cosine similarity. The candidate-candidate similarity matrix is computed once
+    and the running maximum is updated with one vector op per step.
+
+    Args:
+        query_vector: Query embedding, shape (d,)
+        candidate_vectors: Candidate embeddings, shape (n, d), best match first
+        k: Number of candidates to select
+        lambda_mult: 1 ranks purely by relevance, 0 purely by diversity
+
+    Returns:
+        Row indices into ``candidate_vectors`` in selection order
+    """
+    count = len(candidate_vectors)
+    if count == 0 or k <= 0:
+        return []
+
+    candidates = candidate_vectors / np.maximum(np.linalg.norm(candidate_vectors, axis=1, keepdims=True), 1e-12)
+    query = query_vector / max(float(np.linalg.norm(query_vector)), 1e-12)
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    first = int(np.argmax(relevance))
+    selected = [first]
+    available = np.ones(count, dtype=bool)
+    available[first] = False
+    max_similarity = similarity[:, first].copy()
+
+    while len(selected) < min(k, count):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+        scores[~available] = -np.inf
+        chosen = int(np.argmax(scores))
+        selected.append(chosen)
+        available[chosen] = False
+        np.maximum(max_similarity, similarity[:, chosen], out=max_similarity)
+    return selected
+
+def adaptive_cutoff(
+    similarities: Sequence[float],
+    min_k: int,
+    max_k: int,
+    min_ratio: float,
+    min_gap: float
+) -> int:
+    """
+    Number of leading results to keep from a ranking's similarity scores.
+
+    Keeps at least ``min_k`` and at most ``max_k`` results. Past ``min_k`` the
+    ranking is cut before the first result scoring below ``min_ratio`` times
+    the best score (when that is positive), and then at the largest drop
+    between neighbouring scores if that drop is at least ``min_gap``: a clear
+    gap usually separates the chunks that answer a question from ones that
+    merely share its vocabulary.
+
+    Args:
+        similarities: Scores of the ranked results, best first
+        min_k: Results always kept (when available)
+        max_k: Most results kept
+        min_ratio: Lowest score kept, as a fraction of the best score
+        min_gap: Smallest drop between neighbours that ends the ranking
+
+    Returns:
+        Number of results to keep
+    """
+    scores = np.asarray(similarities[:max_k], dtype=np.float32)
+    min_k = max(1, min_k)
+    if len(scores) <= min_k:
+        return len(scores)
+
+    keep = len(scores)
+    # A ratio of a non-positive best score would keep the worse results instead
+    below = np.nonzero(scores[min_k:] < min_ratio * scores[0])[0] if scores[0] > 0 else []
+    if len(below):
+        keep = min_k + int(below[0])
+    gaps = scores[min_k - 1:keep - 1] - scores[min_k:keep]
+    if len(gaps) and gaps.max() >= min_gap:
+        keep = min_k + int(np.argmax(gaps))
+    return keep
+
+def _cosines(query: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    """Cosine similarity of ``query`` to each row of ``vectors``."""
+    query = np.asarray(query, dtype=np.float32)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.maximum(np.linalg.norm(vectors, axis=1) * np.linalg.norm(query), 1e-12)
+    return vectors @ query / norms
+
+def _similarities(vector_store: VectorStore, distances: np.ndarray) -> np.ndarray:
+    """
+    Map a store's raw distances to similarities, higher meaning closer.
+
+    Only cosines for unit-length vectors; scores of stores that may hold
+    un-normalized embeddings are recomputed from the vectors (see
+    ``ContextRetriever._adaptive_ids``).
+    """
+    distances = np.asarray(distances, dtype=np.float32)
+    if isinstance(vector_store, FAISS):
+        if vector_store.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT:
+            return distances
+        # Squared L2 distance; equals 2 - 2 * cosine for unit vectors
+        return 1 - distances / 2
+    space = (getattr(getattr(vector_store, "_collection", None), "metadata", None) or {}).get("hnsw:space", "l2")
+    return 1 - distances if space in ("cosine", "ip") else 1 - distances / 2
+
+class ContextRetriever(BaseRetriever):
+    """
+    Retriever over a vector store used by ``RAGChain``.
+
+    Searches the chunk-level index and optionally swaps the hits for their
+    enclosing parent sections before they reach the prompt. With
+    ``search_type="mmr"`` it fetches ``fetch_k`` candidates and picks a diverse
+    ``k`` of them by MMR over the candidates' stored vectors (reconstructed from
+    FAISS, never re-embedded).
+
+    With ``adaptive_k`` the number of results is chosen per query from the
+    similarity scores of the top ``max_k`` hits (see ``adaptive_cutoff``), so
+    focused questions send fewer chunks to the LLM. With MMR this sets how many
+    diverse results are picked (FAISS stores only).
+
+    With ``route_documents`` FAISS searches are two-stage: documents are ranked
+    by their chunk centroids and only the chunks of the best ``route_documents``
+    documents are scored (see ``src.vectorstore.routing``).
+    """
+
+    vector_store: VectorStore
+    search_kwargs: Dict[str, Any] = {"k": 4}
+    expand_parents: bool = True
+    parent_store: Optional[ParentStore] = None
+    search_type: str = SEARCH_TYPE
+    fetch_k: int = MMR_FETCH_K
+    lambda_mult: float = MMR_LAMBDA
+    adaptive_k: bool = ADAPTIVE_K
+    min_k: int = ADAPTIVE_K_MIN
+    max_k: int = ADAPTIVE_K_MAX
+    min_score_ratio: float = ADAPTIVE_K_SCORE_RATIO
+    min_score_gap: float = ADAPTIVE_K_MIN_GAP
+    route_documents: int = ROUTING_DOCUMENTS
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        """Retrieve documents relevant to a query."""
+        with stage("retrieval", RETRIEVAL_SECONDS):
+            embeddings = self.vector_store.embeddings
+            if embeddings is not None:
+                embedding = embeddings.embed_query(query)
+                if self.search_type == "mmr":
+                    documents = self._mmr_search([embedding])[0]
+                else:
+                    documents = self._similarity_search([embedding], self.search_kwargs.get("k", 4))[0]
+            else:
+                with stage("vector_search", VECTOR_SEARCH_SECONDS):
+                    documents = self.vector_store.similarity_search(query, **self.search_kwargs)
+            RETRIEVED_CHUNKS.observe(len(documents))
+            record_value("retrieved_chunks", len(documents))
+            if self.expand_parents:
+                documents = expand_parent_documents(documents, self.parent_store)
+        return documents
+
+    def search_by_vectors(self, embeddings: List[List[float]]) -> List[List[Document]]:
+        """
+        Retrieve documents for many query vectors at once.
+
+        FAISS stores are searched with a single matrix query and documents shared
+        between result lists are fetched from the docstore once.
+        """
+        k = self.search_kwargs.get("k", 4)
+        if self.search_type == "mmr":
+            results = self._mmr_search(embeddings)
+        else:
+            results = self._similarity_search(embeddings, k)
+        for documents in results:
+            RETRIEVED_CHUNKS.observe(len(documents))
+        if self.expand_parents:
+            results = [expand_parent_documents(documents, self.parent_store) for documents in results]
+        return results
+
+    def _similarity_search(self, embeddings: List[List[float]], k: int) -> List[List[Document]]:
+        with stage("vector_search", VECTOR_SEARCH_SECONDS):
+            if self.adaptive_k:
+                results = self._adaptive_search(embeddings)
+            elif isinstance(self.vector_store, FAISS):
+                results = self._faiss_batch_search(embeddings, k)
+            else:
+                results = [
+                    self.vector_store.similarity_search_by_vector(embedding, **self.search_kwargs)
+                    for embedding in embeddings
+                ]
+        return results
+
+    def _faiss_search(self, embeddings: List[List[float]], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        import faiss
+
+        store = self.vector_store
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if store._normalize_L2:
+            faiss.normalize_L2(matrix)
+        if self.route_documents:
+            return routed_search(store, matrix, k, self.route_documents)
+        # Skips rows of deleted documents still present in the index
+        return filtered_search_with_distances(store, matrix, k)
+
+    def _faiss_search_ids(self, embeddings: List[List[float]], k: int) -> np.ndarray:
+        return self._faiss_search(embeddings, k)[1]
+
+    def _cutoff(self, similarities: Sequence[float]) -> int:
+        return adaptive_cutoff(similarities, self.min_k, self.max_k, self.min_score_ratio, self.min_score_gap)
+
+    def _adaptive_ids(self, embeddings: List[List[float]], distances: np.ndarray, indices: np.ndarray) -> List[List[int]]:
+        """Cut each row of a FAISS result down to its adaptive k."""
+        store = self.vector_store
+        similarities = _similarities(store, distances)
+        if not store._normalize_L2:
+            # Stored vectors need not be unit length (e.g. Ollama embeddings), so distances are not cosines
+            unique_ids = np.unique(indices[indices >= 0])
+            vectors = reconstruct_vectors(store.index, unique_ids) if len(unique_ids) else None
+            if vectors is not None:
+                positions = {int(i): row for row, i in enumerate(unique_ids)}
+                similarities = np.array(similarities, dtype=np.float32)
+                for query, scores, row in zip(embeddings, similarities, indices):
+                    live = row >= 0
+                    scores[live] = _cosines(query, vectors[[positions[int(i)] for i in row[live]]])
+        selections = []
+        for scores, row in zip(similarities, indices):
+            live = row >= 0
+            selections.append(row[live][:self._cutoff(scores[live])].tolist())
+        return selections
+
+    def _adaptive_search(self, embeddings: List[List[float]]) -> List[List[Document]]:
+        """Top ``max_k`` hits per query, cut to the adaptive k."""
+        store = self.vector_store
+        if isinstance(store, FAISS):
+            return self._fetch_documents(self._adaptive_ids(embeddings, *self._faiss_search(embeddings, self.max_k)))
+        if isinstance(store, Chroma) and (store._collection.metadata or {}).get("hnsw:space", "l2") != "cosine":
+            return [self._chroma_adaptive_search(embedding) for embedding in embeddings]
+        if not hasattr(store, "similarity_search_by_vector_with_relevance_scores"):
+            # No scores to adapt to
+            k = self.search_kwargs.get("k", 4)
+            return [store.similarity_search_by_vector(embedding, k=k) for embedding in embeddings]
+
+        results = []
+        for embedding in embeddings:
+            hits = store.similarity_search_by_vector_with_relevance_scores(embedding, k=self.max_k)
+            similarities = _similarities(store, [distance for _, distance in hits])
+            results.append([document for document, _ in hits[:self._cutoff(similarities)]])
+        return results
+
+    def _chroma_adaptive_search(self, embedding: List[float]) -> List[Document]:
+        """Top ``max_k`` Chroma hits cut by the cosine of their stored embeddings, which need not be unit length."""
+        result = self.vector_store._collection.query(
+            query_embeddings=[embedding], n_results=self.max_k, include=["documents", "metadatas", "embeddings"]
+        )
+        documents = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(result["documents"][0], result["metadatas"][0])
+        ]
+        if not documents:
+            return []
+        similarities = _cosines(embedding, result["embeddings"][0])
+        return documents[:self._cutoff(similarities)]
+
+    def _faiss_batch_search(self, embeddings: List[List[float]], k: int) -> List[List[Document]]:
+        return self._fetch_documents(self._faiss_search_ids(embeddings, k))
+
+    def _fetch_documents(self, indices: Sequence[Sequence[int]]) -> List[List[Document]]:
+        """Look up rows of FAISS ids in the docstore, fetching shared ids once."""
+        store = self.vector_store
+        fetched: Dict[int, Document] = {}
+        results = []
+        for row in indices:
+            documents = []
+            for i in row:
+                if i == -1:
+                    continue
+                if i not in fetched:
+                    document = store.docstore.search(store.index_to_docstore_id.get(i, ""))
+                    # Deleted while the search ran
+                    fetched[i] = document if isinstance(document, Document) else None
+                if fetched[i] is not None:
+                    documents.append(fetched[i])
+            results.append(documents)
+        return results
+
+    def _mmr_search(self, embeddings: List[List[float]]) -> List[List[Document]]:
+        """Diverse top-k for each query vector, selected from ``fetch_k`` candidates."""
+        k = self.search_kwargs.get("k", 4)
+        fetch_k = max(self.fetch_k, self.max_k if self.adaptive_k else k)
+        store = self.vector_store
+
+        if not isinstance(store, FAISS):
+            with stage("vector_search", VECTOR_SEARCH_SECONDS):
+                return [
+                    store.max_marginal_relevance_search_by_vector(
+                        embedding, k=k, fetch_k=fetch_k, lambda_mult=self.lambda_mult
+                    )
+                    for embedding in embeddings
+                ]
+
+        with stage("vector_search", VECTOR_SEARCH_SECONDS):
+            distances, indices = self._faiss_search(embeddings, fetch_k)
+        if self.adaptive_k:
+            # Candidates stay the fetch_k nearest; the scores only decide how many to pick
+            ks = [
+                len(ids) for ids in self._adaptive_ids(embeddings, distances[:, :self.max_k], indices[:, :self.max_k])
+            ]
+        else:
+            ks = [k] * len(indices)
+
+        with stage("mmr", MMR_SECONDS):
+            # Reconstruct every distinct candidate once for the whole batch
+            unique_ids = np.unique(indices[indices >= 0])
+            vectors = reconstruct_vectors(store.index, unique_ids) if len(unique_ids) else None
+            if vectors is None:
+                logger.warning("Index cannot reconstruct vectors; falling back to similarity ranking")
+                return self._fetch_documents([row[:row_k] for row, row_k in zip(indices, ks)])
+            positions = {int(i): row for row, i in enumerate(unique_ids)}
+
+            queries = np.asarray(embeddings, dtype=np.float32)
+            selections = []
+            for query, row, row_k in zip(queries, indices, ks):
+                ids = [int(i) for i in row if i >= 0]
+                chosen = mmr_select(query, vectors[[positions[i] for i in ids]], row_k, self.lambda_mult)
+                selections.append([ids[c] for c in chosen])
+        return self._fetch_documents(selections)
@@ -1 +1,11 @@
-from .vector_store_factory import get_vector_store
\ No newline at end of file
+from .vector_store_factory import (
+    get_vector_store, save_vector_store, add_documents, add_documents_batched, refit_projection
+)
+from .snapshots import current_snapshot, publish_snapshot, load_snapshot, SnapshotWatcher
+from .maintenance import (
+    delete_documents, compact_faiss_store, snapshot_live_rows, catch_up_compacted, needs_compaction, fragmentation
+)
+from .bulk import export_vector_store, import_vector_store, read_export
+from .routing import DocumentIndex, document_index, routed_search
+from .disk_store import DiskVectorStore
+from .disk_index import DiskGraphIndex
@@ -0,0 +1,339 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+import time
+from pathlib import Path
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS, Chroma
+from langchain_core.embeddings import Embeddings
+from langchain.schema import Document
+
+from ..config import VECTOR_DB_PATH, FAISS_INDEX_TYPE, BULK_ROW_GROUP_SIZE, BULK_TRAIN_SIZE, CHROMA_BATCH_SIZE
+from ..embeddings import Projection, ReducedEmbeddings, save_projection
+from ..metrics import REGISTRY
+from .disk_store import DiskVectorStore
+from .maintenance import reconstruct_vectors
+from .routing import save_document_index
+
+logger = logging.getLogger(__name__)
+
+BULK_ROWS = REGISTRY.counter(
+    "rag_bulk_rows_total",
+    "Chunks written to or read from bulk export files",
+    ["direction"]
+)
+
+# Stored in the file's schema metadata; bumped when the columns change
+FORMAT_VERSION = "1"
+
+def projection_path(path: str) -> Path:
+    """Sidecar file holding the projection of an export with reduced vectors."""
+    return Path(path).with_suffix(".projection.npz")
+
+Batch = Tuple[List[str], List[str], List[Dict[str, Any]], np.ndarray]
+
+def _schema(dimension: int, metadata: Dict[str, str]):
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("text", pa.string()),
+            # Chunk metadata varies between loaders, so it is kept as JSON
+            ("metadata", pa.string()),
+            ("vector", pa.list_(pa.float32(), dimension)),
+        ],
+        metadata={key.encode(): value.encode() for key, value in metadata.items()}
+    )
+
+def _faiss_batches(vector_store: FAISS, batch_size: int) -> Iterator[Batch]:
+    docs = vector_store.docstore._dict
+    # Deleted documents leave their rows behind; only live rows are exported
+    live = sorted(
+        (position, doc_id) for position, doc_id in vector_store.index_to_docstore_id.items() if doc_id in docs
+    )
+    for start in range(0, len(live), batch_size):
+        rows = live[start:start + batch_size]
+        vectors = reconstruct_vectors(vector_store.index, [position for position, _ in rows])
+        if vectors is None:
+            raise ValueError("FAISS index cannot reconstruct vectors for export")
+        documents = [docs[doc_id] for _, doc_id in rows]
+        yield (
+            [doc_id for _, doc_id in rows],
+            [doc.page_content for doc in documents],
+            [doc.metadata for doc in documents],
+            vectors
+        )
+
+def _disk_batches(vector_store: DiskVectorStore, batch_size: int) -> Iterator[Batch]:
+    docs = vector_store.docstore._dict
+    # Deleted chunks keep their graph nodes; only live ones are exported
+    live = sorted(
+        (position, doc_id) for position, doc_id in vector_store.index_to_docstore_id.items() if doc_id in docs
+    )
+    for start in range(0, len(live), batch_size):
+        rows = live[start:start + batch_size]
+        documents = [docs[doc_id] for _, doc_id in rows]
+        yield (
+            [doc_id for _, doc_id in rows],
+            [doc.page_content for doc in documents],
+            [doc.metadata for doc in documents],
+            vector_store.index.reconstruct([position for position, _ in rows])
+        )
+
+def _chroma_batches(vector_store: Chroma, batch_size: int) -> Iterator[Batch]:
+    collection = vector_store._collection
+    for offset in range(0, collection.count(), batch_size):
+        rows = collection.get(
+            include=["embeddings", "documents", "metadatas"], limit=batch_size, offset=offset
+        )
+        yield (
+            rows["ids"],
+            rows["documents"],
+            [metadata or {} for metadata in rows["metadatas"]],
+            np.asarray(rows["embeddings"], dtype=np.float32)
+        )
+
+def export_vector_store(vector_store, path: str, batch_size: int = BULK_ROW_GROUP_SIZE) -> int:
+    """
+    Write every chunk of a FAISS, disk or Chroma store to a Parquet file.
+
+    Each row holds the chunk id, text, JSON metadata and its vector. Rows are
+    read from the store and written one row group of ``batch_size`` at a time,
+    so only one batch of vectors is in memory.
+
+    Args:
+        vector_store: Store returned by ``get_vector_store``
+        path: Parquet file to write
+        batch_size: Rows per row group
+
+    Returns:
+        Number of chunks exported
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    if isinstance(vector_store, FAISS):
+        batches = _faiss_batches(vector_store, batch_size)
+        source = "faiss"
+    elif isinstance(vector_store, DiskVectorStore):
+        batches = _disk_batches(vector_store, batch_size)
+        source = "disk"
+    elif isinstance(vector_store, Chroma):
+        batches = _chroma_batches(vector_store, batch_size)
+        source = "chroma"
+    else:
+        raise ValueError(f"Export is not supported for {type(vector_store).__name__} stores")
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    # Reduced vectors are only usable with the projection that produced them
+    embedding_function = getattr(vector_store, "embedding_function", None)
+    if isinstance(embedding_function, ReducedEmbeddings):
+        embedding_function.projection.save(projection_path(path))
+    else:
+        projection_path(path).unlink(missing_ok=True)
+    staging = Path(f"{path}.tmp")
+    writer = None
+    exported = 0
+    try:
+        for ids, texts, metadatas, vectors in batches:
+            if writer is None:
+                schema = _schema(vectors.shape[1], {
+                    "format_version": FORMAT_VERSION,
+                    "source_store": source,
+                    "dimension": str(vectors.shape[1]),
+                })
+                writer = pq.ParquetWriter(str(staging), schema)
+            table = pa.Table.from_arrays(
+                [
+                    pa.array(ids, pa.string()),
+                    pa.array(texts, pa.string()),
+                    pa.array([json.dumps(metadata, default=str) for metadata in metadatas], pa.string()),
+                    pa.FixedSizeListArray.from_arrays(
+                        pa.array(np.ascontiguousarray(vectors, dtype=np.float32).ravel()), vectors.shape[1]
+                    ),
+                ],
+                schema=writer.schema
+            )
+            writer.write_table(table)
+            exported += len(ids)
+            BULK_ROWS.labels(direction="export").inc(len(ids))
+        if writer is None:
+            raise ValueError("Vector store is empty; nothing to export")
+    finally:
+        if writer is not None:
+            writer.close()
+    staging.replace(path)
+
+    logger.info(f"Exported {exported} chunks from {source} to {path} in {time.perf_counter() - start:.1f}s")
+    return exported
+
+def read_export(path: str, batch_size: int = BULK_ROW_GROUP_SIZE) -> Iterator[Batch]:
+    """
+    Stream (ids, texts, metadatas, vectors) batches from an export file.
+
+    Args:
+        path: Parquet file written by ``export_vector_store``
+        batch_size: Maximum rows per batch
+
+    Yields:
+        Tuples of ids, texts, metadata dicts and a float32 vector matrix
+    """
+    import pyarrow.parquet as pq
+
+    parquet_file = pq.ParquetFile(path)
+    dimension = int(parquet_file.schema_arrow.metadata[b"dimension"])
+    for batch in parquet_file.iter_batches(batch_size=batch_size):
+        vectors = batch.column("vector").flatten().to_numpy(zero_copy_only=False)
+        yield (
+            batch.column("id").to_pylist(),
+            batch.column("text").to_pylist(),
+            [json.loads(metadata) for metadata in batch.column("metadata").to_pylist()],
+            np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, dimension)
+        )
+
+def _import_faiss(path: str, embedding_model: Embeddings, index_type: str, batch_size: int, train_size: int) -> FAISS:
+    import faiss
+
+    batches = read_export(path, batch_size)
+    docs: Dict[str, Document] = {}
+    index_to_docstore_id: Dict[int, str] = {}
+    index = None
+
+    def add(ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        offset = index.ntotal
+        index.add(vectors)
+        for position, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+            docs[doc_id] = Document(page_content=text, metadata=metadata)
+            index_to_docstore_id[offset + position] = doc_id
+
+    def train_and_flush(pending: List[Batch]) -> None:
+        training = np.concatenate([batch[3] for batch in pending])
+        logger.info(f"Training FAISS {index_type} index on {len(training)} vectors")
+        index.train(training)
+        for batch in pending:
+            add(*batch)
+
+    # Batches held back until an IVF/PQ index has seen enough vectors to train
+    pending: List[Batch] = []
+    for batch in batches:
+        if index is None:
+            index = faiss.index_factory(batch[3].shape[1], index_type)
+        if index.is_trained:
+            add(*batch)
+            continue
+        pending.append(batch)
+        if sum(len(held[0]) for held in pending) >= train_size:
+            train_and_flush(pending)
+            pending = []
+
+    if index is None:
+        raise ValueError(f"Export file {path} has no rows")
+    if pending:
+        # Fewer rows than train_size: train on everything there is
+        train_and_flush(pending)
+
+    return FAISS(
+        embedding_function=embedding_model,
+        index=index,
+        docstore=InMemoryDocstore(docs),
+        index_to_docstore_id=index_to_docstore_id
+    )
+
+def _import_chroma(path: str, embedding_model: Embeddings, persist_path: Path, batch_size: int) -> Chroma:
+    vector_store = Chroma(embedding_function=embedding_model, persist_directory=str(persist_path))
+    # Chroma rejects writes above its maximum batch size, and empty metadata dicts on some versions
+    for ids, texts, metadatas, vectors in read_export(path, min(batch_size, CHROMA_BATCH_SIZE)):
+        vector_store._collection.upsert(
+            ids=ids,
+            embeddings=vectors.tolist(),
+            metadatas=[metadata or None for metadata in metadatas],
+            documents=texts
+        )
+    return vector_store
+
+def _import_disk(path: str, embedding_model: Embeddings, persist_path: Path, batch_size: int) -> DiskVectorStore:
+    from .disk_index import DiskGraphIndex
+
+    # The graph is built in one pass over all vectors; texts go to the docstore as they are read
+    docs: Dict[str, Document] = {}
+    index_to_docstore_id: Dict[int, str] = {}
+    vectors: List[np.ndarray] = []
+    for ids, texts, metadatas, batch_vectors in read_export(path, batch_size):
+        offset = len(index_to_docstore_id)
+        for position, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+            docs[doc_id] = Document(page_content=text, metadata=metadata)
+            index_to_docstore_id[offset + position] = doc_id
+        vectors.append(batch_vectors)
+
+    if not vectors:
+        raise ValueError(f"Export file {path} has no rows")
+    index = DiskGraphIndex.build(str(persist_path), np.concatenate(vectors))
+    return DiskVectorStore(embedding_model, index, InMemoryDocstore(docs), index_to_docstore_id)
+
+def import_vector_store(
+    path: str,
+    store_type: str = "faiss",
+    embedding_model: Optional[Embeddings] = None,
+    persist_directory: Optional[str] = None,
+    index_type: Optional[str] = None,
+    batch_size: int = BULK_ROW_GROUP_SIZE,
+    train_size: int = BULK_TRAIN_SIZE
+):
+    """
+    Build a vector store from an export file without re-embedding anything.
+
+    Rows are streamed in batches. FAISS indexes that need training (IVF, PQ)
+    are trained on the first ``train_size`` vectors, after which every batch is
+    added as it is read. Disk stores build their graph once over all vectors.
+    The store is persisted where ``get_vector_store`` looks for it.
+
+    Args:
+        path: Parquet file written by ``export_vector_store``
+        store_type: "faiss", "chroma" or "disk"
+        embedding_model: Embeddings used for queries; must be the model that
+            produced the exported vectors
+        persist_directory: Directory to persist the vector store
+        index_type: FAISS index factory string
+        batch_size: Rows read per batch
+        train_size: Vectors used to train IVF/PQ indexes
+
+    Returns:
+        The new vector store
+    """
+    from ..embeddings import get_embeddings
+
+    start = time.perf_counter()
+    embedding_model = embedding_model or get_embeddings()
+    store_type = store_type.lower()
+    persist_path = Path(persist_directory or VECTOR_DB_PATH) / store_type
+    persist_path.mkdir(parents=True, exist_ok=True)
+
+    projection = Projection.load(projection_path(path))
+    if projection is not None:
+        if store_type != "faiss":
+            raise ValueError("Exports of reduced-dimension vectors can only be imported into FAISS")
+        embedding_model = ReducedEmbeddings(embedding_model, projection)
+
+    if store_type == "faiss":
+        vector_store = _import_faiss(path, embedding_model, index_type or FAISS_INDEX_TYPE, batch_size, train_size)
+        vector_store.save_local(str(persist_path))
+        save_projection(embedding_model, str(persist_path))
+        save_document_index(vector_store, str(persist_path))
+        count = vector_store.index.ntotal
+    elif store_type == "chroma":
+        vector_store = _import_chroma(path, embedding_model, persist_path, batch_size)
+        count = vector_store._collection.count()
+    elif store_type == "disk":
+        vector_store = _import_disk(path, embedding_model, persist_path, batch_size)
+        vector_store.save_local(str(persist_path))
+        count = vector_store.index.ntotal
+    else:
+        raise ValueError(f"Invalid vector store type: {store_type}")
+
+    BULK_ROWS.labels(direction="import").inc(count)
+    logger.info(f"Imported {count} chunks into {store_type} in {time.perf_counter() - start:.1f}s")
+    return vector_store
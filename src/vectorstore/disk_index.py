@@ -0,0 +1,715 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from ..config import (
+    DISK_GRAPH_DEGREE,
+    DISK_BUILD_LIST_SIZE,
+    DISK_GRAPH_ALPHA,
+    DISK_SEARCH_LIST_SIZE,
+    DISK_BEAM_WIDTH,
+    DISK_PQ_BYTES,
+    DISK_CACHE_MB,
+    DISK_DIRECT_IO
+)
+from ..metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DISK_BLOCK_READS = REGISTRY.counter(
+    "rag_disk_index_block_reads_total",
+    "Disk index blocks needed by searches, by whether the page cache had them",
+    ["result"]
+)
+DISK_READS_PER_QUERY = REGISTRY.histogram(
+    "rag_disk_index_reads_per_query",
+    "Disk index blocks read from storage (page cache misses) per query",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+DISK_INDEX_BUILD_SECONDS = REGISTRY.histogram(
+    "rag_disk_index_build_seconds",
+    "Time spent building a disk index graph"
+)
+
+GRAPH_FILE = "graph.bin"
+META_FILE = "meta.json"
+CODES_FILE = "pq.npz"
+
+# Unit of disk reads and of the page cache; one node never straddles two blocks
+BLOCK_SIZE = 4096
+# Vectors sampled to train the product quantizer
+PQ_TRAIN_SIZE = 65536
+# Blocks per sequential read when scanning the whole graph file
+SCAN_BLOCKS = 1024
+# Searches start from the best (by PQ distance, so without reads) of the nodes nearest
+# this many k-means centroids
+ENTRY_POINTS = 256
+
+def robust_prune(
+    point: np.ndarray,
+    candidate_ids: np.ndarray,
+    candidate_vectors: np.ndarray,
+    alpha: float,
+    degree: int
+) -> np.ndarray:
+    """
+    Vamana's RobustPrune: pick up to ``degree`` out-neighbours for ``point``.
+
+    Candidates are taken nearest first; each one chosen removes the remaining
+    candidates it "covers", those at least ``alpha`` times closer to it than to
+    ``point``. With ``alpha`` > 1 fewer candidates are covered, so some longer
+    edges survive and greedy search needs fewer hops across the graph.
+
+    Returns:
+        Chosen candidate ids, nearest first
+    """
+    if not len(candidate_ids):
+        return candidate_ids
+    distances = ((candidate_vectors - point) ** 2).sum(axis=1)
+    order = np.argsort(distances, kind="stable")
+    ids, vectors, distances = candidate_ids[order], candidate_vectors[order], distances[order]
+    norms = (vectors ** 2).sum(axis=1)
+    pairwise = norms[:, None] + norms[None, :] - 2 * vectors @ vectors.T
+    # Squared distances, so the factor is squared too
+    factor = alpha * alpha
+    alive = np.ones(len(ids), dtype=bool)
+    chosen = []
+    for i in range(len(ids)):
+        if not alive[i]:
+            continue
+        chosen.append(i)
+        if len(chosen) == degree:
+            break
+        alive &= factor * pairwise[i] > distances
+    return ids[chosen]
+
+def build_graph(vectors: np.ndarray, degree: int, list_size: int, alpha: float) -> Tuple[np.ndarray, int]:
+    """
+    Build a Vamana-style proximity graph over ``vectors`` in memory.
+
+    Candidate neighbour lists come from a temporary FAISS HNSW build (its
+    greedy-search results and its links on every layer, the upper layers
+    supplying long-range candidates) rather than from Vamana's own insertion
+    passes, which would be far slower in Python; every list is then cut down
+    with ``robust_prune`` and made bidirectional, pruning again where reverse
+    edges overflow ``degree``.
+
+    Returns:
+        (neighbours, entry points): an (n, degree) int32 array padded with -1,
+        and the nodes nearest ``ENTRY_POINTS`` k-means centroids of the data
+    """
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, dimension = vectors.shape
+    neighbors = np.full((count, degree), -1, dtype=np.int32)
+    if count <= ENTRY_POINTS:
+        return _link_small(vectors, neighbors, alpha), np.arange(count, dtype=np.int64)
+
+    start = time.perf_counter()
+    hnsw = faiss.IndexHNSWFlat(dimension, max(2, degree // 2))
+    hnsw.hnsw.efConstruction = max(list_size, degree)
+    hnsw.add(vectors)
+    hnsw.hnsw.efSearch = list_size
+    _, nearest = hnsw.search(vectors, min(count, list_size + 1))
+    # One start per region of the data, so searches need not cross sparsely linked clusters
+    sample = vectors[np.random.default_rng(0).choice(count, min(count, PQ_TRAIN_SIZE), replace=False)]
+    kmeans = faiss.Kmeans(dimension, ENTRY_POINTS, niter=10, seed=0)
+    kmeans.train(sample)
+    entry_points = np.unique(hnsw.search(kmeans.centroids, 1)[1].ravel())
+    links = faiss.vector_to_array(hnsw.hnsw.neighbors)
+    offsets = faiss.vector_to_array(hnsw.hnsw.offsets).astype(np.int64)
+    del hnsw
+
+    for node in range(count):
+        row = np.unique(np.concatenate([nearest[node], links[offsets[node]:offsets[node + 1]]]))
+        row = row[(row >= 0) & (row != node)]
+        chosen = robust_prune(vectors[node], row, vectors[row], alpha, degree)
+        neighbors[node, :len(chosen)] = chosen
+
+    # Reverse edges, from the pruned lists before any of them change
+    targets = neighbors.ravel()
+    sources = np.repeat(np.arange(count, dtype=np.int32), degree)
+    valid = targets >= 0
+    order = np.argsort(targets[valid], kind="stable")
+    incoming = np.split(sources[valid][order], np.searchsorted(targets[valid][order], np.arange(1, count)))
+    for node in range(count):
+        current = neighbors[node][neighbors[node] >= 0]
+        merged = np.union1d(current, incoming[node])
+        if len(merged) == len(current):
+            continue
+        if len(merged) > degree:
+            merged = robust_prune(vectors[node], merged, vectors[merged], alpha, degree)
+        neighbors[node] = -1
+        neighbors[node, :len(merged)] = merged
+
+    DISK_INDEX_BUILD_SECONDS.observe(time.perf_counter() - start)
+    return neighbors, entry_points
+
+def _link_small(vectors: np.ndarray, neighbors: np.ndarray, alpha: float) -> np.ndarray:
+    """Prune each node's list from all other nodes; every node is an entry point anyway."""
+    for node in range(len(vectors)):
+        others = np.delete(np.arange(len(vectors)), node)
+        chosen = robust_prune(vectors[node], others, vectors[others], alpha, neighbors.shape[1])
+        neighbors[node, :len(chosen)] = chosen
+    return neighbors
+
+def _subquantizers(dimension: int, pq_bytes: int) -> int:
+    """Largest number of sub-vectors not above ``pq_bytes`` that divides ``dimension``."""
+    for count in range(min(pq_bytes, dimension), 0, -1):
+        if dimension % count == 0:
+            return count
+    return 1
+
+def train_pq(vectors: np.ndarray, subquantizers: int, seed: int = 0) -> np.ndarray:
+    """
+    Train a product quantizer: k-means codebooks for each slice of the vectors.
+
+    Returns:
+        Centroids of shape (subquantizers, clusters, dimension // subquantizers),
+        with up to 256 clusters so every code fits in a byte
+    """
+    import faiss
+
+    rng = np.random.default_rng(seed)
+    if len(vectors) > PQ_TRAIN_SIZE:
+        vectors = vectors[np.sort(rng.choice(len(vectors), PQ_TRAIN_SIZE, replace=False))]
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    width = vectors.shape[1] // subquantizers
+    clusters = min(256, len(vectors))
+    centroids = np.empty((subquantizers, clusters, width), dtype=np.float32)
+    for part in range(subquantizers):
+        piece = np.ascontiguousarray(vectors[:, part * width:(part + 1) * width])
+        if clusters == len(vectors):
+            centroids[part] = piece
+            continue
+        kmeans = faiss.Kmeans(width, clusters, niter=15, seed=seed)
+        kmeans.train(piece)
+        centroids[part] = kmeans.centroids
+    return centroids
+
+def pq_encode(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+    """Code of the nearest centroid in each slice, as an (n, subquantizers) uint8 array."""
+    subquantizers, _, width = centroids.shape
+    codes = np.empty((len(vectors), subquantizers), dtype=np.uint8)
+    centroid_norms = (centroids ** 2).sum(axis=2)
+    for start in range(0, len(vectors), batch_size):
+        batch = np.asarray(vectors[start:start + batch_size], dtype=np.float32)
+        for part in range(subquantizers):
+            piece = batch[:, part * width:(part + 1) * width]
+            codes[start:start + len(batch), part] = np.argmin(
+                centroid_norms[part] - 2 * piece @ centroids[part].T, axis=1
+            )
+    return codes
+
+class BlockCache:
+    """
+    LRU cache of index blocks bounded by a byte budget.
+
+    Rewritten blocks are invalidated through a per-block version, so a search
+    that read a block just before a write cannot put the stale copy back.
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._blocks: "OrderedDict[int, bytes]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def get(self, block: int) -> Optional[bytes]:
+        with self._lock:
+            data = self._blocks.get(block)
+            if data is not None:
+                self._blocks.move_to_end(block)
+            return data
+
+    def version(self, block: int) -> int:
+        return self._versions.get(block, 0)
+
+    def put(self, block: int, data: bytes, version: int) -> None:
+        """Cache ``data`` read at ``version`` unless the block changed since."""
+        if len(data) > self.budget_bytes:
+            return
+        with self._lock:
+            if self._versions.get(block, 0) != version or block in self._blocks:
+                return
+            self._blocks[block] = data
+            self.nbytes += len(data)
+            while self.nbytes > self.budget_bytes:
+                _, evicted = self._blocks.popitem(last=False)
+                self.nbytes -= len(evicted)
+
+    def invalidate(self, block: int) -> None:
+        with self._lock:
+            self._versions[block] = self._versions.get(block, 0) + 1
+            data = self._blocks.pop(block, None)
+            if data is not None:
+                self.nbytes -= len(data)
+
+class _GraphFile:
+    """
+    Node records on disk: each node's full vector followed by its neighbour ids.
+
+    Records are packed into ``BLOCK_SIZE``-aligned blocks (several per block for
+    small vectors, one per block run for large ones), so expanding a node during
+    search is one block read that returns both its vector and its edges.
+    """
+
+    def __init__(self, path: Path, dimension: int, degree: int, cache_bytes: int, direct_io: bool = False):
+        self.path = path
+        self.dimension = dimension
+        self.degree = degree
+        self.record_size = 4 * (dimension + degree)
+        self.block_size = -(-self.record_size // BLOCK_SIZE) * BLOCK_SIZE
+        self.nodes_per_block = self.block_size // self.record_size
+        self.cache = BlockCache(cache_bytes)
+        self._fd = os.open(path, os.O_RDWR)
+        self._read_fd = self._fd
+        self.direct_io = False
+        if direct_io:
+            try:
+                self._read_fd = os.open(path, os.O_RDONLY | os.O_DIRECT)
+                self.direct_io = True
+            except (AttributeError, OSError) as e:
+                # e.g. tmpfs, or not Linux
+                logger.warning(f"Direct I/O unavailable for {path}, reading through the OS page cache: {str(e)}")
+
+    def close(self) -> None:
+        if self._read_fd != self._fd:
+            os.close(self._read_fd)
+        os.close(self._fd)
+        self._fd = self._read_fd = -1
+
+    def __del__(self):
+        if getattr(self, "_fd", -1) >= 0:
+            self.close()
+
+    def _read(self, offset: int, size: int) -> bytes:
+        if self.direct_io:
+            # O_DIRECT needs an aligned buffer; anonymous mmaps are page aligned
+            buffer = mmap.mmap(-1, size)
+            count = os.preadv(self._read_fd, [buffer], offset)
+            data = buffer[:count]
+            buffer.close()
+        else:
+            data = os.pread(self._read_fd, size, offset)
+        # Past the end of the file (nodes not written yet)
+        return data if len(data) == size else data.ljust(size, b"\0")
+
+    def _read_block(self, block: int) -> Tuple[int, bytes]:
+        version = self.cache.version(block)
+        data = self._read(block * self.block_size, self.block_size)
+        self.cache.put(block, data, version)
+        return block, data
+
+    def read_nodes(self, nodes: Sequence[int], pool: Optional[ThreadPoolExecutor] = None) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Read the records of ``nodes``, missing blocks concurrently when a pool is given.
+
+        Returns:
+            (vectors, neighbours, blocks read from storage)
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        blocks = nodes // self.nodes_per_block
+        data = {}
+        missing = []
+        for block in np.unique(blocks).tolist():
+            cached = self.cache.get(block)
+            if cached is None:
+                missing.append(block)
+            else:
+                data[block] = cached
+        if missing:
+            if pool is not None and len(missing) > 1:
+                data.update(pool.map(self._read_block, missing))
+            else:
+                data.update(map(self._read_block, missing))
+        DISK_BLOCK_READS.labels(result="hit").inc(len(data) - len(missing))
+        DISK_BLOCK_READS.labels(result="miss").inc(len(missing))
+
+        width = self.dimension + self.degree
+        records = np.empty((len(nodes), width), dtype=np.float32)
+        for row, (node, block) in enumerate(zip(nodes.tolist(), blocks.tolist())):
+            offset = (node % self.nodes_per_block) * self.record_size
+            records[row] = np.frombuffer(data[block], dtype=np.float32, count=width, offset=offset)
+        return records[:, :self.dimension], records[:, self.dimension:].view(np.int32), len(missing)
+
+    def write_nodes(self, nodes: Sequence[int], vectors: np.ndarray, neighbors: np.ndarray) -> None:
+        """Rewrite node records in place (appending past the end is fine)."""
+        records = _records(vectors, neighbors)
+        for node, record in zip(nodes, records):
+            block, slot = divmod(int(node), self.nodes_per_block)
+            os.pwrite(self._fd, record.tobytes(), block * self.block_size + slot * self.record_size)
+            self.cache.invalidate(block)
+
+    def scan_vectors(self, count: int) -> np.ndarray:
+        """Full vectors of the first ``count`` nodes, read sequentially without touching the cache."""
+        vectors = np.empty((count, self.dimension), dtype=np.float32)
+        width = self.dimension + self.degree
+        per_read = SCAN_BLOCKS * self.nodes_per_block
+        for first in range(0, count, per_read):
+            blocks = -(-min(per_read, count - first) // self.nodes_per_block)
+            data = self._read(first // self.nodes_per_block * self.block_size, blocks * self.block_size)
+            records = np.frombuffer(data, dtype=np.uint8).reshape(blocks, self.block_size)
+            records = records[:, :self.nodes_per_block * self.record_size].reshape(-1, self.record_size)
+            records = records.view(np.float32).reshape(-1, width)[:count - first]
+            vectors[first:first + len(records)] = records[:, :self.dimension]
+        return vectors
+
+def _records(vectors: np.ndarray, neighbors: np.ndarray) -> np.ndarray:
+    records = np.empty((len(vectors), vectors.shape[1] + neighbors.shape[1]), dtype=np.float32)
+    records[:, :vectors.shape[1]] = vectors
+    records[:, vectors.shape[1]:] = np.asarray(neighbors, dtype=np.int32).view(np.float32)
+    return records
+
+def _write_graph_file(path: Path, vectors: np.ndarray, neighbors: np.ndarray, batch_size: int = 65536) -> None:
+    """Write all node records block by block."""
+    dimension, degree = vectors.shape[1], neighbors.shape[1]
+    record_size = 4 * (dimension + degree)
+    block_size = -(-record_size // BLOCK_SIZE) * BLOCK_SIZE
+    nodes_per_block = block_size // record_size
+    # Whole blocks per batch so each write starts on a block boundary
+    batch_size = max(nodes_per_block, batch_size // nodes_per_block * nodes_per_block)
+    with open(path, "wb") as f:
+        for start in range(0, len(vectors), batch_size):
+            records = _records(vectors[start:start + batch_size], neighbors[start:start + batch_size])
+            blocks = -(-len(records) // nodes_per_block)
+            padded = np.zeros((blocks * nodes_per_block, records.shape[1]), dtype=np.float32)
+            padded[:len(records)] = records
+            data = np.zeros((blocks, block_size), dtype=np.uint8)
+            data[:, :nodes_per_block * record_size] = padded.view(np.uint8).reshape(blocks, -1)
+            f.write(data.tobytes())
+
+class DiskGraphIndex:
+    """
+    DiskANN-style vector index whose graph and full vectors live on disk.
+
+    Memory holds only product-quantized codes of every vector (``pq_bytes``
+    bytes each) and a cache of recently read index blocks bounded by
+    ``cache_bytes``. A search starts from the sampled entry points nearest the
+    query by PQ distance and walks the graph: candidates are ranked by their PQ distance, the best ``beam_width`` unexpanded ones are read
+    from disk together (vector and edges in one block each), and the search
+    ends when the best ``search_list_size`` candidates have all been expanded.
+    Expanded nodes are then re-ranked by exact distance to their full vectors.
+
+    Distances are squared L2, like the FAISS stores' ``IndexFlatL2``. Positions
+    are stable: deleted nodes stay in the graph (they still route searches) and
+    callers exclude them from results.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        dimension: int,
+        degree: int = DISK_GRAPH_DEGREE,
+        build_list_size: int = DISK_BUILD_LIST_SIZE,
+        alpha: float = DISK_GRAPH_ALPHA,
+        search_list_size: int = DISK_SEARCH_LIST_SIZE,
+        beam_width: int = DISK_BEAM_WIDTH,
+        pq_bytes: int = DISK_PQ_BYTES,
+        cache_bytes: int = DISK_CACHE_MB * 1024 * 1024,
+        direct_io: bool = DISK_DIRECT_IO
+    ):
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self.degree = degree
+        self.build_list_size = build_list_size
+        self.alpha = alpha
+        self.search_list_size = search_list_size
+        self.beam_width = max(1, beam_width)
+        self.cache_bytes = cache_bytes
+        self.direct_io = direct_io
+        self.subquantizers = _subquantizers(dimension, pq_bytes)
+        self.ntotal = 0
+        self.entry_points = np.empty(0, dtype=np.int64)
+        self.codes = np.empty((0, self.subquantizers), dtype=np.uint8)
+        self.pq_centroids: Optional[np.ndarray] = None
+        # Vectors the quantizer was trained on; retrained as a small index grows
+        self.pq_trained_on = 0
+        self._graph: Optional[_GraphFile] = None
+        self._pool = ThreadPoolExecutor(max_workers=self.beam_width, thread_name_prefix="disk-index-io")
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, directory: str, vectors: np.ndarray, **kwargs) -> "DiskGraphIndex":
+        """Build an index over ``vectors`` in ``directory`` (replacing any index there)."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        index = cls(directory, vectors.shape[1], **kwargs)
+        index._rebuild(vectors)
+        return index
+
+    @classmethod
+    def open(cls, directory: str, **kwargs) -> "DiskGraphIndex":
+        """Open an index saved in ``directory``; ``kwargs`` override search and cache settings."""
+        directory = Path(directory)
+        meta = json.loads((directory / META_FILE).read_text())
+        index = cls(
+            str(directory),
+            meta["dimension"],
+            degree=meta["degree"],
+            build_list_size=kwargs.pop("build_list_size", meta["build_list_size"]),
+            alpha=kwargs.pop("alpha", meta["alpha"]),
+            pq_bytes=meta["subquantizers"],
+            **kwargs
+        )
+        with np.load(directory / CODES_FILE) as data:
+            index.codes = data["codes"]
+            index.entry_points = data["entry_points"]
+            index.pq_centroids = data["centroids"] if data["centroids"].size else None
+        index.ntotal = meta["ntotal"]
+        index.pq_trained_on = meta["pq_trained_on"]
+        # Records past ntotal are unsaved additions from an earlier process; searches ignore them
+        index._graph = _GraphFile(directory / GRAPH_FILE, index.dimension, index.degree, index.cache_bytes, index.direct_io)
+        index.warm()
+        return index
+
+    def save(self, directory: Optional[str] = None) -> None:
+        """Write the metadata and PQ codes (and the graph file, if saving elsewhere)."""
+        directory = Path(directory or self.directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        if directory.resolve() != self.directory.resolve() and self._graph is not None:
+            shutil.copyfile(self._graph.path, directory / GRAPH_FILE)
+        with self._write_lock:
+            meta = {
+                "dimension": self.dimension,
+                "degree": self.degree,
+                "build_list_size": self.build_list_size,
+                "alpha": self.alpha,
+                "subquantizers": self.subquantizers,
+                "ntotal": self.ntotal,
+                "pq_trained_on": self.pq_trained_on,
+            }
+            codes = self.codes[:self.ntotal]
+            entry_points = self.entry_points
+            centroids = self.pq_centroids if self.pq_centroids is not None else np.empty(0, dtype=np.float32)
+        staging = directory / f"{CODES_FILE}.tmp-{os.getpid()}.npz"
+        np.savez(staging, codes=codes, centroids=centroids, entry_points=entry_points)
+        os.replace(staging, directory / CODES_FILE)
+        staging = directory / f"{META_FILE}.tmp-{os.getpid()}"
+        staging.write_text(json.dumps(meta))
+        os.replace(staging, directory / META_FILE)
+
+    def _rebuild(self, vectors: np.ndarray) -> None:
+        """Build the graph and quantizer over ``vectors`` and swap them in."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        neighbors, entry_points = build_graph(vectors, self.degree, self.build_list_size, self.alpha)
+        centroids = train_pq(vectors, self.subquantizers) if len(vectors) else None
+        codes = pq_encode(vectors, centroids) if len(vectors) else np.empty((0, self.subquantizers), dtype=np.uint8)
+
+        path = self.directory / GRAPH_FILE
+        staging = path.with_name(f"{GRAPH_FILE}.tmp-{os.getpid()}")
+        _write_graph_file(staging, vectors, neighbors)
+        os.replace(staging, path)
+        # Searches in flight keep the previous file open until they finish
+        graph = _GraphFile(path, self.dimension, self.degree, self.cache_bytes, self.direct_io)
+        self.pq_centroids, self.codes, self.entry_points = centroids, codes, entry_points
+        self.pq_trained_on = len(vectors)
+        self._graph, self.ntotal = graph, len(vectors)
+        self.warm()
+        logger.info(f"Built disk index over {len(vectors)} vectors in {self.directory}")
+
+    def warm(self, fraction: float = 0.5) -> int:
+        """
+        Fill up to ``fraction`` of the page cache breadth-first from the entry points.
+
+        The nodes nearest the entry points are expanded by most searches, so
+        caching them up front saves the first hops of each query.
+
+        Returns:
+            Number of blocks cached
+        """
+        graph = self._graph
+        if graph is None or not self.ntotal or graph.cache.budget_bytes < graph.block_size:
+            return 0
+        budget = fraction * graph.cache.budget_bytes
+        frontier = self.entry_points.tolist()
+        seen = set(frontier)
+        while frontier and graph.cache.nbytes + graph.block_size <= budget:
+            # Only as many nodes as the remaining budget can hold
+            room = int((budget - graph.cache.nbytes) // graph.block_size) * graph.nodes_per_block
+            _, neighbors, _ = graph.read_nodes(frontier[:max(1, room)], self._pool)
+            next_frontier = []
+            for node in np.unique(neighbors[(neighbors >= 0) & (neighbors < self.ntotal)]).tolist():
+                if node not in seen:
+                    seen.add(node)
+                    next_frontier.append(node)
+            frontier = next_frontier
+        return len(graph.cache)
+
+    def _distance_table(self, query: np.ndarray) -> np.ndarray:
+        """Squared distances from each slice of ``query`` to that slice's centroids."""
+        subquantizers, _, width = self.pq_centroids.shape
+        return ((self.pq_centroids - query.reshape(subquantizers, 1, width)) ** 2).sum(axis=2)
+
+    def _beam_search(self, query: np.ndarray, list_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+        """
+        Greedy beam search for ``query``.
+
+        Returns:
+            (ids, exact distances, full vectors) of every expanded node, and the
+            number of blocks read from storage
+        """
+        # Read the count first: nodes past it may still be half written
+        ntotal = self.ntotal
+        graph, codes, table = self._graph, self.codes, self._distance_table(query)
+        parts = np.arange(self.subquantizers)
+
+        candidates = self.entry_points
+        estimates = table[parts, codes[candidates]].sum(axis=1)
+        keep = np.argsort(estimates, kind="stable")[:list_size]
+        candidates, estimates = candidates[keep], estimates[keep]
+        expanded = np.zeros(len(candidates), dtype=bool)
+        seen = set(self.entry_points.tolist())
+        ids, distances, vectors = [], [], []
+        reads = 0
+        while True:
+            beam = np.nonzero(~expanded)[0][:self.beam_width]
+            if not len(beam):
+                break
+            expanded[beam] = True
+            nodes = candidates[beam]
+            node_vectors, neighbors, misses = graph.read_nodes(nodes, self._pool)
+            reads += misses
+            ids.append(nodes)
+            vectors.append(node_vectors)
+            distances.append(((node_vectors - query) ** 2).sum(axis=1))
+
+            neighbors = neighbors[(neighbors >= 0) & (neighbors < ntotal)]
+            new = [node for node in np.unique(neighbors).tolist() if node not in seen]
+            if not new:
+                continue
+            seen.update(new)
+            new = np.asarray(new, dtype=np.int64)
+            candidates = np.concatenate([candidates, new])
+            estimates = np.concatenate([estimates, table[parts, codes[new]].sum(axis=1)])
+            expanded = np.concatenate([expanded, np.zeros(len(new), dtype=bool)])
+            keep = np.argsort(estimates, kind="stable")[:list_size]
+            candidates, estimates, expanded = candidates[keep], estimates[keep], expanded[keep]
+
+        return np.concatenate(ids), np.concatenate(distances), np.vstack(vectors), reads
+
+    def search(
+        self,
+        matrix: np.ndarray,
+        k: int,
+        list_size: Optional[int] = None,
+        excluded: Optional[set] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        FAISS-style search: (distances, positions) of shape (len(matrix), k), padded with inf and -1.
+
+        Args:
+            matrix: Query vectors
+            k: Results per query
+            list_size: Candidate list size (defaults to ``search_list_size``, at least ``k``)
+            excluded: Positions never returned (deleted chunks)
+        """
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, self.dimension)
+        distances = np.full((len(matrix), k), np.inf, dtype=np.float32)
+        indices = np.full((len(matrix), k), -1, dtype=np.int64)
+        if not self.ntotal:
+            return distances, indices
+        list_size = max(list_size or self.search_list_size, k)
+        for row, query in enumerate(matrix):
+            ids, exact, _, reads = self._beam_search(query, list_size)
+            DISK_READS_PER_QUERY.observe(reads)
+            if excluded:
+                live = np.array([node not in excluded for node in ids.tolist()], dtype=bool)
+                ids, exact = ids[live], exact[live]
+            order = np.argsort(exact, kind="stable")[:k]
+            distances[row, :len(order)] = exact[order]
+            indices[row, :len(order)] = ids[order]
+        return distances, indices
+
+    def reconstruct(self, ids: Sequence[int]) -> np.ndarray:
+        """Full vectors of ``ids``, read from disk."""
+        if not len(ids):
+            return np.empty((0, self.dimension), dtype=np.float32)
+        return self._graph.read_nodes(ids, self._pool)[0]
+
+    def add(self, vectors: np.ndarray) -> None:
+        """
+        Add vectors at positions ``ntotal`` onwards.
+
+        Batches at least as large as the index rebuild it; smaller ones are
+        inserted in place, FreshDiskANN style: each new node is linked to the
+        pruned result of a search for it, and the nodes it links to get a
+        reverse edge. A full neighbour list is pruned again using the PQ
+        approximations of its members, which avoids reading them all from disk.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+        if not len(vectors):
+            return
+        with self._write_lock:
+            if len(vectors) >= self.ntotal:
+                existing = self._graph.scan_vectors(self.ntotal) if self.ntotal else vectors[:0]
+                self._rebuild(np.vstack([existing, vectors]))
+                return
+
+            if self.pq_trained_on < min(PQ_TRAIN_SIZE, self.ntotal + len(vectors)) / 2:
+                # Quantizer trained on a much smaller index: retrain on everything
+                all_vectors = np.vstack([self._graph.scan_vectors(self.ntotal), vectors])
+                self.pq_centroids = train_pq(all_vectors, self.subquantizers)
+                self.codes = pq_encode(all_vectors, self.pq_centroids)
+                self.pq_trained_on = len(all_vectors)
+            else:
+                self.codes = np.vstack([self.codes[:self.ntotal], pq_encode(vectors, self.pq_centroids)])
+            for vector in vectors:
+                self._insert(vector)
+
+    def _insert(self, vector: np.ndarray) -> None:
+        graph = self._graph
+        position = self.ntotal
+        ids, _, candidate_vectors, _ = self._beam_search(vector, self.build_list_size)
+        chosen = robust_prune(vector, ids, candidate_vectors, self.alpha, self.degree)
+        row = np.full((1, self.degree), -1, dtype=np.int32)
+        row[0, :len(chosen)] = chosen
+        graph.write_nodes([position], vector[None], row)
+
+        neighbor_vectors, neighbor_lists, _ = graph.read_nodes(chosen, self._pool)
+        for node, node_vector, edges in zip(chosen.tolist(), neighbor_vectors, neighbor_lists):
+            edges = edges[(edges >= 0) & (edges < position)]
+            if len(edges) < self.degree:
+                edges = np.append(edges, position)
+            else:
+                candidates = np.append(edges, position)
+                candidate_vectors = np.vstack([self._decode(edges), vector[None]])
+                edges = robust_prune(node_vector, candidates, candidate_vectors, self.alpha, self.degree)
+            row = np.full((1, self.degree), -1, dtype=np.int32)
+            row[0, :len(edges)] = edges
+            graph.write_nodes([node], node_vector[None], row)
+        # Published last, so concurrent searches only follow edges to it from now on
+        self.ntotal = position + 1
+
+    def _decode(self, ids: np.ndarray) -> np.ndarray:
+        """PQ approximations of the vectors of ``ids``."""
+        codes = self.codes[ids]
+        return np.hstack([self.pq_centroids[part][codes[:, part]] for part in range(self.subquantizers)])
+
+    def memory_bytes(self) -> int:
+        """Bytes held in memory: PQ codes and codebooks plus cached blocks."""
+        total = self.codes.nbytes
+        if self.pq_centroids is not None:
+            total += self.pq_centroids.nbytes
+        if self._graph is not None:
+            total += self._graph.cache.nbytes
+        return total
+
+    def disk_bytes(self) -> int:
+        if self._graph is None:
+            return 0
+        return -(-self.ntotal // self._graph.nodes_per_block) * self._graph.block_size
@@ -0,0 +1,217 @@
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import os
+import pickle
+import uuid
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain.schema import Document
+
+from .disk_index import DiskGraphIndex
+
+# Same name and layout as the FAISS store's pickle
+DOCSTORE_FILE = "index.pkl"
+
+class DiskVectorStore(VectorStore):
+    """
+    Vector store over a ``DiskGraphIndex`` for corpora whose vectors do not fit in RAM.
+
+    Documents are kept like in the FAISS store: an in-memory docstore plus a map
+    from index position to docstore id, pickled to ``index.pkl`` next to the
+    index files. Deleting a chunk removes it from the docstore; its node stays in
+    the graph to route searches and is skipped in results.
+
+    Distances are squared L2, so scores match the default FAISS store.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        index: DiskGraphIndex,
+        docstore: InMemoryDocstore,
+        index_to_docstore_id: Dict[int, str]
+    ):
+        self.embedding_function = embedding_function
+        self.index = index
+        self.docstore = docstore
+        self.index_to_docstore_id = index_to_docstore_id
+        self._deleted = {
+            position for position, doc_id in index_to_docstore_id.items() if doc_id not in docstore._dict
+        }
+
+    @property
+    def embeddings(self) -> Optional[Embeddings]:
+        return self.embedding_function
+
+    def _add(
+        self,
+        texts: List[str],
+        vectors: np.ndarray,
+        metadatas: Optional[Iterable[dict]] = None,
+        ids: Optional[List[str]] = None
+    ) -> List[str]:
+        metadatas = list(metadatas) if metadatas is not None else [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+        if not texts:
+            return []
+        start = self.index.ntotal
+        self.index.add(vectors)
+        self.docstore.add({
+            doc_id: Document(page_content=text, metadata=metadata)
+            for doc_id, text, metadata in zip(ids, texts, metadatas)
+        })
+        self.index_to_docstore_id.update({start + i: doc_id for i, doc_id in enumerate(ids)})
+        return ids
+
+    def add_embeddings(
+        self,
+        text_embeddings: Iterable[Tuple[str, List[float]]],
+        metadatas: Optional[Iterable[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        """Add texts with precomputed embeddings."""
+        pairs = list(text_embeddings)
+        texts = [text for text, _ in pairs]
+        vectors = np.asarray([vector for _, vector in pairs], dtype=np.float32)
+        return self._add(texts, vectors, metadatas, ids)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any
+    ) -> List[str]:
+        texts = list(texts)
+        vectors = np.asarray(self.embedding_function.embed_documents(texts), dtype=np.float32)
+        return self._add(texts, vectors, metadatas, ids)
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Delete documents by docstore id, leaving their nodes in the graph."""
+        if ids is None:
+            raise ValueError("No ids provided to delete.")
+        doomed = set(ids)
+        self._deleted.update(
+            position for position, doc_id in self.index_to_docstore_id.items() if doc_id in doomed
+        )
+        self.docstore.delete([doc_id for doc_id in doomed if doc_id in self.docstore._dict])
+        return True
+
+    def _search(self, embedding: List[float], k: int) -> List[Tuple[int, float]]:
+        distances, indices = self.index.search(np.asarray([embedding], dtype=np.float32), k, excluded=self._deleted)
+        return [(int(i), float(d)) for i, d in zip(indices[0], distances[0]) if i >= 0]
+
+    def _document(self, position: int) -> Optional[Document]:
+        document = self.docstore.search(self.index_to_docstore_id.get(position, ""))
+        # Deleted while the search ran
+        return document if isinstance(document, Document) else None
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        results = []
+        for position, distance in self._search(embedding, k):
+            document = self._document(position)
+            if document is not None:
+                results.append((document, distance))
+        return results
+
+    # The name Chroma uses, which the adaptive-k retriever looks for; scores are distances
+    similarity_search_by_vector_with_relevance_scores = similarity_search_with_score_by_vector
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return [document for document, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embedding_function.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k)
+
+    def max_marginal_relevance_search_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        **kwargs: Any
+    ) -> List[Document]:
+        """Diverse top-k of the ``fetch_k`` nearest chunks, using their full vectors read from disk."""
+        hits = self._search(embedding, fetch_k)
+        if not hits:
+            return []
+        positions = [position for position, _ in hits]
+        chosen = maximal_marginal_relevance(
+            np.asarray(embedding, dtype=np.float32),
+            self.index.reconstruct(positions),
+            k=min(k, len(positions)),
+            lambda_mult=lambda_mult
+        )
+        documents = [self._document(positions[i]) for i in chosen]
+        return [document for document in documents if document is not None]
+
+    def max_marginal_relevance_search(
+        self,
+        query: str,
+        k: int = 4,
+        fetch_k: int = 20,
+        lambda_mult: float = 0.5,
+        **kwargs: Any
+    ) -> List[Document]:
+        return self.max_marginal_relevance_search_by_vector(
+            self.embedding_function.embed_query(query), k=k, fetch_k=fetch_k, lambda_mult=lambda_mult
+        )
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return self._euclidean_relevance_score_fn
+
+    def save_local(self, folder_path: str) -> None:
+        """Save the index metadata and docstore to ``folder_path``."""
+        path = Path(folder_path)
+        self.index.save(str(path))
+        staging = path / f"{DOCSTORE_FILE}.tmp-{os.getpid()}"
+        with open(staging, "wb") as f:
+            pickle.dump((self.docstore, self.index_to_docstore_id), f)
+        os.replace(staging, path / DOCSTORE_FILE)
+
+    @classmethod
+    def load_local(cls, folder_path: str, embeddings: Embeddings, **kwargs: Any) -> "DiskVectorStore":
+        """Open a store saved with ``save_local``; ``kwargs`` override index search and cache settings."""
+        index = DiskGraphIndex.open(folder_path, **kwargs)
+        with open(Path(folder_path) / DOCSTORE_FILE, "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        # Positions added after the last save are not in the index
+        index_to_docstore_id = {
+            position: doc_id for position, doc_id in index_to_docstore_id.items() if position < index.ntotal
+        }
+        return cls(embeddings, index, docstore, index_to_docstore_id)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        folder_path: Optional[str] = None,
+        **kwargs: Any
+    ) -> "DiskVectorStore":
+        """Build a store in ``folder_path`` with the graph built over all ``texts`` at once."""
+        if folder_path is None:
+            raise ValueError("DiskVectorStore needs a folder_path to keep its index in")
+        texts = list(texts)
+        vectors = np.asarray(embedding.embed_documents(texts), dtype=np.float32)
+        if not len(vectors):
+            vectors = np.empty((0, len(embedding.embed_query("dimension probe"))), dtype=np.float32)
+        store = cls(embedding, DiskGraphIndex.build(folder_path, vectors[:0], **kwargs), InMemoryDocstore(), {})
+        store._add(texts, vectors, metadatas, ids)
+        store.save_local(folder_path)
+        return store
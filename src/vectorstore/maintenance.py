@@ -0,0 +1,347 @@
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+import logging
+import time
+import weakref
+
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain.schema import Document
+
+from ..config import COMPACTION_THRESHOLD, FAISS_INDEX_TYPE, ROUTING_DOCUMENTS
+from ..metrics import REGISTRY
+from .disk_store import DiskVectorStore
+
+logger = logging.getLogger(__name__)
+
+DELETED_CHUNKS = REGISTRY.counter(
+    "rag_deleted_chunks_total",
+    "Chunks deleted from the vector store"
+)
+COMPACTION_SECONDS = REGISTRY.histogram(
+    "rag_index_compaction_seconds",
+    "Time spent rewriting the FAISS index without deleted rows"
+)
+INDEX_TOMBSTONES = REGISTRY.gauge(
+    "rag_index_tombstones",
+    "Deleted rows still present in the FAISS index"
+)
+
+# Legacy placeholder older versions inserted into empty FAISS indexes
+PLACEHOLDER_TEXT = "dummy"
+
+# Per-store cache of (state key, tombstoned positions, search parameters)
+_filters: "weakref.WeakKeyDictionary[FAISS, Tuple[Tuple[int, int], np.ndarray, Any]]" = weakref.WeakKeyDictionary()
+
+def _matches(metadata: dict, document_ids: set, sources: set) -> bool:
+    return metadata.get("document_id") in document_ids or metadata.get("source") in sources
+
+def reconstruct_vectors(index: Any, ids: Sequence[int]) -> Optional[np.ndarray]:
+    """
+    Read stored vectors back out of a FAISS index.
+
+    IVF indexes get a direct map on first use; returns None for index types that
+    cannot reconstruct vectors.
+    """
+    import faiss
+
+    ids = np.asarray(ids, dtype=np.int64)
+    try:
+        return index.reconstruct_batch(ids)
+    except RuntimeError:
+        pass
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+        return index.reconstruct_batch(ids)
+    except RuntimeError:
+        return None
+
+def delete_documents(
+    vector_store,
+    document_ids: Optional[Iterable[str]] = None,
+    sources: Optional[Iterable[str]] = None,
+    parent_store: Optional[Any] = None
+) -> int:
+    """
+    Delete all chunks of the given documents.
+
+    In FAISS stores the chunks are removed from the docstore right away and their
+    rows stay in the index as tombstones: positions whose docstore entry is gone.
+    Searches skip them and ``compact_faiss_store`` drops them. Chroma deletes rows
+    directly. Disk stores drop the chunks from their docstore and skip their
+    graph nodes, which stay in place to route searches.
+
+    Args:
+        vector_store: FAISS, disk or Chroma store
+        document_ids: ``document_id`` metadata values to delete
+        sources: ``source`` metadata values (file paths or URLs) to delete
+        parent_store: ``ParentStore`` whose sections of the deleted documents are dropped too
+
+    Returns:
+        Number of chunks deleted
+    """
+    document_ids = set(document_ids or [])
+    sources = set(sources or [])
+    if not document_ids and not sources:
+        return 0
+
+    if isinstance(vector_store, FAISS):
+        docs = vector_store.docstore._dict
+        doomed = [doc_id for doc_id, doc in docs.items() if _matches(doc.metadata, document_ids, sources)]
+        deleted_documents = {docs[doc_id].metadata.get("document_id") for doc_id in doomed}
+        for doc_id in doomed:
+            del docs[doc_id]
+        deleted = len(doomed)
+        INDEX_TOMBSTONES.set(len(tombstoned_positions(vector_store)))
+    elif isinstance(vector_store, DiskVectorStore):
+        doomed = [
+            doc_id for doc_id, doc in vector_store.docstore._dict.items()
+            if _matches(doc.metadata, document_ids, sources)
+        ]
+        deleted_documents = {vector_store.docstore._dict[doc_id].metadata.get("document_id") for doc_id in doomed}
+        if doomed:
+            vector_store.delete(doomed)
+        deleted = len(doomed)
+    else:
+        collection = vector_store._collection
+        deleted = 0
+        deleted_documents = set()
+        for key, values in (("document_id", document_ids), ("source", sources)):
+            if values:
+                where = {key: {"$in": sorted(values)}}
+                found = collection.get(where=where, include=["metadatas"])
+                ids = found["ids"]
+                if ids:
+                    collection.delete(ids=ids)
+                deleted += len(ids)
+                deleted_documents.update((metadata or {}).get("document_id") for metadata in found["metadatas"])
+
+    if parent_store is not None:
+        parent_store.delete((deleted_documents | document_ids) - {None})
+    DELETED_CHUNKS.inc(deleted)
+    logger.info(f"Deleted {deleted} chunks")
+    return deleted
+
+def remove_placeholder(vector_store: FAISS) -> int:
+    """Tombstone the ``"dummy"`` text older versions put into empty indexes."""
+    docs = vector_store.docstore._dict
+    doomed = [
+        doc_id for doc_id, doc in docs.items()
+        if doc.page_content == PLACEHOLDER_TEXT and not doc.metadata
+    ]
+    for doc_id in doomed:
+        del docs[doc_id]
+    return len(doomed)
+
+def _state_key(vector_store: FAISS) -> Tuple[int, int]:
+    return vector_store.index.ntotal, len(vector_store.docstore._dict)
+
+def tombstoned_positions(vector_store: FAISS) -> np.ndarray:
+    """Index positions whose documents have been deleted."""
+    return _filter_state(vector_store)[1]
+
+def reset_search_state(vector_store: FAISS) -> None:
+    """Forget cached search state of a store whose index was replaced in place."""
+    from .routing import forget_document_index
+
+    _filters.pop(vector_store, None)
+    forget_document_index(vector_store)
+
+def fragmentation(vector_store) -> float:
+    """Share of FAISS index rows that are tombstones (0 for other stores)."""
+    if not isinstance(vector_store, FAISS) or vector_store.index.ntotal == 0:
+        return 0.0
+    return len(tombstoned_positions(vector_store)) / vector_store.index.ntotal
+
+def _search_parameters(index: Any, excluded: np.ndarray) -> Any:
+    """FAISS search parameters excluding ``excluded`` ids, of the type the index expects."""
+    import faiss
+
+    batch = faiss.IDSelectorBatch(excluded)
+    selector = faiss.IDSelectorNot(batch)
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    elif isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    # The parameters only hold raw pointers to the selectors
+    params.referenced_selectors = (batch, selector)
+    return params
+
+def _filter_state(vector_store: FAISS) -> Tuple[Tuple[int, int], np.ndarray, Any]:
+    key = _state_key(vector_store)
+    cached = _filters.get(vector_store)
+    if cached is not None and cached[0] == key:
+        return cached
+
+    docs = vector_store.docstore._dict
+    if key[0] == len(docs):
+        excluded = np.empty(0, dtype=np.int64)
+    else:
+        excluded = np.fromiter(
+            (position for position, doc_id in vector_store.index_to_docstore_id.items() if doc_id not in docs),
+            dtype=np.int64
+        )
+    params = _search_parameters(vector_store.index, excluded) if len(excluded) else None
+    state = (key, excluded, params)
+    _filters[vector_store] = state
+    return state
+
+def filtered_search_with_distances(vector_store: FAISS, matrix: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Search a FAISS store, skipping tombstoned rows.
+
+    Uses an ID selector where the index supports one and otherwise over-fetches
+    by the number of tombstones and filters the results.
+
+    Returns:
+        Arrays of distances and index positions, shape (len(matrix), k), padded with -1
+    """
+    _, excluded, params = _filter_state(vector_store)
+    index = vector_store.index
+    if params is None:
+        return index.search(matrix, k)
+    try:
+        return index.search(matrix, k, params=params)
+    except RuntimeError:
+        pass
+
+    distances, indices = index.search(matrix, min(k + len(excluded), index.ntotal))
+    dead = set(excluded.tolist())
+    result_distances = np.full((len(matrix), k), -1, dtype=np.float32)
+    result = np.full((len(matrix), k), -1, dtype=np.int64)
+    for row, (scores, found) in enumerate(zip(distances, indices)):
+        live = [column for column, i in enumerate(found) if i != -1 and i not in dead][:k]
+        result[row, :len(live)] = found[live]
+        result_distances[row, :len(live)] = scores[live]
+    return result_distances, result
+
+def filtered_search(vector_store: FAISS, matrix: np.ndarray, k: int) -> np.ndarray:
+    """Index positions of the ``k`` nearest live rows, see ``filtered_search_with_distances``."""
+    return filtered_search_with_distances(vector_store, matrix, k)[1]
+
+def snapshot_live_rows(vector_store: FAISS) -> Tuple[int, List[Tuple[str, Document]], Optional[np.ndarray]]:
+    """
+    Copy out what ``compact_faiss_store`` rebuilds from.
+
+    Cheap next to the rebuild itself, so writers can take it under their write
+    lock and rebuild without holding it.
+
+    Returns:
+        (index size, live (doc_id, document) pairs in position order, their vectors)
+    """
+    docs = vector_store.docstore._dict
+    live = sorted(
+        (position, doc_id) for position, doc_id in vector_store.index_to_docstore_id.items() if doc_id in docs
+    )
+    rows = [(doc_id, docs[doc_id]) for _, doc_id in live]
+    vectors = None
+    if live:
+        vectors = reconstruct_vectors(vector_store.index, [position for position, _ in live])
+        if vectors is None:
+            raise ValueError("FAISS index cannot reconstruct vectors for compaction")
+    return vector_store.index.ntotal, rows, vectors
+
+def compact_faiss_store(
+    vector_store: FAISS,
+    index_type: Optional[str] = None,
+    snapshot: Optional[Tuple[int, List[Tuple[str, Document]], Optional[np.ndarray]]] = None
+) -> FAISS:
+    """
+    Build a copy of a FAISS store without its tombstoned rows.
+
+    Live vectors are reconstructed from the index and rebuilt into a fresh index
+    of ``index_type`` (retraining IVF/PQ structures on the remaining data). The
+    original store is left untouched, so queries keep running against it until
+    the caller swaps in the result.
+
+    Pass a ``snapshot_live_rows`` result taken earlier to rebuild from it while
+    the store keeps changing; ``catch_up_compacted`` then applies the changes
+    made since, before the swap.
+    """
+    from .vector_store_factory import build_faiss_index
+
+    start = time.perf_counter()
+    ntotal, rows, vectors = snapshot or snapshot_live_rows(vector_store)
+    index = vector_store.index
+    index_type = index_type or FAISS_INDEX_TYPE
+
+    if rows:
+        new_index = build_faiss_index(np.ascontiguousarray(vectors, dtype=np.float32), index_type, index.metric_type)
+    else:
+        import faiss
+        new_index = faiss.index_factory(index.d, "Flat", index.metric_type)
+
+    compacted = FAISS(
+        embedding_function=vector_store.embedding_function,
+        index=new_index,
+        docstore=InMemoryDocstore(dict(rows)),
+        index_to_docstore_id={position: doc_id for position, (doc_id, _) in enumerate(rows)},
+        normalize_L2=vector_store._normalize_L2,
+        distance_strategy=vector_store.distance_strategy
+    )
+    if ROUTING_DOCUMENTS:
+        from .routing import document_index
+        # Rows are renumbered, so the routing index is rebuilt here rather than on the first query
+        document_index(compacted)
+    seconds = time.perf_counter() - start
+    COMPACTION_SECONDS.observe(seconds)
+    INDEX_TOMBSTONES.set(0)
+    logger.info(
+        f"Compacted FAISS index from {ntotal} to {len(rows)} rows ({index_type}) in {seconds:.2f}s"
+    )
+    return compacted
+
+def catch_up_compacted(compacted: FAISS, vector_store: FAISS, since: int) -> bool:
+    """
+    Apply to ``compacted`` the writes ``vector_store`` received after its snapshot.
+
+    Chunks deleted since are tombstoned in ``compacted`` and rows added at
+    positions ``since`` and above are copied over with their stored vectors.
+    Callers hold their write lock so nothing changes while this runs.
+
+    Args:
+        compacted: Result of ``compact_faiss_store``
+        vector_store: Store the snapshot was taken from
+        since: Index size recorded in the snapshot
+
+    Returns:
+        False, leaving ``compacted`` untouched, if ``vector_store`` was
+        re-projected (e.g. switched to reduced embeddings) since the snapshot;
+        the compaction must then be restarted from a new snapshot
+    """
+    if (
+        compacted.embedding_function is not vector_store.embedding_function
+        or compacted.index.d != vector_store.index.d
+    ):
+        return False
+
+    docs = vector_store.docstore._dict
+    compacted_docs = compacted.docstore._dict
+    deleted = [doc_id for doc_id in compacted_docs if doc_id not in docs]
+    for doc_id in deleted:
+        del compacted_docs[doc_id]
+
+    added = sorted(
+        (position, doc_id) for position, doc_id in vector_store.index_to_docstore_id.items()
+        if position >= since and doc_id in docs
+    )
+    if added:
+        vectors = reconstruct_vectors(vector_store.index, [position for position, _ in added])
+        start = compacted.index.ntotal
+        compacted.index.add(np.ascontiguousarray(vectors, dtype=np.float32))
+        compacted.docstore.add({doc_id: docs[doc_id] for _, doc_id in added})
+        compacted.index_to_docstore_id.update({start + i: doc_id for i, (_, doc_id) in enumerate(added)})
+
+    if ROUTING_DOCUMENTS:
+        from .routing import document_index
+        document_index(compacted)
+    INDEX_TOMBSTONES.set(len(tombstoned_positions(compacted)))
+    if added or deleted:
+        logger.info(f"Applied {len(added)} additions and {len(deleted)} deletions made during compaction")
+    return True
+
+def needs_compaction(vector_store, threshold: float = COMPACTION_THRESHOLD) -> bool:
+    """Whether tombstones make up more than ``threshold`` of the index."""
+    return fragmentation(vector_store) > threshold
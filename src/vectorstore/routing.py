@@ -0,0 +1,278 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from ..config import DOCUMENT_CENTROIDS, ROUTING_DOCUMENTS
+from ..metrics import REGISTRY
+from .maintenance import _state_key, filtered_search_with_distances, reconstruct_vectors
+
+logger = logging.getLogger(__name__)
+
+ROUTED_SEARCH_CHUNKS = REGISTRY.histogram(
+    "rag_routed_search_chunks",
+    "Chunks scored per query after document routing",
+    buckets=(10, 30, 100, 300, 1000, 3000, 10000, 30000)
+)
+DOCUMENT_INDEX_UPDATE_SECONDS = REGISTRY.histogram(
+    "rag_document_index_update_seconds",
+    "Time spent bringing the document routing index up to date with the chunk index"
+)
+
+# Saved next to index.faiss so the routing index travels with the chunk index
+DOCUMENT_INDEX_FILE = "documents.npz"
+
+def _document_key(metadata: dict) -> str:
+    # Chunks without a document_id (e.g. added by older versions) are grouped by source
+    return metadata.get("document_id") or metadata.get("source") or ""
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+class DocumentIndex:
+    """
+    Document-level routing index over a FAISS chunk store.
+
+    Each document (chunks sharing a ``document_id``) is represented by up to
+    ``centroids_per_document`` unit-length centroids of its chunk vectors
+    (k-means for longer documents). A query first ranks documents by cosine
+    similarity to their best centroid, then only the chunks of the top
+    documents are scored, so a search touches a few documents' rows instead of
+    the whole index and its hits come from a coherent set of documents.
+
+    The index records the chunk store state it reflects and catches up
+    incrementally: only documents with new or deleted chunks are recomputed.
+    """
+
+    def __init__(self, centroids_per_document: int = DOCUMENT_CENTROIDS):
+        self.centroids_per_document = max(1, centroids_per_document)
+        # document_id -> chunk index positions / centroid rows
+        self.positions: Dict[str, np.ndarray] = {}
+        self.centroids: Dict[str, np.ndarray] = {}
+        # Chunk store (index.ntotal, docstore size) the index reflects
+        self.state: Tuple[int, int] = (0, 0)
+        self._matrix: Optional[np.ndarray] = None
+        self._row_documents: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _document_centroids(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = _normalize(np.ascontiguousarray(vectors, dtype=np.float32))
+        if len(vectors) <= self.centroids_per_document:
+            return vectors if self.centroids_per_document > 1 else _normalize(vectors.mean(axis=0, keepdims=True))
+        import faiss
+
+        kmeans = faiss.Kmeans(vectors.shape[1], self.centroids_per_document, niter=10, spherical=True, seed=0)
+        kmeans.train(vectors)
+        return _normalize(kmeans.centroids)
+
+    def _recompute(self, vector_store: FAISS, documents: Dict[str, List[int]]) -> None:
+        """Replace the centroids of ``documents`` (document_id -> chunk positions)."""
+        for document_id, positions in documents.items():
+            positions = np.asarray(sorted(positions), dtype=np.int64)
+            if not len(positions):
+                self.positions.pop(document_id, None)
+                self.centroids.pop(document_id, None)
+                continue
+            vectors = reconstruct_vectors(vector_store.index, positions)
+            if vectors is None:
+                raise ValueError("FAISS index cannot reconstruct vectors for document routing")
+            self.positions[document_id] = positions
+            self.centroids[document_id] = self._document_centroids(vectors)
+        self._matrix = None
+
+    def update(self, vector_store: FAISS) -> None:
+        """Bring the index up to date with chunks added to or deleted from ``vector_store``."""
+        with self._lock:
+            key = _state_key(vector_store)
+            if key == self.state:
+                return
+            start = time.perf_counter()
+            docs = vector_store.docstore._dict
+            index_to_docstore_id = vector_store.index_to_docstore_id
+            changed: Dict[str, List[int]] = {}
+
+            if key[0] < self.state[0]:
+                # Index rebuilt with renumbered rows (e.g. compaction): start over
+                self.positions, self.centroids = {}, {}
+                self.state = (0, 0)
+
+            if key[1] - self.state[1] != key[0] - self.state[0]:
+                # Chunks were deleted: drop documents with deleted chunks and recompute them
+                for document_id, positions in list(self.positions.items()):
+                    live = [int(p) for p in positions if index_to_docstore_id.get(int(p)) in docs]
+                    if len(live) != len(positions):
+                        changed[document_id] = live
+
+            for position in range(self.state[0], key[0]):
+                doc = docs.get(index_to_docstore_id.get(position))
+                if doc is None:
+                    continue
+                document_id = _document_key(doc.metadata)
+                if document_id not in changed:
+                    existing = self.positions.get(document_id)
+                    changed[document_id] = [] if existing is None else existing.tolist()
+                changed[document_id].append(position)
+
+            self._recompute(vector_store, changed)
+            self.state = key
+            seconds = time.perf_counter() - start
+            DOCUMENT_INDEX_UPDATE_SECONDS.observe(seconds)
+            logger.info(f"Updated document routing index: {len(changed)} of {len(self.positions)} documents in {seconds:.2f}s")
+
+    def _centroid_matrix(self) -> Tuple[np.ndarray, List[str]]:
+        if self._matrix is None:
+            rows, matrix = [], []
+            for document_id, centroids in self.centroids.items():
+                rows.extend([document_id] * len(centroids))
+                matrix.append(centroids)
+            self._row_documents = rows
+            self._matrix = np.vstack(matrix) if matrix else np.empty((0, 0), dtype=np.float32)
+        return self._matrix, self._row_documents
+
+    def route(self, queries: np.ndarray, n_documents: int) -> List[List[str]]:
+        """The ``n_documents`` documents closest to each query, best first."""
+        with self._lock:
+            matrix, rows = self._centroid_matrix()
+        if not len(rows):
+            return [[] for _ in queries]
+        scores = _normalize(np.asarray(queries, dtype=np.float32)) @ matrix.T
+        # Enough top centroids to cover n_documents distinct documents
+        top = min(len(rows), n_documents * self.centroids_per_document)
+        routes = []
+        for row_scores in scores:
+            candidates = np.argpartition(-row_scores, top - 1)[:top]
+            chosen: List[str] = []
+            # Documents with several centroids appear once, at their best centroid
+            for row in candidates[np.argsort(-row_scores[candidates])]:
+                document_id = rows[row]
+                if document_id not in chosen:
+                    chosen.append(document_id)
+                    if len(chosen) == n_documents:
+                        break
+            routes.append(chosen)
+        return routes
+
+    def save(self, path: str) -> None:
+        document_ids = list(self.positions)
+        positions = [self.positions[d] for d in document_ids]
+        centroids = [self.centroids[d] for d in document_ids]
+        staging = Path(f"{path}.tmp-{os.getpid()}.npz")
+        np.savez(
+            staging,
+            document_ids=np.array(document_ids, dtype=str),
+            position_counts=np.array([len(p) for p in positions], dtype=np.int64),
+            positions=np.concatenate(positions) if positions else np.empty(0, dtype=np.int64),
+            centroid_counts=np.array([len(c) for c in centroids], dtype=np.int64),
+            centroids=np.vstack(centroids) if centroids else np.empty((0, 0), dtype=np.float32),
+            state=np.array(self.state, dtype=np.int64),
+            centroids_per_document=np.array(self.centroids_per_document)
+        )
+        os.replace(staging, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["DocumentIndex"]:
+        """Load a saved routing index, or return None if it does not exist."""
+        if not Path(path).exists():
+            return None
+        with np.load(path) as data:
+            index = cls(int(data["centroids_per_document"]))
+            document_ids = data["document_ids"].tolist()
+            index.positions = dict(zip(document_ids, np.split(data["positions"], np.cumsum(data["position_counts"])[:-1])))
+            index.centroids = dict(zip(document_ids, np.split(data["centroids"], np.cumsum(data["centroid_counts"])[:-1])))
+            index.state = tuple(int(v) for v in data["state"])
+        return index
+
+# Routing index of each loaded FAISS store
+_document_indexes: "weakref.WeakKeyDictionary[FAISS, DocumentIndex]" = weakref.WeakKeyDictionary()
+_document_indexes_lock = threading.Lock()
+
+def document_index(vector_store: FAISS, centroids_per_document: int = DOCUMENT_CENTROIDS) -> DocumentIndex:
+    """
+    The store's routing index, built or brought up to date as needed.
+
+    ``centroids_per_document`` only applies when the index is first built.
+    """
+    with _document_indexes_lock:
+        index = _document_indexes.get(vector_store)
+        if index is None:
+            index = _document_indexes[vector_store] = DocumentIndex(centroids_per_document)
+    index.update(vector_store)
+    return index
+
+def forget_document_index(vector_store: FAISS) -> None:
+    """Drop a store's routing index, e.g. after its vectors were re-projected; the next use rebuilds it."""
+    with _document_indexes_lock:
+        _document_indexes.pop(vector_store, None)
+
+def routed_search(vector_store: FAISS, matrix: np.ndarray, k: int, n_documents: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Search only the chunks of the ``n_documents`` documents nearest to each query.
+
+    Same contract as ``filtered_search_with_distances``: FAISS-style distances
+    (squared L2 or inner product, per the index metric) and positions, padded
+    with -1. Chunk vectors of the routed documents are read back from the index
+    and scored exactly; indexes that cannot reconstruct vectors are searched in full.
+    """
+    import faiss
+
+    routing = document_index(vector_store)
+    index = vector_store.index
+    distances = np.full((len(matrix), k), np.inf if index.metric_type == faiss.METRIC_L2 else -np.inf, dtype=np.float32)
+    indices = np.full((len(matrix), k), -1, dtype=np.int64)
+
+    for row, (query, document_ids) in enumerate(zip(matrix, routing.route(matrix, n_documents))):
+        if not document_ids:
+            continue
+        # A concurrent update may have dropped a deleted document since routing
+        positions = [routing.positions.get(d) for d in document_ids]
+        positions = np.concatenate([p for p in positions if p is not None] or [np.empty(0, dtype=np.int64)])
+        vectors = reconstruct_vectors(index, positions)
+        if vectors is None:
+            logger.warning("Index cannot reconstruct vectors; searching all chunks")
+            return filtered_search_with_distances(vector_store, matrix, k)
+        ROUTED_SEARCH_CHUNKS.observe(len(positions))
+        if index.metric_type == faiss.METRIC_L2:
+            scores = ((vectors - query) ** 2).sum(axis=1)
+            order = np.argsort(scores)[:k]
+        else:
+            scores = vectors @ query
+            order = np.argsort(-scores)[:k]
+        distances[row, :len(order)] = scores[order]
+        indices[row, :len(order)] = positions[order]
+    return distances, indices
+
+def save_document_index(vector_store, directory: str) -> None:
+    """
+    Save the routing index of a FAISS store to ``directory``.
+
+    With routing disabled a stale file is removed instead, so the directory
+    never pairs a chunk index with a routing index built for another one.
+    """
+    path = Path(directory) / DOCUMENT_INDEX_FILE
+    if ROUTING_DOCUMENTS and isinstance(vector_store, FAISS):
+        document_index(vector_store).save(path)
+    else:
+        path.unlink(missing_ok=True)
+
+def load_document_index(vector_store: FAISS, directory: str) -> None:
+    """Attach the routing index saved in ``directory`` to a freshly loaded store, if it matches."""
+    if not ROUTING_DOCUMENTS:
+        return
+    index = DocumentIndex.load(Path(directory) / DOCUMENT_INDEX_FILE)
+    if index is None:
+        return
+    if index.state != _state_key(vector_store):
+        logger.warning(f"Ignoring document routing index in {directory}: it does not match the chunk index")
+        return
+    with _document_indexes_lock:
+        _document_indexes[vector_store] = index
@@ -0,0 +1,163 @@
+from typing import Callable, Optional, Tuple
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+from pathlib import Path
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from ..config import SNAPSHOT_DIR, SNAPSHOT_KEEP, SNAPSHOT_MMAP, SNAPSHOT_POLL_INTERVAL
+from ..embeddings import with_projection, save_projection
+from .routing import save_document_index, load_document_index
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+
+def _snapshot_root(root: Optional[str]) -> Path:
+    path = Path(root or SNAPSHOT_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def _versions(root: Path):
+    """Published snapshot versions, oldest first."""
+    return sorted(p.name for p in root.iterdir() if p.is_dir() and p.name.startswith("v"))
+
+def current_snapshot(root: Optional[str] = None) -> Optional[Tuple[str, Path]]:
+    """
+    Return the version name and directory of the newest published snapshot.
+
+    Args:
+        root: Snapshot directory (defaults to SNAPSHOT_DIR)
+
+    Returns:
+        (version, path), or None if nothing has been published yet
+    """
+    root_path = _snapshot_root(root)
+    try:
+        version = (root_path / CURRENT_FILE).read_text().strip()
+    except FileNotFoundError:
+        return None
+    path = root_path / version
+    return (version, path) if path.is_dir() else None
+
+def publish_snapshot(vector_store: FAISS, root: Optional[str] = None, keep: int = SNAPSHOT_KEEP) -> str:
+    """
+    Publish the vector store as a new immutable snapshot.
+
+    The store is written to a temporary directory, renamed into place and only
+    then made current by atomically replacing the ``CURRENT`` pointer, so readers
+    never observe a partially written snapshot.
+
+    Args:
+        vector_store: FAISS store to publish
+        root: Snapshot directory (defaults to SNAPSHOT_DIR)
+        keep: Number of most recent snapshots to retain
+
+    Returns:
+        The new version name
+    """
+    if not isinstance(vector_store, FAISS):
+        raise ValueError("Snapshots are only supported for FAISS vector stores")
+
+    root_path = _snapshot_root(root)
+    versions = _versions(root_path)
+    next_number = int(versions[-1][1:]) + 1 if versions else 1
+    version = f"v{next_number:08d}"
+
+    staging = root_path / f".staging-{version}-{os.getpid()}"
+    vector_store.save_local(str(staging))
+    save_projection(vector_store.embedding_function, str(staging))
+    save_document_index(vector_store, str(staging))
+    os.replace(staging, root_path / version)
+
+    pointer = root_path / f".{CURRENT_FILE}.{os.getpid()}"
+    pointer.write_text(version)
+    os.replace(pointer, root_path / CURRENT_FILE)
+    logger.info(f"Published vector store snapshot {version} ({vector_store.index.ntotal} vectors)")
+
+    # Readers load snapshots fully or via mmap, so removing old directories is safe
+    for old in _versions(root_path)[:-keep]:
+        shutil.rmtree(root_path / old, ignore_errors=True)
+
+    return version
+
+def load_snapshot(path: Path, embedding_model: Embeddings, mmap: bool = SNAPSHOT_MMAP) -> FAISS:
+    """
+    Load a published snapshot.
+
+    With ``mmap`` the FAISS index is memory-mapped read-only where the index type
+    supports it, so reader processes on one host share its pages.
+    """
+    import faiss
+
+    index_file = str(Path(path) / "index.faiss")
+    index = None
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+        try:
+            index = faiss.read_index(index_file, flags)
+        except RuntimeError as e:
+            logger.warning(f"Could not memory-map {index_file}, reading it instead: {str(e)}")
+    if index is None:
+        index = faiss.read_index(index_file)
+
+    with open(Path(path) / "index.pkl", "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+
+    vector_store = FAISS(
+        embedding_function=with_projection(embedding_model, str(path)),
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id
+    )
+    load_document_index(vector_store, str(path))
+    return vector_store
+
+
+class SnapshotWatcher(threading.Thread):
+    """Background thread that loads newly published snapshots and hands them to a callback."""
+
+    def __init__(
+        self,
+        embedding_model: Embeddings,
+        on_snapshot: Callable[[str, FAISS], None],
+        root: Optional[str] = None,
+        interval: float = SNAPSHOT_POLL_INTERVAL,
+        current_version: Optional[str] = None
+    ):
+        super().__init__(name="snapshot-watcher", daemon=True)
+        self.embedding_model = embedding_model
+        self.on_snapshot = on_snapshot
+        self.root = root
+        self.interval = interval
+        self.current_version = current_version
+        self._stop_event = threading.Event()
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def check(self) -> bool:
+        """Load the current snapshot if it is newer than the one being served."""
+        snapshot = current_snapshot(self.root)
+        if snapshot is None or snapshot[0] == self.current_version:
+            return False
+
+        version, path = snapshot
+        start = time.perf_counter()
+        vector_store = load_snapshot(path, self.embedding_model)
+        self.on_snapshot(version, vector_store)
+        self.current_version = version
+        logger.info(f"Switched to snapshot {version} in {time.perf_counter() - start:.2f}s")
+        return True
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error loading vector store snapshot: {str(e)}")
@@ -1,34 +1,61 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable, Iterator
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 import logging
+import uuid
 from pathlib import Path
 
 from langchain_community.vectorstores import FAISS, Chroma
 from langchain_core.embeddings import Embeddings  # Updated import
-
-
 from langchain.schema import Document
-from langchain.vectorstores import FAISS, Chroma
-from langchain.embeddings.base import Embeddings
 
-from ..config import VECTOR_DB_PATH
-from ..embeddings import get_embeddings
+from ..config import (
+    VECTOR_DB_PATH,
+    FAISS_INDEX_TYPE,
+    CHROMA_BATCH_SIZE,
+    CHROMA_EMBEDDING_WORKERS,
+    EMBEDDING_REDUCTION,
+    REDUCED_DIMENSION,
+    PCA_SAMPLE_SIZE,
+    ROUTING_DOCUMENTS,
+    VECTOR_STORE_TYPE
+)
+from ..embeddings import get_embeddings, ReducedEmbeddings, fit_projection, with_projection, save_projection
+from ..metrics import REGISTRY, stage
+from .maintenance import remove_placeholder, reconstruct_vectors, reset_search_state
+from .routing import document_index, save_document_index, load_document_index
+from .disk_store import DiskVectorStore
 
 logger = logging.getLogger(__name__)
 
+INDEX_OPEN_SECONDS = REGISTRY.histogram(
+    "rag_index_open_seconds",
+    "Time spent loading or building a vector store",
+    ["store_type"]
+)
+INDEX_VECTORS = REGISTRY.gauge(
+    "rag_index_vectors",
+    "Number of vectors in the most recently opened vector store",
+    ["store_type"]
+)
+
 def get_vector_store(
-    store_type: str = "faiss",
+    store_type: str = VECTOR_STORE_TYPE,
     embedding_model: Optional[Embeddings] = None,
     persist_directory: Optional[str] = None,
-    documents: Optional[List[Document]] = None
+    documents: Optional[List[Document]] = None,
+    index_type: Optional[str] = None
 ):
     """
     Factory function to get the appropriate vector store.
     
     Args:
-        store_type: "faiss" or "chroma"
+        store_type: "faiss", "chroma" or "disk"
         embedding_model: Embeddings model to use
         persist_directory: Directory to persist the vector store
         documents: Documents to add to the vector store
+        index_type: FAISS index factory string used when building a new index
     
     Returns:
         An instance of a vector store
@@ -40,41 +67,258 @@ def get_vector_store(
     persist_directory = persist_directory or VECTOR_DB_PATH
     Path(persist_directory).mkdir(exist_ok=True, parents=True)
     
-    if store_type.lower() == "faiss":
-        return get_faiss_store(embedding_model, persist_directory, documents)
-    elif store_type.lower() == "chroma":
-        return get_chroma_store(embedding_model, persist_directory, documents)
-    else:
+    store_type = store_type.lower()
+    if store_type not in ("faiss", "chroma", "disk"):
         raise ValueError(f"Invalid vector store type: {store_type}")
+    
+    with stage("index_open", INDEX_OPEN_SECONDS.labels(store_type=store_type)):
+        if store_type == "faiss":
+            vector_store = get_faiss_store(embedding_model, persist_directory, documents, index_type)
+        elif store_type == "disk":
+            vector_store = get_disk_store(embedding_model, persist_directory, documents)
+        else:
+            vector_store = get_chroma_store(embedding_model, persist_directory, documents)
+    INDEX_VECTORS.labels(store_type=store_type).set(count_vectors(vector_store))
+    return vector_store
+
+
+def count_vectors(vector_store) -> int:
+    """Return the number of vectors held by a FAISS, disk or Chroma store."""
+    try:
+        if hasattr(vector_store, "index"):
+            return vector_store.index.ntotal
+        return vector_store._collection.count()
+    except Exception:
+        return 0
+
+
+def build_faiss_index(vectors, index_type: str, metric: Optional[int] = None):
+    """
+    Build a FAISS index of the given factory type from a matrix of vectors.
+    
+    Args:
+        vectors: float32 array of shape (n, d)
+        index_type: FAISS index factory string, e.g. "Flat", "HNSW32" or "IVF256,Flat"
+        metric: FAISS metric type (defaults to L2)
+    
+    Returns:
+        A trained FAISS index containing the vectors
+    """
+    import faiss
+    
+    metric = faiss.METRIC_L2 if metric is None else metric
+    index = faiss.index_factory(vectors.shape[1], index_type, metric)
+    if not index.is_trained:
+        logger.info(f"Training FAISS {index_type} index on {len(vectors)} vectors")
+        index.train(vectors)
+    index.add(vectors)
+    return index
 
 
 def get_faiss_store(
     embedding_model: Embeddings,
     persist_directory: str,
-    documents: Optional[List[Document]] = None
+    documents: Optional[List[Document]] = None,
+    index_type: Optional[str] = None
 ):
     """Get a FAISS vector store."""
     persist_path = Path(persist_directory) / "faiss"
     persist_path.mkdir(exist_ok=True, parents=True)
+    index_type = index_type or FAISS_INDEX_TYPE
 
     if documents:
         logger.info(f"Creating new FAISS index with {len(documents)} documents")
-        vector_store = FAISS.from_documents(documents, embedding_model)
+        vector_store = create_empty_faiss_store(embedding_model)
+        add_documents(vector_store, documents)
+        if index_type.lower() != "flat":
+            # Rebuild the flat index LangChain creates as the configured ANN structure
+            vectors = vector_store.index.reconstruct_n(0, vector_store.index.ntotal)
+            vector_store.index = build_faiss_index(vectors, index_type)
         vector_store.save_local(str(persist_path))
+        save_projection(vector_store.embedding_function, str(persist_path))
+        save_document_index(vector_store, str(persist_path))
         return vector_store
     else:
         try:
             logger.info(f"Loading existing FAISS index from {persist_path}")
-            return FAISS.load_local(
-                str(persist_path), embedding_model, allow_dangerous_deserialization=True
+            vector_store = FAISS.load_local(
+                str(persist_path),
+                with_projection(embedding_model, str(persist_path)),
+                allow_dangerous_deserialization=True
             )
+            if remove_placeholder(vector_store):
+                logger.info("Removed placeholder document from FAISS index")
+            load_document_index(vector_store, str(persist_path))
+            return vector_store
         except Exception as e:
             logger.warning(f"Could not load FAISS index: {str(e)}")
             logger.info("Creating empty FAISS index")
-            # Fix: Ensure at least one dummy document
-            vector_store = FAISS.from_texts(["dummy"], embedding_model)
+            vector_store = create_empty_faiss_store(embedding_model)
             vector_store.save_local(str(persist_path))
+            save_projection(embedding_model, str(persist_path))
+            save_document_index(vector_store, str(persist_path))
             return vector_store
+
+def get_disk_store(
+    embedding_model: Embeddings,
+    persist_directory: str,
+    documents: Optional[List[Document]] = None
+) -> DiskVectorStore:
+    """Get a disk-resident graph index store, building the graph over ``documents`` in one pass."""
+    persist_path = Path(persist_directory) / "disk"
+    persist_path.mkdir(exist_ok=True, parents=True)
+    
+    if documents:
+        logger.info(f"Creating new disk index with {len(documents)} documents")
+        return DiskVectorStore.from_documents(documents, embedding_model, folder_path=str(persist_path))
+    try:
+        logger.info(f"Loading existing disk index from {persist_path}")
+        return DiskVectorStore.load_local(str(persist_path), embedding_model)
+    except Exception as e:
+        logger.warning(f"Could not load disk index: {str(e)}")
+        logger.info("Creating empty disk index")
+        return DiskVectorStore.from_texts([], embedding_model, folder_path=str(persist_path))
+
+def save_vector_store(vector_store, persist_directory: Optional[str] = None) -> None:
+    """
+    Persist a store where ``get_vector_store`` loads it from.
+    
+    Chroma writes through on every change, so only FAISS and disk stores are saved.
+    """
+    if isinstance(vector_store, DiskVectorStore):
+        vector_store.save_local(str(Path(persist_directory or VECTOR_DB_PATH) / "disk"))
+        return
+    if not isinstance(vector_store, FAISS):
+        return
+    persist_path = Path(persist_directory or VECTOR_DB_PATH) / "faiss"
+    persist_path.mkdir(exist_ok=True, parents=True)
+    vector_store.save_local(str(persist_path))
+    save_projection(vector_store.embedding_function, str(persist_path))
+    save_document_index(vector_store, str(persist_path))
+
+def add_documents(vector_store, documents: List[Document]) -> None:
+    """
+    Add documents to a FAISS, disk or Chroma store.
+    
+    Chroma stores are written in batches. When ``EMBEDDING_REDUCTION`` is set,
+    a FAISS store keeps full-width vectors until it holds enough chunks to fit
+    the projection on (``PCA_SAMPLE_SIZE`` for PCA, any for truncation), then
+    switches every row to the reduced width in place.
+    With ``ROUTING_DOCUMENTS`` the FAISS document routing index is updated too.
+    
+    Args:
+        vector_store: Store to add to
+        documents: Documents to add
+    """
+    if isinstance(vector_store, Chroma):
+        add_documents_batched(vector_store, documents)
+        return
+    
+    vector_store.add_documents(documents)
+    if (
+        EMBEDDING_REDUCTION != "none"
+        and isinstance(vector_store, FAISS)
+        and not isinstance(vector_store.embedding_function, ReducedEmbeddings)
+        and len(vector_store.docstore._dict) >= _projection_sample_size()
+    ):
+        _reduce_in_place(vector_store)
+    
+    if ROUTING_DOCUMENTS and isinstance(vector_store, FAISS):
+        # Add the new documents' centroids now rather than on the next query
+        document_index(vector_store)
+
+def _projection_sample_size() -> int:
+    """Chunks a FAISS store must hold before its projection is fitted."""
+    if EMBEDDING_REDUCTION == "pca":
+        # PCA to REDUCED_DIMENSION components needs at least that many samples
+        return max(PCA_SAMPLE_SIZE, REDUCED_DIMENSION)
+    return 1
+
+def _reduce_in_place(vector_store: FAISS) -> None:
+    """Fit the reduction projection on a store's live full-width vectors and re-project every row."""
+    import numpy as np
+    
+    index = vector_store.index
+    vectors = reconstruct_vectors(index, np.arange(index.ntotal))
+    if vectors is None:
+        logger.warning("FAISS index cannot reconstruct vectors; keeping embeddings at full width")
+        return
+    docs = vector_store.docstore._dict
+    live = [position for position, doc_id in vector_store.index_to_docstore_id.items() if doc_id in docs]
+    projection = fit_projection(vectors[live], EMBEDDING_REDUCTION, REDUCED_DIMENSION, PCA_SAMPLE_SIZE)
+    # Tombstoned rows are re-projected too so positions stay valid
+    reduced = build_faiss_index(
+        np.ascontiguousarray(projection.apply(vectors), dtype=np.float32), FAISS_INDEX_TYPE, index.metric_type
+    )
+    vector_store.embedding_function = ReducedEmbeddings(vector_store.embedding_function, projection)
+    vector_store.index = reduced
+    reset_search_state(vector_store)
+    logger.info(f"Switched FAISS index to {projection.method} projection with {projection.dimension} dimensions")
+
+def refit_projection(vector_store: FAISS, method: str = EMBEDDING_REDUCTION, index_type: Optional[str] = None) -> FAISS:
+    """
+    Fit a new reduction projection on all live chunks of a FAISS store.
+    
+    Full-width vectors are read back from an unreduced index; an already reduced
+    store no longer has them, so its chunks are re-embedded with the underlying
+    model. With ``method`` "none" the store goes back to full width.
+    
+    Returns:
+        A new store without tombstoned rows; the original is left untouched
+    """
+    import numpy as np
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    
+    if not isinstance(vector_store, FAISS):
+        raise ValueError("Embedding reduction only applies to FAISS stores")
+    docs = vector_store.docstore._dict
+    live = sorted(
+        (position, doc_id) for position, doc_id in vector_store.index_to_docstore_id.items() if doc_id in docs
+    )
+    if not live:
+        raise ValueError("The index has no chunks to fit a projection on")
+    embedding_model = vector_store.embedding_function
+    if isinstance(embedding_model, ReducedEmbeddings):
+        embedding_model = embedding_model.embeddings
+        logger.info(f"Re-embedding {len(live)} chunks at full width")
+        vectors = np.asarray(
+            embedding_model.embed_documents([docs[doc_id].page_content for _, doc_id in live]), dtype=np.float32
+        )
+    else:
+        vectors = reconstruct_vectors(vector_store.index, [position for position, _ in live])
+        if vectors is None:
+            raise ValueError("FAISS index cannot reconstruct vectors for refitting the projection")
+    
+    if method != "none":
+        projection = fit_projection(vectors, method, REDUCED_DIMENSION, PCA_SAMPLE_SIZE)
+        embedding_model = ReducedEmbeddings(embedding_model, projection)
+        vectors = projection.apply(vectors)
+    index = build_faiss_index(
+        np.ascontiguousarray(vectors, dtype=np.float32), index_type or FAISS_INDEX_TYPE, vector_store.index.metric_type
+    )
+    refitted = FAISS(
+        embedding_function=embedding_model,
+        index=index,
+        docstore=InMemoryDocstore({doc_id: docs[doc_id] for _, doc_id in live}),
+        index_to_docstore_id={position: doc_id for position, (_, doc_id) in enumerate(live)},
+        normalize_L2=vector_store._normalize_L2,
+        distance_strategy=vector_store.distance_strategy
+    )
+    logger.info(f"Refitted projection ({method}) on {len(live)} chunks")
+    return refitted
+
+def create_empty_faiss_store(embedding_model: Embeddings) -> FAISS:
+    """Create a FAISS store with no vectors, sized for the embedding model."""
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    
+    dimension = len(embedding_model.embed_query("dimension probe"))
+    return FAISS(
+        embedding_function=embedding_model,
+        index=faiss.IndexFlatL2(dimension),
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={}
+    )
  
 def get_chroma_store(
     embedding_model: Embeddings,
@@ -87,11 +331,12 @@ def get_chroma_store(
     
     if documents:
         logger.info(f"Creating/updating Chroma DB with {len(documents)} documents")
-        return Chroma.from_documents(
-            documents=documents,
-            embedding=embedding_model,
+        vector_store = Chroma(
+            embedding_function=embedding_model,
             persist_directory=str(persist_path)
         )
+        add_documents_batched(vector_store, documents)
+        return vector_store
     else:
         try:
             logger.info(f"Loading existing Chroma DB from {persist_path}")
@@ -106,4 +351,62 @@ def get_chroma_store(
                 embedding_function=embedding_model,
                 persist_directory=str(persist_path)
             )
-            return vector_store
\ No newline at end of file
+            return vector_store
+
+def _batches(documents: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+    iterator = iter(documents)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+def add_documents_batched(
+    vector_store: Chroma,
+    documents: Iterable[Document],
+    batch_size: int = CHROMA_BATCH_SIZE,
+    workers: int = CHROMA_EMBEDDING_WORKERS
+) -> int:
+    """
+    Embed and write documents to a Chroma store in fixed-size batches.
+    
+    Up to ``workers`` batches are embedded concurrently while finished batches
+    are written in order, so at most ``workers + 1`` batches of vectors are held
+    in memory however large the input is.
+    
+    Args:
+        vector_store: Chroma store to write to
+        documents: Documents to add; may be a generator
+        batch_size: Documents per embedding call and collection write
+        workers: Batches embedded concurrently
+    
+    Returns:
+        Number of documents added
+    """
+    embedding_model = vector_store.embeddings
+    collection = vector_store._collection
+    workers = max(1, workers)
+    
+    def embed(batch: List[Document]):
+        return batch, embedding_model.embed_documents([doc.page_content for doc in batch])
+    
+    added = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chroma-embed") as executor:
+        pending = deque()
+        
+        def write_oldest() -> int:
+            batch, vectors = pending.popleft().result()
+            collection.upsert(
+                ids=[str(uuid.uuid4()) for _ in batch],
+                embeddings=vectors,
+                metadatas=[doc.metadata for doc in batch],
+                documents=[doc.page_content for doc in batch]
+            )
+            return len(batch)
+        
+        for batch in _batches(documents, batch_size):
+            pending.append(executor.submit(embed, batch))
+            if len(pending) > workers:
+                added += write_oldest()
+        while pending:
+            added += write_oldest()
+    
+    logger.info(f"Added {added} documents to Chroma in batches of {batch_size}")
+    return added
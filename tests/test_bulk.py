@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from langchain.schema import Document
+
+from benchmarks.fakes import HashEmbeddings
+from src.vectorstore.bulk import export_vector_store, import_vector_store, read_export
+from src.vectorstore.maintenance import reconstruct_vectors
+from src.vectorstore.vector_store_factory import add_documents, create_empty_faiss_store
+
+
+@pytest.fixture
+def export(tmp_path):
+    embeddings = HashEmbeddings(dimension=32)
+    store = create_empty_faiss_store(embeddings)
+    documents = [
+        Document(page_content=f"passage {i} about topic {i % 7}", metadata={"source": f"doc{i % 5}", "row": i})
+        for i in range(110)
+    ]
+    # Chunks without metadata must survive too
+    documents += [Document(page_content=f"bare passage {i}") for i in range(10)]
+    add_documents(store, documents)
+    path = str(tmp_path / "chunks.parquet")
+    assert export_vector_store(store, path, batch_size=50) == 120
+    return store, embeddings, path
+
+
+def _expected(store):
+    return {
+        doc_id: (store.docstore._dict[doc_id], store.index.reconstruct(position))
+        for position, doc_id in store.index_to_docstore_id.items()
+    }
+
+
+def test_export_file_holds_every_chunk(export):
+    store, _, path = export
+
+    rows = [row for batch in read_export(path, 40) for row in zip(*batch)]
+
+    assert len(rows) == 120
+    expected = _expected(store)
+    for doc_id, text, metadata, vector in rows:
+        doc, stored_vector = expected[doc_id]
+        assert (text, metadata) == (doc.page_content, doc.metadata)
+        np.testing.assert_array_equal(vector, stored_vector)
+
+
+@pytest.mark.parametrize("index_type", ["Flat", "IVF2,Flat"])
+def test_faiss_round_trip(export, tmp_path, index_type):
+    store, embeddings, path = export
+
+    imported = import_vector_store(
+        path, store_type="faiss", embedding_model=embeddings, persist_directory=str(tmp_path / "db"),
+        index_type=index_type, batch_size=50, train_size=60
+    )
+
+    assert imported.index.ntotal == 120
+    assert imported.index.is_trained
+    expected = _expected(store)
+    assert set(imported.index_to_docstore_id.values()) == set(expected)
+    positions = sorted(imported.index_to_docstore_id)
+    vectors = reconstruct_vectors(imported.index, positions)
+    for position, vector in zip(positions, vectors):
+        doc_id = imported.index_to_docstore_id[position]
+        assert imported.docstore._dict[doc_id] == expected[doc_id][0]
+        np.testing.assert_allclose(vector, expected[doc_id][1], atol=1e-6)
+    assert imported.similarity_search("passage 42 about topic 0", k=1)[0].metadata["row"] == 42
+
+
+def test_chroma_round_trip(export, tmp_path):
+    store, embeddings, path = export
+
+    imported = import_vector_store(
+        path, store_type="chroma", embedding_model=embeddings, persist_directory=str(tmp_path / "db"), batch_size=50
+    )
+
+    rows = imported._collection.get(include=["embeddings", "documents", "metadatas"])
+    assert len(rows["ids"]) == 120
+    expected = _expected(store)
+    for doc_id, text, metadata, vector in zip(rows["ids"], rows["documents"], rows["metadatas"], rows["embeddings"]):
+        doc, stored_vector = expected[doc_id]
+        assert text == doc.page_content
+        assert (metadata or {}) == doc.metadata
+        np.testing.assert_allclose(vector, stored_vector, atol=1e-6)
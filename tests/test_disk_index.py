@@ -0,0 +1,127 @@
+import numpy as np
+from langchain.schema import Document
+
+from benchmarks.fakes import HashEmbeddings
+from src.vectorstore.bulk import export_vector_store, import_vector_store
+from src.vectorstore.disk_index import BlockCache, DiskGraphIndex
+from src.vectorstore.disk_store import DiskVectorStore
+from src.vectorstore.vector_store_factory import add_documents, create_empty_faiss_store
+
+SETTINGS = dict(degree=16, build_list_size=32, search_list_size=32, pq_bytes=8, cache_bytes=64 * 1024)
+
+
+def _vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((count, 16)).astype(np.float32)
+
+
+def _recall(index: DiskGraphIndex, vectors: np.ndarray, queries: np.ndarray, k: int) -> float:
+    distances = ((queries[:, None, :] - vectors[None, :, :]) ** 2).sum(axis=2)
+    expected = np.argsort(distances, axis=1)[:, :k]
+    _, found = index.search(queries, k)
+    return np.mean([len(set(row) & set(truth)) / k for row, truth in zip(found.tolist(), expected.tolist())])
+
+
+def test_search_recall_matches_flat(tmp_path):
+    vectors = _vectors(600)
+    queries = _vectors(30, seed=1)
+    index = DiskGraphIndex.build(str(tmp_path), vectors, **SETTINGS)
+
+    assert _recall(index, vectors, queries, k=10) >= 0.9
+    # A vector's own position comes first
+    _, found = index.search(vectors[:20], 1)
+    assert found[:, 0].tolist() == list(range(20))
+
+
+def test_inserts_keep_recall_and_survive_reopen(tmp_path):
+    vectors = _vectors(600)
+    queries = _vectors(30, seed=1)
+    index = DiskGraphIndex.build(str(tmp_path), vectors[:400], **SETTINGS)
+    # Smaller than the index, so inserted node by node rather than rebuilt
+    index.add(vectors[400:])
+
+    assert index.ntotal == 600
+    assert _recall(index, vectors, queries, k=10) >= 0.9
+    np.testing.assert_allclose(index.reconstruct([450, 599]), vectors[[450, 599]])
+
+    index.save()
+    reopened = DiskGraphIndex.open(str(tmp_path), search_list_size=32)
+    assert reopened.ntotal == 600
+    assert _recall(reopened, vectors, queries, k=10) >= 0.9
+
+
+def test_search_skips_excluded_positions(tmp_path):
+    vectors = _vectors(300)
+    index = DiskGraphIndex.build(str(tmp_path), vectors, **SETTINGS)
+
+    _, found = index.search(vectors[:10], 5, excluded=set(range(10)))
+
+    assert not set(found.ravel().tolist()) & set(range(10))
+    assert (found >= 0).all()
+
+
+def test_block_cache_evicts_least_recently_used_within_budget():
+    cache = BlockCache(budget_bytes=3 * 4096)
+    block = bytes(4096)
+    for number in range(3):
+        cache.put(number, block, cache.version(number))
+    # Touch block 0 so block 1 is the least recently used
+    assert cache.get(0) is not None
+
+    cache.put(3, block, cache.version(3))
+
+    assert len(cache) == 3
+    assert cache.nbytes <= cache.budget_bytes
+    assert cache.get(1) is None
+    assert all(cache.get(number) is not None for number in (0, 2, 3))
+    # Blocks larger than the whole budget are never cached
+    cache.put(4, bytes(4 * 4096), cache.version(4))
+    assert cache.get(4) is None
+
+
+def test_block_cache_drops_stale_reads():
+    cache = BlockCache(budget_bytes=4096)
+    version = cache.version(7)
+    cache.invalidate(7)
+
+    cache.put(7, bytes(16), version)
+
+    assert cache.get(7) is None
+
+
+def test_search_cache_stays_within_budget(tmp_path):
+    vectors = _vectors(2000)
+    index = DiskGraphIndex.build(str(tmp_path), vectors, **dict(SETTINGS, cache_bytes=4 * 4096))
+
+    index.search(_vectors(20, seed=1), 10)
+
+    cache = index._graph.cache
+    assert 0 < len(cache) <= 4
+    assert cache.nbytes <= cache.budget_bytes
+
+
+def test_export_imports_into_disk_store(tmp_path):
+    embeddings = HashEmbeddings(dimension=32)
+    store = create_empty_faiss_store(embeddings)
+    add_documents(store, [
+        Document(page_content=f"passage {i} about topic {i % 7}", metadata={"source": f"doc{i % 5}", "row": i})
+        for i in range(120)
+    ])
+    export_vector_store(store, str(tmp_path / "chunks.parquet"), batch_size=50)
+
+    imported = import_vector_store(
+        str(tmp_path / "chunks.parquet"), store_type="disk", embedding_model=embeddings,
+        persist_directory=str(tmp_path / "db"), batch_size=50
+    )
+
+    loaded = DiskVectorStore.load_local(str(tmp_path / "db" / "disk"), embeddings)
+    for vector_store in (imported, loaded):
+        assert vector_store.index.ntotal == 120
+        for position, doc_id in store.index_to_docstore_id.items():
+            target = vector_store.index_to_docstore_id[position]
+            assert target == doc_id
+            assert vector_store.docstore._dict[target] == store.docstore._dict[doc_id]
+        np.testing.assert_allclose(
+            vector_store.index.reconstruct(list(range(120))),
+            store.index.reconstruct_n(0, 120)
+        )
+    assert loaded.similarity_search("passage 42 about topic 0", k=1)[0].metadata["row"] == 42
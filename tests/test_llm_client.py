@@ -0,0 +1,138 @@
+import json
+import threading
+from contextlib import closing
+
+import pytest
+import requests
+
+from benchmarks.ollama_stub import start_stub_server
+from src.llm.client import BackendSlots, LLMBackendBusy, LLMQueueTimeout, OllamaClient, get_ollama_client
+from src.llm.router import BackendPool
+
+
+@pytest.fixture
+def stub():
+    server, url = start_stub_server(token_latency=0.002, answer_tokens=8, slots=8)
+    yield server, url
+    server.shutdown()
+    server.server_close()
+
+
+def test_client_reuses_keep_alive_connections(stub):
+    server, url = stub
+    client = OllamaClient(url, max_concurrency=2, pool_size=2)
+
+    answers = ["".join(client.generate("stub", f"question {i}")) for i in range(5)]
+
+    assert all(answer.startswith("token0 ") for answer in answers)
+    assert server.state.requests == 5
+    assert server.state.connections == 1
+
+
+def test_pool_caps_requests_in_flight(stub):
+    server, url = stub
+    get_ollama_client(url, max_concurrency=2)
+    pool = BackendPool([url], health_check_interval=0, queue_timeout=10)
+    answers = []
+
+    def ask(i):
+        answers.append("".join(pool.generate("stub", f"question {i}")))
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(answers) == 8
+    assert server.state.max_in_flight == 2
+
+
+def test_request_timeout(stub):
+    server, url = stub
+    server.state.token_latency = 0.05
+    client = OllamaClient(url, request_timeout=0.1)
+
+    with pytest.raises((TimeoutError, requests.Timeout)):
+        "".join(client.generate("stub", "question"))
+
+
+def test_client_without_free_slot_is_busy(stub):
+    _, url = stub
+    client = OllamaClient(url, max_concurrency=1)
+
+    with closing(client.generate("stub", "first")) as first:
+        next(first)
+        with pytest.raises(LLMBackendBusy):
+            next(client.generate("stub", "second"))
+
+    # The slot is free again once the first stream is closed
+    assert "".join(client.generate("stub", "third")).startswith("token0 ")
+
+
+def test_pool_queue_timeout(stub):
+    _, url = stub
+    get_ollama_client(url, max_concurrency=1)
+    pool = BackendPool([url], health_check_interval=0, queue_timeout=0.1)
+
+    with closing(pool.generate("stub", "first")) as first:
+        next(first)
+        with pytest.raises(LLMQueueTimeout):
+            next(pool.generate("stub", "second"))
+
+
+def test_backend_slots_queue_then_time_out():
+    slots = BackendSlots("test-backend", max_concurrency=1, queue_timeout=0.05)
+
+    with slots.slot():
+        with pytest.raises(LLMQueueTimeout):
+            slots.acquire()
+    # A waiting request gets the slot once it is released
+    releaser = threading.Timer(0.01, slots.release)
+    slots.acquire()
+    releaser.start()
+    slots.acquire()
+    slots.release()
+
+
+def _chat_client(requests_seen):
+    import httpx
+
+    def handle(request):
+        requests_seen.append(json.loads(request.content))
+        return httpx.Response(200, json={
+            "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "answer"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+        })
+
+    return httpx.Client(transport=httpx.MockTransport(handle))
+
+
+def test_api_llm_budgets_tokens_per_question():
+    from src.llm.generation import answer_token_budget
+    from src.llm.openai_chat import ManagedChatOpenAI
+    from src.llm.router import routing_question
+
+    seen = []
+    llm = ManagedChatOpenAI(model_name="stub", openai_api_key="key", http_client=_chat_client(seen))
+
+    for question in ("What is the capital?", "Explain and compare the two designs in detail"):
+        with routing_question(question):
+            assert llm.invoke("prompt").content == "answer"
+        assert seen[-1]["max_tokens"] == answer_token_budget(question)
+    assert seen[0]["max_tokens"] != seen[1]["max_tokens"]
+
+
+def test_api_llm_checks_cancellation():
+    from src.llm.generation import GenerationCancelled, cancellation
+    from src.llm.openai_chat import ManagedChatOpenAI
+
+    seen = []
+    llm = ManagedChatOpenAI(model_name="stub", openai_api_key="key", http_client=_chat_client(seen))
+    event = threading.Event()
+    event.set()
+
+    with cancellation(event), pytest.raises(GenerationCancelled):
+        llm.invoke("prompt")
+    assert seen == []
@@ -0,0 +1,106 @@
+import zlib
+
+import numpy as np
+import pytest
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+from src.vectorstore.maintenance import (
+    catch_up_compacted, compact_faiss_store, delete_documents, filtered_search, fragmentation, snapshot_live_rows
+)
+from src.vectorstore.vector_store_factory import add_documents, create_empty_faiss_store
+
+
+class HashEmbeddings(Embeddings):
+    def _embed(self, text: str) -> list:
+        vector = np.random.default_rng(zlib.crc32(text.encode())).standard_normal(16)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def _chunks(document_id: str, count: int) -> list:
+    return [
+        Document(page_content=f"{document_id} chunk {i}", metadata={"document_id": document_id, "source": document_id})
+        for i in range(count)
+    ]
+
+
+def _store(index_type: str = "Flat"):
+    store = create_empty_faiss_store(HashEmbeddings())
+    for document_id in ("a", "b", "c", "d"):
+        add_documents(store, _chunks(document_id, 40))
+    if index_type != "Flat":
+        store = compact_faiss_store(store, index_type=index_type)
+    return store
+
+
+def _search(store, texts, k):
+    matrix = np.asarray(store.embeddings.embed_documents(texts), dtype=np.float32)
+    ids = filtered_search(store, matrix, k)
+    return [[store.docstore._dict[store.index_to_docstore_id[i]] for i in row if i != -1] for row in ids]
+
+
+@pytest.mark.parametrize("index_type", ["Flat", "HNSW32", "IVF4,Flat"])
+def test_deleted_chunks_never_come_back(index_type):
+    store = _store(index_type)
+
+    assert delete_documents(store, document_ids=["b"]) == 40
+    assert fragmentation(store) == pytest.approx(0.25)
+
+    # Query with the deleted chunks' own vectors: they would be the nearest hits
+    results = _search(store, [f"b chunk {i}" for i in range(40)], k=10)
+    assert all(results)
+    assert all(doc.metadata["document_id"] != "b" for row in results for doc in row)
+
+
+def test_compaction_keeps_positions_and_docstore_consistent():
+    store = _store()
+    delete_documents(store, document_ids=["a", "c"])
+    embeddings = HashEmbeddings()
+
+    compacted = compact_faiss_store(store, index_type="Flat")
+
+    assert compacted.index.ntotal == 80
+    assert fragmentation(compacted) == 0
+    assert sorted(compacted.index_to_docstore_id) == list(range(80))
+    for position, doc_id in compacted.index_to_docstore_id.items():
+        doc = compacted.docstore._dict[doc_id]
+        assert doc.metadata["document_id"] in ("b", "d")
+        np.testing.assert_allclose(
+            compacted.index.reconstruct(position), embeddings.embed_query(doc.page_content), atol=1e-6
+        )
+    # The original store is untouched
+    assert store.index.ntotal == 160
+
+
+def test_writes_during_compaction_survive_catch_up():
+    store = _store()
+    delete_documents(store, document_ids=["a"])
+    snapshot = snapshot_live_rows(store)
+    compacted = compact_faiss_store(store, snapshot=snapshot)
+
+    # Written while the rebuild ran
+    add_documents(store, _chunks("e", 10))
+    delete_documents(store, document_ids=["b"])
+
+    assert catch_up_compacted(compacted, store, since=snapshot[0])
+    live = {doc.metadata["document_id"] for doc in compacted.docstore._dict.values()}
+    assert live == {"c", "d", "e"}
+    results = _search(compacted, [f"e chunk {i}" for i in range(10)], k=1)
+    assert [row[0].page_content for row in results] == [f"e chunk {i}" for i in range(10)]
+    assert all(doc.metadata["document_id"] != "b" for row in _search(compacted, ["b chunk 0"], k=20) for doc in row)
+
+
+def test_catch_up_refuses_a_reprojected_store():
+    store = _store()
+    snapshot = snapshot_live_rows(store)
+    compacted = compact_faiss_store(store, snapshot=snapshot)
+
+    store.embedding_function = HashEmbeddings()
+
+    assert not catch_up_compacted(compacted, store, since=snapshot[0])
@@ -0,0 +1,33 @@
+import numpy as np
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake import FakeListLLM
+
+from src.rag import RAGChain
+from src.vectorstore.vector_store_factory import add_documents, create_empty_faiss_store
+
+
+class PrefixedEmbeddings(Embeddings):
+    """Deterministic embeddings that, like e5/bge models, embed queries and passages differently."""
+
+    def _embed(self, text: str) -> list:
+        vector = np.random.default_rng(sum(map(ord, text))).standard_normal(32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(f"passage: {text}") for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(f"query: {text}")
+
+
+def test_batch_of_one_matches_query():
+    store = create_empty_faiss_store(PrefixedEmbeddings())
+    add_documents(store, [Document(page_content=f"chunk {i}", metadata={"source": f"doc{i}"}) for i in range(50)])
+    chain = RAGChain(vector_store=store, llm=FakeListLLM(responses=["answer"]), top_k=4, adaptive_k=False)
+
+    single = chain.query("what is in chunk 7?")
+    [(index, batched)] = list(chain.batch_query(["what is in chunk 7?"]))
+
+    assert index == 0
+    assert batched["sources"] == single["sources"]
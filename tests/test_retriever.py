@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+from src.rag.retriever import ContextRetriever, adaptive_cutoff
+from src.vectorstore.vector_store_factory import add_documents, create_empty_faiss_store
+
+
+def test_cutoff_keeps_min_k_and_max_k():
+    assert adaptive_cutoff([0.9], min_k=2, max_k=8, min_ratio=0.85, min_gap=0.05) == 1
+    assert adaptive_cutoff([0.9, 0.1, 0.05], min_k=2, max_k=8, min_ratio=0.85, min_gap=0.05) == 2
+    assert adaptive_cutoff([0.9] * 12, min_k=2, max_k=8, min_ratio=0.85, min_gap=0.05) == 8
+
+
+def test_cutoff_stops_below_score_ratio():
+    scores = [0.90, 0.89, 0.88, 0.80, 0.79]
+    assert adaptive_cutoff(scores, min_k=1, max_k=8, min_ratio=0.95, min_gap=1.0) == 3
+
+
+def test_cutoff_stops_at_largest_gap():
+    scores = [0.90, 0.88, 0.87, 0.70, 0.69, 0.68]
+    assert adaptive_cutoff(scores, min_k=1, max_k=8, min_ratio=0.0, min_gap=0.05) == 3
+    # Gaps smaller than min_gap do not cut the ranking
+    assert adaptive_cutoff(scores, min_k=1, max_k=8, min_ratio=0.0, min_gap=0.5) == 6
+
+
+def test_cutoff_ignores_ratio_for_negative_scores():
+    scores = [-0.10, -0.11, -0.12, -0.60]
+    # Cut by the gap only; a ratio of a negative best score would drop every result past min_k
+    assert adaptive_cutoff(scores, min_k=1, max_k=8, min_ratio=0.85, min_gap=0.2) == 3
+
+
+class ClusterEmbeddings(Embeddings):
+    """Large-norm vectors, like Ollama's nomic-embed-text: "near" texts share a direction with the query."""
+
+    def __init__(self, scale: float):
+        self.scale = scale
+        self.direction = np.eye(16)[0]
+
+    def _embed(self, text: str) -> list:
+        noise = np.random.default_rng(sum(map(ord, text))).standard_normal(16)
+        vector = (self.direction if text.startswith("near") or text == "query" else noise / np.linalg.norm(noise))
+        vector = vector + 0.01 * noise
+        norm = self.scale * (1 + len(text) % 3)
+        return (norm * vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+@pytest.mark.parametrize("scale", [1.0, 40.0])
+def test_adaptive_k_uses_cosines_for_unnormalized_vectors(scale):
+    store = create_empty_faiss_store(ClusterEmbeddings(scale))
+    texts = [f"near {i}" for i in range(3)] + [f"far {i}" for i in range(20)]
+    add_documents(store, [Document(page_content=text) for text in texts])
+    retriever = ContextRetriever(
+        vector_store=store, adaptive_k=True, min_k=1, max_k=8, min_score_ratio=0.85, min_score_gap=0.3,
+        expand_parents=False
+    )
+
+    documents = retriever.invoke("query")
+
+    assert sorted(doc.page_content for doc in documents) == ["near 0", "near 1", "near 2"]
+
+
+def test_adaptive_k_uses_cosines_for_chroma_l2(tmp_path):
+    from langchain_community.vectorstores import Chroma
+
+    store = Chroma(
+        collection_name="adaptive", embedding_function=ClusterEmbeddings(40.0), persist_directory=str(tmp_path)
+    )
+    texts = [f"near {i}" for i in range(3)] + [f"far {i}" for i in range(20)]
+    store.add_documents([Document(page_content=text) for text in texts])
+    retriever = ContextRetriever(
+        vector_store=store, adaptive_k=True, min_k=1, max_k=8, min_score_ratio=0.85, min_score_gap=0.3,
+        expand_parents=False
+    )
+
+    documents = retriever.invoke("query")
+
+    assert sorted(doc.page_content for doc in documents) == ["near 0", "near 1", "near 2"]
@@ -0,0 +1,61 @@
+import threading
+
+from langchain.schema import Document
+
+from benchmarks.fakes import HashEmbeddings
+from src.vectorstore.snapshots import SnapshotWatcher, current_snapshot, load_snapshot, publish_snapshot
+from src.vectorstore.vector_store_factory import add_documents, create_empty_faiss_store
+
+
+def _documents(prefix: str, count: int) -> list:
+    return [Document(page_content=f"{prefix} passage {i}", metadata={"source": prefix}) for i in range(count)]
+
+
+def test_publish_moves_current_pointer_and_prunes(tmp_path):
+    embeddings = HashEmbeddings(dimension=32)
+    store = create_empty_faiss_store(embeddings)
+    assert current_snapshot(str(tmp_path)) is None
+
+    versions = []
+    for prefix in ("one", "two", "three"):
+        add_documents(store, _documents(prefix, 5))
+        versions.append(publish_snapshot(store, root=str(tmp_path), keep=2))
+
+    version, path = current_snapshot(str(tmp_path))
+    assert version == versions[-1]
+    assert (tmp_path / "CURRENT").read_text() == versions[-1]
+    # Only the newest ``keep`` versions remain, and no staging directories are left behind
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["CURRENT"] + versions[1:]
+
+    loaded = load_snapshot(path, embeddings, mmap=True)
+    assert loaded.index.ntotal == 15
+    assert {doc.metadata["source"] for doc in loaded.docstore._dict.values()} == {"one", "two", "three"}
+
+
+def test_reader_switches_to_new_version(tmp_path):
+    embeddings = HashEmbeddings(dimension=32)
+    store = create_empty_faiss_store(embeddings)
+    add_documents(store, _documents("first", 3))
+    first = publish_snapshot(store, root=str(tmp_path))
+
+    switched = threading.Event()
+    served = {}
+
+    def on_snapshot(version, vector_store):
+        served[version] = vector_store.index.ntotal
+        switched.set()
+
+    watcher = SnapshotWatcher(embeddings, on_snapshot, root=str(tmp_path), interval=0.01, current_version=first)
+    assert not watcher.check()
+
+    watcher.start()
+    try:
+        add_documents(store, _documents("second", 4))
+        second = publish_snapshot(store, root=str(tmp_path))
+        assert switched.wait(5)
+    finally:
+        watcher.stop()
+        watcher.join()
+
+    assert served == {second: 7}
+    assert watcher.current_version == second
@@ -0,0 +1,123 @@
+from benchmarks.fakes import HashEmbeddings
+from src.document_processor.parents import ParentStore
+from src.document_processor.structure import StructureAwareSplitter
+from src.rag.retriever import expand_parent_documents
+from src.vectorstore.maintenance import delete_documents
+from src.vectorstore.vector_store_factory import add_documents, create_empty_faiss_store
+
+
+def _heading(text, level):
+    return {"type": "heading", "text": text, "level": level}
+
+
+def _paragraph(text, page=None):
+    return {"type": "paragraph", "text": text, "page": page}
+
+
+ELEMENTS = [
+    _paragraph("Preamble before any heading.", page=1),
+    _heading("Install", 1),
+    _paragraph("Download the package.", page=1),
+    _heading("Linux", 2),
+    _paragraph("Use the tarball.", page=2),
+    _paragraph("Then run the installer.", page=2),
+    _heading("Usage", 1),
+    _paragraph("Start the server.", page=3),
+]
+
+
+def test_chunks_never_cross_section_boundaries():
+    splitter = StructureAwareSplitter(chunk_size=200)
+
+    chunks = splitter.split_elements(ELEMENTS, {"source": "guide.md"})
+
+    assert [chunk.metadata["section"] for chunk in chunks] == ["", "Install", "Install > Linux", "Usage"]
+    assert [chunk.metadata["page"] for chunk in chunks] == [1, 1, 2, 3]
+    assert [chunk.metadata["chunk_index"] for chunk in chunks] == [0, 1, 2, 3]
+    # Paragraphs of one section are packed together under the heading path
+    assert chunks[2].page_content == "Install > Linux\n\nUse the tarball.\n\nThen run the installer."
+    assert "Start the server." not in chunks[2].page_content
+    assert all(chunk.metadata["source"] == "guide.md" for chunk in chunks)
+
+
+def test_long_paragraphs_are_split_within_their_section():
+    splitter = StructureAwareSplitter(chunk_size=120, chunk_overlap=10)
+    long_text = " ".join(f"sentence{i}" for i in range(60))
+
+    chunks = splitter.split_elements([_heading("Long", 1), _paragraph(long_text)], {})
+
+    assert len(chunks) > 1
+    assert all(chunk.page_content.startswith("Long\n\n") for chunk in chunks)
+    assert all(len(chunk.page_content) <= 120 for chunk in chunks)
+
+
+def test_large_tables_split_by_row_with_repeated_header():
+    splitter = StructureAwareSplitter(chunk_size=120)
+    header = "| name | value |"
+    rows = [f"| row{i:02d} | {i * 1000} |" for i in range(20)]
+    table = {"type": "table", "text": "\n".join([header] + rows)}
+
+    chunks = splitter.split_elements([_heading("Data", 1), table], {})
+
+    assert len(chunks) > 1
+    seen_rows = []
+    for chunk in chunks:
+        assert len(chunk.page_content) <= 120
+        title, piece = chunk.page_content.split("\n\n")
+        assert title == "Data"
+        lines = piece.split("\n")
+        assert lines[0] == header
+        seen_rows.extend(lines[1:])
+    # Every row appears exactly once, in order
+    assert seen_rows == rows
+
+
+def test_small_tables_stay_whole():
+    splitter = StructureAwareSplitter(chunk_size=500)
+    table = {"type": "table", "text": "| a | b |\n| 1 | 2 |\n| 3 | 4 |"}
+
+    chunks = splitter.split_elements([_heading("Data", 1), table], {})
+
+    assert [chunk.page_content for chunk in chunks] == ["Data\n\n| a | b |\n| 1 | 2 |\n| 3 | 4 |"]
+
+
+def test_parent_sections_are_stored_once_per_section(tmp_path):
+    store = ParentStore(str(tmp_path))
+    splitter = StructureAwareSplitter(chunk_size=200, use_parent_chunks=True, parent_store=store)
+
+    chunks = splitter.split_elements(ELEMENTS, {"document_id": "doc1"})
+
+    parent_ids = [chunk.metadata["parent_id"] for chunk in chunks]
+    assert parent_ids == ["doc1:0", "doc1:1", "doc1:2", "doc1:3"]
+    parents = store.get_many(parent_ids + ["doc1:99", "missing:0"])
+    assert set(parents) == set(parent_ids)
+    assert parents["doc1:2"] == "Install > Linux\n\nUse the tarball.\n\nThen run the installer."
+
+    expanded = expand_parent_documents(chunks[2:3], store)
+    assert expanded[0].page_content == parents["doc1:2"]
+
+
+def test_parent_store_put_replaces_and_delete_removes(tmp_path):
+    store = ParentStore(str(tmp_path))
+    store.put("doc1", {"doc1:0": "old", "doc1:1": "kept"})
+    store.put("doc1", {"doc1:0": "new"})
+    store.put("doc2", {"doc2:0": "other"})
+
+    assert store.get_many(["doc1:0", "doc1:1", "doc2:0"]) == {"doc1:0": "new", "doc2:0": "other"}
+
+    store.delete(["doc1", "", "never-stored"])
+
+    assert store.get_many(["doc1:0", "doc2:0"]) == {"doc2:0": "other"}
+
+
+def test_deleting_documents_drops_their_parent_sections(tmp_path):
+    parent_store = ParentStore(str(tmp_path))
+    splitter = StructureAwareSplitter(chunk_size=200, use_parent_chunks=True, parent_store=parent_store)
+    vector_store = create_empty_faiss_store(HashEmbeddings(dimension=32))
+    for document_id in ("doc1", "doc2"):
+        add_documents(vector_store, splitter.split_elements(ELEMENTS, {"document_id": document_id}))
+
+    delete_documents(vector_store, document_ids=["doc1"], parent_store=parent_store)
+
+    assert parent_store.get_many(["doc1:0", "doc2:0"]) == {"doc2:0": "Preamble before any heading."}
+    assert not list((tmp_path / "do").glob("doc1*"))
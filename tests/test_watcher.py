@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+
+from src.document_processor.watcher import DirectoryWatcher
+
+DEBOUNCE = 60.0
+NOTHING = {"added": [], "modified": [], "deleted": []}
+
+
+def _watcher(tmp_path, debounce=DEBOUNCE):
+    (tmp_path / "docs").mkdir(exist_ok=True)
+    return DirectoryWatcher(str(tmp_path / "docs"), str(tmp_path / "state.json"), [".txt"], debounce=debounce)
+
+
+def _write(path, text):
+    path.write_text(text)
+    # A fresh mtime, so the change has to settle for the whole debounce period
+    stamp = time.time_ns()
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_add_modify_delete_after_quiet_period(tmp_path):
+    watcher = _watcher(tmp_path)
+    doc = tmp_path / "docs" / "a.txt"
+    _write(doc, "first")
+    _write(tmp_path / "docs" / "ignored.bin", "not watched")
+
+    assert watcher.poll(now=0) == NOTHING
+    assert watcher.poll(now=DEBOUNCE - 1) == NOTHING
+    changes = watcher.poll(now=DEBOUNCE)
+    assert changes == {"added": [str(doc)], "modified": [], "deleted": []}
+    watcher.commit(changes)
+    assert watcher.poll(now=DEBOUNCE + 1) == NOTHING
+
+    _write(doc, "second version")
+    assert watcher.poll(now=100) == NOTHING
+    # Written again before it settled: the quiet period starts over
+    _write(doc, "third version")
+    assert watcher.poll(now=100 + DEBOUNCE - 1) == NOTHING
+    assert watcher.poll(now=100 + 2 * DEBOUNCE - 2) == NOTHING
+    changes = watcher.poll(now=100 + 2 * DEBOUNCE)
+    assert changes == {"added": [], "modified": [str(doc)], "deleted": []}
+    watcher.commit(changes)
+
+    doc.unlink()
+    assert watcher.poll(now=300) == NOTHING
+    changes = watcher.poll(now=300 + DEBOUNCE)
+    assert changes == {"added": [], "modified": [], "deleted": [str(doc)]}
+    watcher.commit(changes)
+    assert watcher.state == {}
+
+
+def test_touched_file_with_same_content_is_not_reported(tmp_path):
+    watcher = _watcher(tmp_path)
+    doc = tmp_path / "docs" / "a.txt"
+    _write(doc, "content")
+    watcher.poll(now=0)
+    watcher.commit(watcher.poll(now=DEBOUNCE))
+    old_mtime = watcher.state[str(doc)]["mtime_ns"]
+
+    stamp = old_mtime + 5 * 10**9
+    os.utime(doc, ns=(stamp, stamp))
+
+    assert watcher.poll(now=100) == NOTHING
+    assert watcher.poll(now=100 + DEBOUNCE) == NOTHING
+    # The new stat is remembered, so the file is not hashed again
+    assert watcher.state[str(doc)]["mtime_ns"] == stamp
+    assert watcher.poll(now=200 + DEBOUNCE) == NOTHING
+
+
+def test_failed_apply_is_retried_after_another_quiet_period(tmp_path):
+    watcher = _watcher(tmp_path)
+    doc = tmp_path / "docs" / "a.txt"
+    _write(doc, "content")
+    watcher.poll(now=0)
+    changes = watcher.poll(now=DEBOUNCE)
+    assert changes["added"] == [str(doc)]
+
+    # Applying failed: nothing is committed and the file is held back
+    watcher.defer(changes["added"], now=DEBOUNCE)
+    watcher.commit(NOTHING)
+
+    assert watcher.poll(now=2 * DEBOUNCE - 1) == NOTHING
+    assert watcher.poll(now=2 * DEBOUNCE) == changes
+    watcher.commit(changes)
+    assert watcher.poll(now=3 * DEBOUNCE) == NOTHING
+
+
+def test_restarted_watcher_reports_only_changes_made_while_down(tmp_path):
+    watcher = _watcher(tmp_path)
+    kept, changed = tmp_path / "docs" / "kept.txt", tmp_path / "docs" / "sub" / "changed.txt"
+    changed.parent.mkdir()
+    _write(kept, "kept")
+    _write(changed, "before")
+    watcher.poll(now=0)
+    watcher.commit(watcher.poll(now=DEBOUNCE))
+
+    _write(changed, "after restart")
+    # Written long enough ago to count as settled on the first poll
+    stamp = time.time_ns() - int(2 * DEBOUNCE * 1e9)
+    os.utime(changed, ns=(stamp, stamp))
+
+    restarted = _watcher(tmp_path)
+    assert restarted.poll(now=0) == {"added": [], "modified": [str(changed)], "deleted": []}
+
+
+def test_run_retries_changes_when_apply_raises(tmp_path):
+    watcher = _watcher(tmp_path, debounce=0)
+    doc = tmp_path / "docs" / "a.txt"
+    _write(doc, "content")
+    stop = threading.Event()
+    calls = []
+
+    def apply(changes):
+        calls.append(changes)
+        if len(calls) == 1:
+            raise RuntimeError("index unavailable")
+        stop.set()
+
+    watcher.run(apply, interval=0.01, stop_event=stop)
+
+    assert calls == [{"added": [str(doc)], "modified": [], "deleted": []}] * 2
+    assert str(doc) in DirectoryWatcher(str(tmp_path / "docs"), str(tmp_path / "state.json"), [".txt"]).state